@@ -13,4 +13,95 @@ STORY_NUM_PAGES = 3
 # Directory for storing assets
 ASSETS_ROOT_DIR = "assets"
 ASSETS_IMAGE_DIR = "assets/generated_images"
-ASSETS_AUDIO_DIR = "assets/generated_audio"
\ No newline at end of file
+ASSETS_AUDIO_DIR = "assets/generated_audio"
+
+# 渐进式阅读：第 1 页就绪后立即打开阅读器，其余页面在后台继续生成
+PROGRESSIVE_READING = True
+
+# 流式生成故事：每个段落一输出完毕就开始为其生成音频和插画
+STORY_STREAMING = True
+
+# 插画缓存：按 (模型, 图片提示, 角色描述) 的哈希缓存已生成的图片，超出上限时淘汰最久未使用的图片
+ASSETS_CACHE_DIR = "assets/cache"
+IMAGE_CACHE_DIR = "assets/cache/images"
+IMAGE_CACHE_MAX_MB = 200
+
+# 朗读音频缓存：按 (文本, 语言, 语速) 的哈希缓存已合成的语音
+AUDIO_CACHE_DIR = "assets/cache/audio"
+AUDIO_CACHE_MAX_MB = 50
+
+# 整篇故事缓存：相同主题（规范化后）和生成设置直接打开之前生成的故事
+# 策略: 'off' 不使用; 'serve_cached' 未过期时使用缓存; 'revalidate' 总是使用缓存，过期时在后台重新生成
+STORY_CACHE_POLICY = "revalidate"
+STORY_CACHE_MAX_AGE_HOURS = 24
+STORY_CACHE_MAX_ENTRIES = 50
+STORY_CACHE_INDEX = "assets/cache/stories.json"
+
+# 异步批量生成插画时同时进行的最大请求数
+IMAGE_MAX_CONCURRENCY = 3
+
+# API 限流与重试：按配额（每分钟请求数）限速，可重试错误指数退避，限流时自动降低并发
+GEMINI_TEXT_RPM = 10
+GEMINI_IMAGE_RPM = 10
+API_MAX_CONCURRENCY = 4
+API_MAX_RETRIES = 4
+API_RETRY_BASE_DELAY = 1.0
+API_RETRY_MAX_DELAY = 30.0
+
+# 故事页面表面缓存：保留当前页前后各 N 页绘制好的整页画面，并在后台预取相邻页面
+PAGE_CACHE_WINDOW = 1
+
+# 快速启动：延迟导入 google.genai、语音识别和录音模块，延迟创建 Gemini 客户端和音频播放，
+# 界面只初始化显示子系统，并在主菜单出现时打印各阶段启动耗时
+LAZY_STARTUP = True
+
+# 字体索引：系统字体的 Unicode 覆盖范围和度量信息，字体目录变化时才重新扫描
+FONT_INDEX_PATH = "assets/cache/font_index.json"
+
+# 语音识别：后端（'google' 在线、'vosk' 离线，或选择策略 'offline_first'、'online_first'、'race'），
+# 以及是否边录音边按短句识别（说话停顿 STT_PHRASE_GAP 秒即视为一句结束）
+STT_BACKEND = "offline_first"
+VOSK_MODEL_PATH = "assets/models/vosk-model-small-cn-0.22"
+STREAMING_STT = True
+STT_PHRASE_GAP = 0.5
+
+# 录音：最长录音秒数（决定预先分配的录音缓冲区大小），以及是否把每次录音另存到 ASSETS_AUDIO_DIR
+RECORDING_MAX_SECONDS = 30
+SAVE_VOICE_RECORDINGS = False
+
+# 麦克风：采样率，以及开始录音时包含的前导音频秒数（麦克风打开后保持运行，避免切掉第一个音节）
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_PRE_ROLL_SECONDS = 0.5
+AUDIO_WARM_STREAM = True
+
+# 录音端点检测：自适应 VAD（按估计的噪声底判断人声，关闭时使用固定音量阈值）。
+# 人声需高于噪声底 VAD_MARGIN_DB 分贝；说话后静音 VAD_HANGOVER_SECONDS 秒结束，始终没有开口时 VAD_NO_SPEECH_TIMEOUT 秒后结束
+VAD_ADAPTIVE = True
+VAD_MARGIN_DB = 10.0
+VAD_HANGOVER_SECONDS = 0.8
+VAD_NO_SPEECH_TIMEOUT = 8.0
+
+# 语音指令：阅读时常开监听（共用麦克风，需要 Vosk 离线模型），说出指令词即可翻页。
+# 指令词映射到翻页动作；超过 VOICE_COMMAND_MAX_SECONDS 秒的语音不做识别，置信度低于 VOICE_COMMAND_MIN_CONFIDENCE 的结果被忽略
+VOICE_COMMANDS_ENABLED = True
+VOICE_COMMANDS = {"下一页": "next", "上一页": "prev", "退出": "quit", "静音": "mute_toggle"}
+VOICE_COMMAND_MAX_SECONDS = 2.0
+VOICE_COMMAND_MIN_CONFIDENCE = 0.6
+
+# 语音合成：后端（'gtts' 在线、'espeak' 本地 espeak-ng、'auto' 在线优先），
+# auto 模式下在线合成失败或超过 TTS_SLOW_NETWORK_SECONDS 秒时，TTS_ONLINE_RETRY_SECONDS 秒内改用本地合成
+TTS_BACKEND = "auto"
+TTS_NETWORK_TIMEOUT = 8.0
+TTS_SLOW_NETWORK_SECONDS = 3.0
+TTS_ONLINE_RETRY_SECONDS = 300
+
+# 已解码朗读音频的内存上限（MB）：当前页和相邻页面的音频解码后保留在内存中，翻页时立即播放
+AUDIO_CLIP_CACHE_MB = 32
+
+# 自动翻页：当前页朗读完毕后自动翻到下一页（静音时不会自动翻页）
+AUTO_ADVANCE = False
+
+# 逐句朗读：没有预先生成整页音频时，按句子切分并发合成（最多 TTS_MAX_CONCURRENCY 个请求），第一句合成完毕即开始朗读
+TTS_STREAMING = True
+TTS_SENTENCE_MAX_CHARS = 60
+TTS_MAX_CONCURRENCY = 3
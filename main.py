@@ -1,9 +1,15 @@
+from modules.startup_profiler import startup_profiler  # 最先导入，从进程启动开始统计耗时
 import config  # 导入配置文件
 from config import STORY_NUM_PAGES
 from modules.api_clients.stt_client import *
+from modules.api_clients.tts_client import tts_client
 from modules.image_generator import ImageGenerator
 from modules.presentation_manager import PresentationManager
 from modules.story_generator import StoryGenerator
+from modules.story_cache import StoryCache
+from modules.story_pipeline import open_story
+
+startup_profiler.mark("导入模块")
 
 
 def main():
@@ -12,11 +18,14 @@ def main():
     # 1. 初始化核心模块
     story_generator = StoryGenerator()  # 内部会实例化 LLMClient
     image_generator = ImageGenerator()  # 内部会实例化 ImageGenClient
+    story_cache = StoryCache()  # 常见主题的整篇故事缓存
+    startup_profiler.mark("初始化生成器与缓存")
 
     # 初始化 PresentationManager，自动检测模式
     screen_size = (800, 480)
     screen_width, screen_height = screen_size
     presentation_manager = PresentationManager(screen_size=screen_size)
+    startup_profiler.mark("初始化显示与字体")
 
     # 检查 Pygame 是否成功初始化，如果失败则无法进行图形显示
     if not presentation_manager.pygame_initialized:
@@ -32,6 +41,13 @@ def main():
                 buttons=[{"text": "确定", "value": "ok", "color": (220, 53, 69)}]
             )
 
+    # 提前打开麦克风，选择语音输入时不用再等待设备初始化
+    if config.AUDIO_WARM_STREAM:
+        warm_up_microphone()
+    # 阅读时可以用语音指令翻页（只在等待翻页输入时监听）
+    if config.VOICE_COMMANDS_ENABLED and not presentation_manager.test_mode:
+        start_voice_commands()
+
     try:
         while True:
             # 显示主菜单
@@ -99,16 +115,16 @@ def main():
             # 显示故事生成状态
             presentation_manager.show_status_screen("正在生成故事...", "AI创作中")
 
-            # 2. 生成结构化故事
+            # 2. 在后台生成结构化故事、音频和插画
             print("\n----- 正在生成结构化故事和图片 -----")
             print(f"故事主题: {story_theme}, 预计 {config.STORY_MAX_WORDS} 字内...")
 
-            story_segments, story_summary = story_generator.generate_structured_story(
-                theme=story_theme,
-                num_pages=STORY_NUM_PAGES
-            )
+            story = open_story(story_theme, STORY_NUM_PAGES, story_generator, image_generator,
+                               story_cache=story_cache,
+                               on_page_ready=presentation_manager.notify_page_ready)
 
-            if not story_segments:
+            # 第 1 页（文本、插画、音频）就绪后即可开始阅读，其余页面继续在后台生成
+            if not story.wait_for_first_page():
                 print("!!! 故事生成失败或解析错误，请检查API Key和网络连接。")
                 # 显示错误弹窗
                 if presentation_manager.test_mode:
@@ -121,55 +137,76 @@ def main():
                     )
                 continue  # 返回主菜单
 
-            print(f"\n故事摘要: '{story_summary}'")
-
-            # 3. 生成插画
-            generated_pages_data = image_generator.generate_illustrations_for_story(
-                story_segments=story_segments
-            )
+            if not config.PROGRESSIVE_READING:
+                # 非渐进模式：等待所有页面生成完毕后再开始阅读
+                presentation_manager.show_status_screen("正在绘制插画...", "AI创作中")
+                story.wait_until_complete()
 
-            if not generated_pages_data:
-                print("!!! 插画生成失败或未生成任何图片。")
-                # 显示错误弹窗
-                if presentation_manager.test_mode:
-                    print("[弹窗] 插画生成失败或未生成任何图片")
-                else:
-                    presentation_manager.show_popup(
-                        message="插画生成失败或未生成任何图片。\n程序将继续显示纯文本故事。",
-                        title="插画生成警告",
-                        buttons=[{"text": "继续", "value": "continue", "color": (255, 193, 7)}]
-                    )
-                # 即使图片失败，也可以尝试显示纯文本的故事
-                generated_pages_data = [(seg.get('audio_text', ''), None) for seg in story_segments]
+                if not story.has_any_image():
+                    print("!!! 插画生成失败或未生成任何图片。")
+                    # 显示错误弹窗
+                    if presentation_manager.test_mode:
+                        print("[弹窗] 插画生成失败或未生成任何图片")
+                    else:
+                        presentation_manager.show_popup(
+                            message="插画生成失败或未生成任何图片。\n程序将继续显示纯文本故事。",
+                            title="插画生成警告",
+                            buttons=[{"text": "继续", "value": "continue", "color": (255, 193, 7)}]
+                        )
 
-            print("\n----- 故事和插画生成完成 -----")
+                print(f"\n故事摘要: '{story.get_summary()}'")
+                print("\n----- 故事和插画生成完成 -----")
 
             # 4. 呈现故事页面
             print("\n----- 正在屏幕上呈现故事 -----")
             current_page_index = 0
-            total_pages = len(generated_pages_data)
 
             want_continue = False
             finish = False
+            redraw = True  # 是否需要重新绘制当前页面
+            showing_pending_page = False  # 当前显示的页面是否仍在生成中
 
             while True:
-                page_info = generated_pages_data[current_page_index]
-
-                # 获取当前页面的音频路径（如果存在）
-                audio_path = None
-                if current_page_index < len(story_segments):
-                    audio_path = story_segments[current_page_index].get('audio_path')
-
-                presentation_manager.display_story_page(
-                    page_info[0],  # audio_text
-                    page_info[1],  # image_path
-                    current_page_index + 1,  # page_number
-                    audio_path  # audio_path
-                )
+                total_pages = story.page_count()
+                # 流式生成的段落少于预期时，页数会减少
+                if current_page_index >= total_pages:
+                    current_page_index = total_pages - 1
+
+                if redraw:
+                    page = story.get_page(current_page_index)
+                    presentation_manager.display_story_page(
+                        page['text'],  # audio_text
+                        page['image_path'],  # image_path
+                        current_page_index + 1,  # page_number
+                        page['audio_path'],  # audio_path
+                        pending=not page['ready']
+                    )
+                    showing_pending_page = not page['ready']
+                redraw = True
+
+                # 在后台预先绘制相邻页面，翻页时只需一次 blit
+                neighbour_pages = []
+                neighbour_audio = []
+                for offset in range(1, config.PAGE_CACHE_WINDOW + 1):
+                    for neighbour_index in {(current_page_index + offset) % total_pages,
+                                            (current_page_index - offset) % total_pages} - {current_page_index}:
+                        neighbour = story.get_page(neighbour_index)
+                        neighbour_pages.append((neighbour['text'], neighbour['image_path'],
+                                                neighbour_index + 1, not neighbour['ready']))
+                        neighbour_audio.append(neighbour['audio_path'])
+                presentation_manager.prefetch_story_pages(current_page_index + 1, neighbour_pages)
+                # 同时在后台解码相邻页面的朗读音频
+                if not presentation_manager.test_mode:
+                    tts_client.preload_clips(neighbour_audio)
 
                 # 等待翻页输入
                 action = presentation_manager.wait_for_page_flip_input()
-                if action == 'next':
+                if action == 'page_ready':
+                    # 仅当正在显示的“绘制中”页面已就绪时才重新绘制，避免重复播放音频
+                    redraw = showing_pending_page and (current_page_index >= story.page_count() or
+                                                       story.get_page(current_page_index)['ready'])
+                    continue
+                elif action == 'next':
                     current_page_index = (current_page_index + 1) % total_pages
 
                     if finish and not want_continue:
@@ -201,8 +238,9 @@ def main():
                 elif action == 'prev':
                     current_page_index = (current_page_index - 1 + total_pages) % total_pages
                 elif action == 'mute_toggle':
-                    # 静音状态切换，重新显示当前页面以更新按钮图标，但不播放音频
-                    continue  # 重新显示当前页面
+                    # 静音按钮的图标已在界面中单独更新，无需重新显示整个页面
+                    redraw = False
+                    continue
                 elif action == 'scroll_up':
                     print("向上滚动功能待实现（此处简化为上一页）")
                     current_page_index = (current_page_index - 1 + total_pages) % total_pages
@@ -234,6 +272,8 @@ def main():
 
                 finish = bool(current_page_index >= (total_pages - 1))
 
+            # 退出阅读后不再为剩余页面发起请求
+            story.cancel()
             print("\n故事阅读结束。")
 
     except KeyboardInterrupt:
@@ -259,6 +299,7 @@ def main():
                 buttons=[{"text": "确定", "value": "ok", "color": (220, 53, 69)}]
             )
     finally:
+        release_microphone()
         presentation_manager.cleanup()
         print("\n----- 绘本生成器程序已退出 -----")
 
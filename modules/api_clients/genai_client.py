@@ -0,0 +1,30 @@
+import threading
+import typing
+
+from modules.startup_profiler import startup_profiler
+
+if typing.TYPE_CHECKING:
+    from google import genai
+
+_clients: dict[str, 'genai.Client'] = {}
+_clients_lock = threading.Lock()
+
+
+def get_genai_client(api_key: str) -> 'genai.Client':
+    """
+    获取进程内共享的 genai.Client（文本和图片客户端共用）。
+    google.genai 导入较慢，只在第一次真正发起请求时才导入并创建客户端。
+    """
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            with startup_profiler.phase("Gemini 客户端"):
+                from google import genai
+                client = _clients[api_key] = genai.Client(api_key=api_key)
+        return client
+
+
+def genai_types():
+    """延迟导入 google.genai.types"""
+    from google.genai import types
+    return types
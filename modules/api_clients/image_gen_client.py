@@ -1,10 +1,8 @@
 from io import BytesIO
 
-from google import genai
-from google.genai import types
-from PIL import Image
-
-from config import GOOGLE_GENAI_API_KEY, GEMINI_IMAGE_GENERATION_MODEL
+from config import GOOGLE_GENAI_API_KEY, GEMINI_IMAGE_GENERATION_MODEL, LAZY_STARTUP
+from modules.api_clients.genai_client import genai_types, get_genai_client
+from modules.api_clients.rate_limiter import get_rate_limiter
 
 
 class ImageGenClient:
@@ -12,8 +10,17 @@ class ImageGenClient:
         if not api_key:
             raise ValueError("API key cannot be empty. Please configure GOOGLE_GENAI_API_KEY in config.py.")
 
-        self.client = genai.Client(api_key=api_key)
-        print("ImageGenClient (Gemini Vision) initialized using genai.Client().")
+        self.api_key = api_key
+        # 所有图片请求共用的限流与重试层
+        self.rate_limiter = get_rate_limiter('image')
+        if not LAZY_STARTUP:
+            _ = self.client
+        print("ImageGenClient (Gemini Vision) initialized.")
+
+    @property
+    def client(self):
+        """genai.Client，首次使用时才创建（与文本客户端共用）"""
+        return get_genai_client(self.api_key)
 
     def generate_image(self,
                        prompt_text: str,
@@ -26,40 +33,72 @@ class ImageGenClient:
         try:
             print(f"向 Gemini API 发送图片生成请求，模型：{model_name}...")
 
-            response = self.client.models.generate_content(
+            response = self.rate_limiter.call(
+                self.client.models.generate_content,
                 model=model_name,
                 contents=prompt_text,
-                config=types.GenerateContentConfig(
+                config=genai_types().GenerateContentConfig(
                     response_modalities=['TEXT', 'IMAGE']
                 )
             )
 
-            # 核心检查：确认生成是否正常完成
-            if not response.candidates or response.candidates[0].finish_reason.name != 'STOP':
-                reason = "Unknown"
-                if response.candidates:
-                    reason = response.candidates[0].finish_reason.name
-                elif response.prompt_feedback and response.prompt_feedback.block_reason:
-                    reason = f"PROMPT_BLOCKED ({response.prompt_feedback.block_reason.name})"
-                print(f"Gemini API 图片生成未正常完成。终止原因: {reason}")
-                return None, None
+            return self._parse_image_response(response)
 
-            # 初始化返回值
-            text_response = None
-            image_response = None
+        except Exception as e:
+            print(f"调用 Gemini API 发生错误: {e}")
+            return None, None
 
-            # 正确地遍历所有部分，以寻找文本和图片
-            for part in response.candidates[0].content.parts:
-                if part.text:
-                    text_response = part.text
-                elif part.inline_data is not None:
-                    image_response = Image.open(BytesIO(part.inline_data.data))
+    async def generate_image_async(self,
+                                   prompt_text: str,
+                                   model_name: str = GEMINI_IMAGE_GENERATION_MODEL):
+        """
+        generate_image 的 asyncio 版本，使用 genai 的 aio 接口，可在一个事件循环中同时发起多个图片请求。
+        返回值与 generate_image 相同：(文本, 图片) 元组，失败时对应项为 None。
+        """
+        try:
+            print(f"向 Gemini API 发送异步图片生成请求，模型：{model_name}...")
 
-            if not image_response:
-                print("Gemini API 响应中未找到图片数据。")
+            response = await self.rate_limiter.call_async(
+                self.client.aio.models.generate_content,
+                model=model_name,
+                contents=prompt_text,
+                config=genai_types().GenerateContentConfig(
+                    response_modalities=['TEXT', 'IMAGE']
+                )
+            )
 
-            return text_response, image_response
+            return self._parse_image_response(response)
 
         except Exception as e:
             print(f"调用 Gemini API 发生错误: {e}")
-            return None, None
\ No newline at end of file
+            return None, None
+
+    @staticmethod
+    def _parse_image_response(response):
+        """检查生成是否正常完成，并从响应中取出文本和图片"""
+        # 核心检查：确认生成是否正常完成
+        if not response.candidates or response.candidates[0].finish_reason.name != 'STOP':
+            reason = "Unknown"
+            if response.candidates:
+                reason = response.candidates[0].finish_reason.name
+            elif response.prompt_feedback and response.prompt_feedback.block_reason:
+                reason = f"PROMPT_BLOCKED ({response.prompt_feedback.block_reason.name})"
+            print(f"Gemini API 图片生成未正常完成。终止原因: {reason}")
+            return None, None
+
+        # 初始化返回值
+        text_response = None
+        image_response = None
+
+        # 正确地遍历所有部分，以寻找文本和图片
+        for part in response.candidates[0].content.parts:
+            if part.text:
+                text_response = part.text
+            elif part.inline_data is not None:
+                from PIL import Image
+                image_response = Image.open(BytesIO(part.inline_data.data))
+
+        if not image_response:
+            print("Gemini API 响应中未找到图片数据。")
+
+        return text_response, image_response
@@ -1,8 +1,12 @@
-from google import genai
-from google.genai import types
+import typing
 
 from config import (GOOGLE_GENAI_API_KEY, GEMINI_TEXT_MODEL, STORY_MAX_WORDS,
-                    STORY_TEMPERATURE)
+                    STORY_TEMPERATURE, LAZY_STARTUP)
+from modules.api_clients.genai_client import genai_types, get_genai_client
+from modules.api_clients.rate_limiter import get_rate_limiter
+
+if typing.TYPE_CHECKING:
+    from google.genai import types
 
 
 class LLMClient:
@@ -11,16 +15,24 @@ class LLMClient:
         if not api_key:
             raise ValueError("API key cannot be empty. Please configure GOOGLE_GENAI_API_KEY in config.py.")
 
-        # 严格按照您提供的方式初始化 client，API Key 直接传入
-        self.client = genai.Client(api_key=api_key)
-        print("LLMClient (Gemini Text) initialized using genai.Client(api_key).")
+        self.api_key = api_key
+        # 所有文本请求共用的限流与重试层
+        self.rate_limiter = get_rate_limiter('text')
+        if not LAZY_STARTUP:
+            _ = self.client
+        print("LLMClient (Gemini Text) initialized.")
+
+    @property
+    def client(self):
+        """genai.Client，首次使用时才创建（与图片客户端共用）"""
+        return get_genai_client(self.api_key)
 
     def generate_text(self,
                       prompt_text: str,
                       model_name: str = GEMINI_TEXT_MODEL,
                       max_tokens: int = STORY_MAX_WORDS,
                       temperature: float = STORY_TEMPERATURE,
-                      config_param: types.GenerateContentConfig | None = None) -> str | None:
+                      config_param: 'types.GenerateContentConfig | None' = None) -> str | None:
         """
         调用 Google Gemini API 生成文本内容。
         prompt_text: 用户输入的文本提示。
@@ -35,33 +47,168 @@ class LLMClient:
         try:
             print(f"向 Gemini API 发送文本生成请求，模型：{model_name}...")
 
-            gen_config = {'temperature': temperature, 'max_output_tokens': max_tokens}
-
-            if config_param is not None:
-                gen_config.update(config_param)
-
-            gen_content_config_obj = types.GenerateContentConfig(**gen_config)
+            gen_content_config_obj = self._build_config(max_tokens, temperature, config_param)
 
-            response = self.client.models.generate_content(
+            response = self.rate_limiter.call(
+                self.client.models.generate_content,
                 model=model_name,
                 contents=prompt_text,  # contents 可以直接是字符串
                 config=gen_content_config_obj
             )
 
-            if response.candidates and response.candidates[0].finish_reason.name != 'STOP':
-                reason = response.candidates[0].finish_reason.name
-                print(f"Gemini API 文本生成未正常完成。终止原因: {reason}。")
-                if reason == 'MAX_TOKENS':
-                    print("请尝试在 config.py 中调高 STORY_MAX_WORDS 的值。")
-                return None
+            return self._extract_text(response)
+
+        except Exception as e:
+            print(f"调用 Gemini API 发生错误: {e}")
+            return None
+
+    async def generate_text_async(self,
+                                  prompt_text: str,
+                                  model_name: str = GEMINI_TEXT_MODEL,
+                                  max_tokens: int = STORY_MAX_WORDS,
+                                  temperature: float = STORY_TEMPERATURE,
+                                  config_param: 'types.GenerateContentConfig | None' = None) -> str | None:
+        """
+        generate_text 的 asyncio 版本，使用 genai 的 aio 接口，等待响应期间不占用线程。
+        参数和返回值与 generate_text 相同。
+        """
+        try:
+            print(f"向 Gemini API 发送异步文本生成请求，模型：{model_name}...")
+
+            gen_content_config_obj = self._build_config(max_tokens, temperature, config_param)
 
-            # 确保 response.text 存在且不为空
-            if hasattr(response, 'text') and response.text:
-                return response.text
-            else:
-                print("Gemini API 返回了空文本，但未报告具体错误原因。")
-                return None
+            response = await self.rate_limiter.call_async(
+                self.client.aio.models.generate_content,
+                model=model_name,
+                contents=prompt_text,
+                config=gen_content_config_obj
+            )
+
+            return self._extract_text(response)
 
         except Exception as e:
             print(f"调用 Gemini API 发生错误: {e}")
             return None
+
+    @staticmethod
+    def _extract_text(response) -> str | None:
+        """检查生成是否正常完成，并取出响应文本"""
+        if response.candidates and response.candidates[0].finish_reason.name != 'STOP':
+            reason = response.candidates[0].finish_reason.name
+            print(f"Gemini API 文本生成未正常完成。终止原因: {reason}。")
+            if reason == 'MAX_TOKENS':
+                print("请尝试在 config.py 中调高 STORY_MAX_WORDS 的值。")
+            return None
+
+        # 确保 response.text 存在且不为空
+        if hasattr(response, 'text') and response.text:
+            return response.text
+        else:
+            print("Gemini API 返回了空文本，但未报告具体错误原因。")
+            return None
+
+    def generate_text_stream(self,
+                             prompt_text: str,
+                             model_name: str = GEMINI_TEXT_MODEL,
+                             max_tokens: int = STORY_MAX_WORDS,
+                             temperature: float = STORY_TEMPERATURE,
+                             config_param: 'types.GenerateContentConfig | None' = None) -> typing.Iterator[str]:
+        """
+        以流式方式调用 Google Gemini API，逐块返回生成的文本。
+        参数与 generate_text 相同。
+
+        returns: 文本片段的迭代器。生成失败或未正常完成时迭代提前结束。
+                 调用方可随时 close() 该迭代器以中止请求，不再消耗剩余的 token。
+        """
+        response_stream = None
+        try:
+            print(f"向 Gemini API 发送流式文本生成请求，模型：{model_name}...")
+
+            gen_content_config_obj = self._build_config(max_tokens, temperature, config_param)
+
+            response_stream = self.rate_limiter.stream(
+                self.client.models.generate_content_stream,
+                model=model_name,
+                contents=prompt_text,
+                config=gen_content_config_obj
+            )
+
+            for chunk in response_stream:
+                if chunk.text:
+                    yield chunk.text
+
+                if chunk.candidates and chunk.candidates[0].finish_reason \
+                        and chunk.candidates[0].finish_reason.name != 'STOP':
+                    reason = chunk.candidates[0].finish_reason.name
+                    print(f"Gemini API 流式文本生成未正常完成。终止原因: {reason}。")
+                    if reason == 'MAX_TOKENS':
+                        print("请尝试在 config.py 中调高 STORY_MAX_WORDS 的值。")
+                    return
+
+        except GeneratorExit:
+            print("流式文本生成已被调用方中止。")
+            # 关闭底层 HTTP 流，服务端随之停止生成
+            if response_stream is not None:
+                response_stream.close()
+            raise
+        except Exception as e:
+            print(f"调用 Gemini API 流式生成发生错误: {e}")
+
+    async def generate_text_stream_async(self,
+                                         prompt_text: str,
+                                         model_name: str = GEMINI_TEXT_MODEL,
+                                         max_tokens: int = STORY_MAX_WORDS,
+                                         temperature: float = STORY_TEMPERATURE,
+                                         config_param: 'types.GenerateContentConfig | None' = None
+                                         ) -> typing.AsyncIterator[str]:
+        """
+        generate_text_stream 的 asyncio 版本，逐块异步返回生成的文本。
+        参数与 generate_text 相同。生成失败或未正常完成时迭代提前结束。
+        调用方可随时 aclose() 该迭代器以中止请求，不再消耗剩余的 token。
+        """
+        response_stream = None
+        try:
+            print(f"向 Gemini API 发送异步流式文本生成请求，模型：{model_name}...")
+
+            gen_content_config_obj = self._build_config(max_tokens, temperature, config_param)
+
+            response_stream = await self.rate_limiter.call_async(
+                self.client.aio.models.generate_content_stream,
+                model=model_name,
+                contents=prompt_text,
+                config=gen_content_config_obj
+            )
+
+            async for chunk in response_stream:
+                if chunk.text:
+                    yield chunk.text
+
+                if chunk.candidates and chunk.candidates[0].finish_reason \
+                        and chunk.candidates[0].finish_reason.name != 'STOP':
+                    reason = chunk.candidates[0].finish_reason.name
+                    print(f"Gemini API 流式文本生成未正常完成。终止原因: {reason}。")
+                    if reason == 'MAX_TOKENS':
+                        print("请尝试在 config.py 中调高 STORY_MAX_WORDS 的值。")
+                    return
+
+        except GeneratorExit:
+            print("流式文本生成已被调用方中止。")
+            # 关闭底层 HTTP 流，服务端随之停止生成
+            if response_stream is not None and hasattr(response_stream, 'aclose'):
+                await response_stream.aclose()
+            raise
+        except Exception as e:
+            print(f"调用 Gemini API 流式生成发生错误: {e}")
+
+    @staticmethod
+    def _build_config(max_tokens: int,
+                      temperature: float,
+                      config_param: 'types.GenerateContentConfig | None') -> 'types.GenerateContentConfig':
+        """合并温度、最大 token 数和额外配置，生成 GenerateContentConfig"""
+        gen_config = {'temperature': temperature, 'max_output_tokens': max_tokens}
+
+        if config_param is not None:
+            # 只合并显式设置的字段，避免额外配置中的 None 覆盖温度和 token 上限
+            gen_config.update({key: value for key, value in config_param if value is not None})
+
+        return genai_types().GenerateContentConfig(**gen_config)
@@ -0,0 +1,273 @@
+import asyncio
+import random
+import re
+import threading
+import time
+import typing
+
+import config
+
+# 可重试的 HTTP 状态码：限流、服务端暂时不可用
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RATE_LIMITED_STATUS_CODES = {429}
+
+
+def classify_error(error: Exception) -> typing.Tuple[bool, bool]:
+    """
+    判断 API 调用异常是否值得重试。
+    返回: (是否可重试, 是否为限流错误)。
+    """
+    # google.genai.errors.APIError 的 code 为 HTTP 状态码
+    status_code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    if isinstance(status_code, int):
+        return status_code in RETRYABLE_STATUS_CODES, status_code in RATE_LIMITED_STATUS_CODES
+
+    # 网络层的瞬时错误（超时、连接断开等）；httpx 随 google.genai 一起加载，这里不提前导入
+    import httpx
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True, False
+
+    return False, False
+
+
+def retry_delay_hint(error: Exception) -> float | None:
+    """从限流错误中提取服务端建议的重试等待时间（RetryInfo.retryDelay，例如 "12s"）"""
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(error))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    '''
+    令牌桶：按配置的每分钟请求数匀速补充令牌，允许不超过容量的短时突发。
+    '''
+    def __init__(self, requests_per_minute: float, capacity: int | None = None):
+        self.rate = requests_per_minute / 60.0  # 每秒补充的令牌数
+        self.capacity = capacity or max(1, int(requests_per_minute // 6))  # 默认允许约 10 秒的突发量
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        预约一个令牌。
+        返回: 调用方需要等待的秒数（0 表示可立即发起请求）。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class AdaptiveConcurrencyLimiter:
+    '''
+    AIMD（加性增、乘性减）并发控制：
+    每次成功调用后并发上限缓慢增加（约每一轮 +1），遇到限流时上限减半。
+    同步调用方在 Condition 上等待；协程调用方（可能来自不同线程的事件循环）登记一个 Future，
+    有空位时通过 call_soon_threadsafe 唤醒，不需要轮询。
+    '''
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """acquire 的 asyncio 版本：没有空位时挂起等待唤醒，不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._condition:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._notify_locked()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._notify_locked()
+
+    def _notify_locked(self):
+        """唤醒所有等待者重新竞争空位（调用方需持有锁）"""
+        self._condition.notify_all()
+        for loop, waiter in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_waiter, waiter)
+            except RuntimeError:
+                pass  # 等待者所在的事件循环已关闭
+        self._async_waiters.clear()
+
+    def on_throttle(self):
+        with self._condition:
+            self.limit = max(self.minimum, self.limit / 2)
+
+
+def _resolve_waiter(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class RateLimiter:
+    '''
+    API 调用的共享限流与重试层：
+    - 令牌桶控制请求速率不超过配置的配额；
+    - AIMD 控制同时进行的请求数；
+    - 可重试错误按指数退避加随机抖动重试，限流时所有调用方一起暂停。
+    '''
+    def __init__(self,
+                 name: str,
+                 requests_per_minute: float,
+                 max_concurrency: int = config.API_MAX_CONCURRENCY,
+                 max_retries: int = config.API_MAX_RETRIES,
+                 base_delay: float = config.API_RETRY_BASE_DELAY,
+                 max_delay: float = config.API_RETRY_MAX_DELAY):
+        self.name = name
+        self.bucket = TokenBucket(requests_per_minute)
+        self.concurrency = AdaptiveConcurrencyLimiter(initial=1, maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._pause_until = 0.0  # 限流后所有调用方共同的暂停截止时间
+        self._lock = threading.Lock()
+
+    def call(self, fn: typing.Callable, *args, **kwargs):
+        """同步调用 fn(*args, **kwargs)，失败时按策略重试；重试耗尽后抛出最后一次的异常"""
+        attempt = 0
+        while True:
+            time.sleep(self._wait_time())
+            self.concurrency.acquire()
+            try:
+                result = fn(*args, **kwargs)
+                self.concurrency.on_success()
+                return result
+            except Exception as e:
+                delay = self._handle_failure(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.concurrency.release()
+            time.sleep(delay)
+            attempt += 1
+
+    def stream(self, fn: typing.Callable[..., typing.Iterable], *args, **kwargs) -> typing.Iterator:
+        """
+        流式调用：逐项返回 fn(*args, **kwargs) 的结果。
+        只有在尚未收到任何数据时失败才会重试，已输出部分内容后失败则直接抛出异常。
+        """
+        attempt = 0
+        while True:
+            time.sleep(self._wait_time())
+            self.concurrency.acquire()
+            received_any = False
+            delay = None
+            try:
+                for item in fn(*args, **kwargs):
+                    received_any = True
+                    yield item
+                self.concurrency.on_success()
+                return
+            except Exception as e:
+                if received_any:
+                    raise
+                delay = self._handle_failure(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.concurrency.release()
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn: typing.Callable[..., typing.Awaitable], *args, **kwargs):
+        """call 的 asyncio 版本，fn 为返回协程的函数（例如 client.aio.models.generate_content）"""
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._wait_time())
+            await self.concurrency.acquire_async()
+            try:
+                result = await fn(*args, **kwargs)
+                self.concurrency.on_success()
+                return result
+            except Exception as e:
+                delay = self._handle_failure(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.concurrency.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _wait_time(self) -> float:
+        """本次请求发出前需要等待的时间：限流暂停剩余时间与令牌桶等待时间中的较大者"""
+        with self._lock:
+            pause = max(0.0, self._pause_until - time.monotonic())
+        return max(pause, self.bucket.reserve())
+
+    def _handle_failure(self, error: Exception, attempt: int) -> float | None:
+        """
+        处理一次失败的调用。
+        返回: 重试前需要等待的秒数；不应重试时返回 None。
+        """
+        retryable, rate_limited = classify_error(error)
+        if not retryable or attempt >= self.max_retries:
+            return None
+
+        # 指数退避 + 全抖动
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if rate_limited:
+            self.concurrency.on_throttle()
+            delay = max(delay, retry_delay_hint(error) or self.base_delay)
+            with self._lock:
+                self._pause_until = max(self._pause_until, time.monotonic() + delay)
+
+        print(f"[{self.name}] 请求失败 ({error})，{delay:.1f} 秒后进行第 {attempt + 1}/{self.max_retries} 次重试"
+              f"（当前并发上限 {int(self.concurrency.limit)}）")
+        return delay
+
+
+_rate_limiters: dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """
+    获取进程内共享的限流器，同一类 API（'text' 或 'image'）的所有客户端共用一个配额。
+    """
+    quotas = {
+        'text': config.GEMINI_TEXT_RPM,
+        'image': config.GEMINI_IMAGE_RPM,
+    }
+    with _rate_limiters_lock:
+        if name not in _rate_limiters:
+            _rate_limiters[name] = RateLimiter(name, requests_per_minute=quotas[name])
+        return _rate_limiters[name]
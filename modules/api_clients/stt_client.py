@@ -1,48 +1,291 @@
-import speech_recognition as sr
+import abc
+import asyncio
+import importlib.util
+import json
+import os
+import queue
+import sys
+import threading
+import wave
 from io import BytesIO
-from modules.input_handler import AudioRecorder
 
-def audio_to_text_from_file(filepath: str = None):
-    """
-    从录音文件中读取音频数据并进行语音识别。
-    参数：
-        filepath: 录音文件的路径，默认为 None
-    返回：
-        text: 识别到的文本或 None
-    """
-    r = sr.Recognizer()
-    with sr.AudioFile(filepath) as source:
-        audio_data = r.record(source)
+import config
+
+
+class STTBackend(abc.ABC):
+    '''
+    语音识别后端接口：把 16 位单声道 PCM 转换为文字。
+    录音和分句逻辑（modules.streaming_stt）只依赖这个接口，测试时可以换成本地的替身实现。
+    '''
+    name = "base"
+
+    def is_available(self) -> bool:
+        """后端能否使用（例如离线模型是否已安装）"""
+        return True
+
+    @abc.abstractmethod
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int, sample_width: int = 2) -> str | None:
+        """识别一段 PCM 音频，识别失败或没有内容时返回 None"""
+
+
+class GoogleSTTBackend(STTBackend):
+    '''通过 speech_recognition 调用 Google 在线语音识别（中文）'''
+    name = "google"
+
+    def __init__(self, language: str = 'zh-CN'):
+        self.language = language
+
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int, sample_width: int = 2) -> str | None:
+        import speech_recognition as sr  # 首次识别时才导入，加快程序启动
+
+        # 直接用 PCM 构造 AudioData，不需要先编码为 WAV
+        audio_data = sr.AudioData(pcm, sample_rate, sample_width)
         try:
-            text = r.recognize_google(audio_data, language='zh-CN')
+            text = sr.Recognizer().recognize_google(audio_data, language=self.language)
             print(f"识别结果: {text}")
             return text
         except sr.UnknownValueError:
             print("Google 语音识别无法理解音频")
         except sr.RequestError as e:
             print(f"无法请求 Google 语音识别服务; {e}")
+        return None
+
+
+class ScriptedSTTBackend(STTBackend):
+    '''
+    本地替身后端：按顺序返回预先给定的识别结果，不访问网络。
+    用于测试分句和流式识别流程；delay 模拟识别请求的耗时。
+    '''
+    name = "scripted"
+
+    def __init__(self, responses: list[str | None], delay: float = 0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.calls: list[int] = []  # 每次请求的 PCM 字节数
+        self._lock = threading.Lock()
+
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int, sample_width: int = 2) -> str | None:
+        if self.delay:
+            threading.Event().wait(self.delay)
+        with self._lock:
+            self.calls.append(len(pcm))
+            return self.responses.pop(0) if self.responses else None
+
+
+_vosk_models: dict = {}
+_vosk_models_lock = threading.Lock()
+
+
+def load_vosk_model(model_path: str = config.VOSK_MODEL_PATH):
+    """加载 Vosk 模型（每个模型目录在进程内只加载一次，语音识别和语音指令共用）"""
+    import vosk  # 首次使用时才导入
+
+    with _vosk_models_lock:
+        model = _vosk_models.get(model_path)
+        if model is None:
+            vosk.SetLogLevel(-1)
+            model = _vosk_models[model_path] = vosk.Model(model_path)
+    return model
+
+
+class VoskSTTBackend(STTBackend):
+    '''
+    基于 Vosk 的离线语音识别（在树莓派 CPU 上运行，不需要网络）。
+    模型只加载一次；模型目录不存在或未安装 vosk 时 is_available() 为 False。
+    '''
+    name = "vosk"
+
+    def __init__(self, model_path: str = config.VOSK_MODEL_PATH):
+        self.model_path = model_path
+
+    def is_available(self) -> bool:
+        if not os.path.isdir(self.model_path):
+            return False
+        return importlib.util.find_spec("vosk") is not None
+
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int, sample_width: int = 2) -> str | None:
+        try:
+            import vosk  # 首次识别时才导入和加载模型
+
+            recognizer = vosk.KaldiRecognizer(load_vosk_model(self.model_path), sample_rate)
+            recognizer.AcceptWaveform(bytes(pcm))
+            # 中文模型按词输出并以空格分隔，去掉空格
+            text = json.loads(recognizer.FinalResult()).get("text", "").replace(" ", "")
+        except Exception as e:
+            print(f"Vosk 离线语音识别失败: {e}")
+            return None
+        if not text:
+            print("Vosk 离线语音识别没有识别到内容")
+            return None
+        print(f"识别结果: {text}")
+        return text
+
+
+class PolicySTTBackend(STTBackend):
+    '''
+    组合离线和在线后端的选择策略：
+        'offline_first': 先用离线后端，没有结果时再请求在线后端；
+        'online_first': 先请求在线后端，没有结果（例如没有网络）时用离线后端；
+        'race': 同时使用两个后端，采用最先返回的有效结果。
+    离线后端不可用（未安装模型）时只使用在线后端。
+    '''
+    POLICIES = ('offline_first', 'online_first', 'race')
+
+    def __init__(self, offline: STTBackend, online: STTBackend, policy: str = 'offline_first'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的语音识别策略: {policy}")
+        self.offline = offline
+        self.online = online
+        self.policy = policy
+        self.name = policy
+
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int, sample_width: int = 2) -> str | None:
+        if not self.offline.is_available():
+            return self.online.transcribe_pcm(pcm, sample_rate, sample_width)
+        if self.policy == 'race':
+            return self._race(pcm, sample_rate, sample_width)
+        order = (self.offline, self.online) if self.policy == 'offline_first' else (self.online, self.offline)
+        for backend in order:
+            text = backend.transcribe_pcm(pcm, sample_rate, sample_width)
+            if text:
+                return text
+        return None
+
+    def _race(self, pcm: bytes, sample_rate: int, sample_width: int) -> str | None:
+        """两个后端同时识别，返回先到的有效结果（较慢的一方在后台完成后被忽略）"""
+        results: queue.Queue[str | None] = queue.Queue()
+        backends = (self.offline, self.online)
+        for backend in backends:
+            threading.Thread(target=lambda b=backend: results.put(b.transcribe_pcm(pcm, sample_rate, sample_width)),
+                             name=f"STTRace-{backend.name}", daemon=True).start()
+        for _ in backends:
+            text = results.get()
+            if text:
+                return text
+        return None
+
+
+_stt_backend: STTBackend | None = None
+
+
+def create_stt_backend(name: str) -> STTBackend:
+    """按名称创建语音识别后端：'google'、'vosk'，或选择策略 'offline_first'、'online_first'、'race'"""
+    if name == "google":
+        return GoogleSTTBackend()
+    if name == "vosk":
+        return VoskSTTBackend()
+    if name in PolicySTTBackend.POLICIES:
+        return PolicySTTBackend(VoskSTTBackend(), GoogleSTTBackend(), name)
+    print(f"未知的语音识别后端 {name}，使用 Google 语音识别")
+    return GoogleSTTBackend()
+
+
+def get_stt_backend() -> STTBackend:
+    """获取当前使用的语音识别后端（默认按 config.STT_BACKEND 创建）"""
+    global _stt_backend
+    if _stt_backend is None:
+        _stt_backend = create_stt_backend(config.STT_BACKEND)
+    return _stt_backend
+
+
+def set_stt_backend(backend: STTBackend):
+    """替换语音识别后端（例如测试时使用 ScriptedSTTBackend）"""
+    global _stt_backend
+    _stt_backend = backend
+
+
+def _transcribe_wav(source, backend: STTBackend | None = None) -> str | None:
+    """读取 WAV 文件或字节流中的 PCM 并交给指定后端（默认为当前后端）识别"""
+    with wave.open(source, 'rb') as wav_file:
+        pcm = wav_file.readframes(wav_file.getnframes())
+        sample_rate = wav_file.getframerate()
+        sample_width = wav_file.getsampwidth()
+    return (backend or get_stt_backend()).transcribe_pcm(pcm, sample_rate, sample_width)
 
-def audio_to_text_from_types(audio_wav_buffer: BytesIO):
+
+def audio_to_text_from_file(filepath: str = None, backend: STTBackend | None = None):
+    """
+    从录音文件中读取音频数据并进行语音识别。
+    参数：
+        filepath: 录音文件的路径，默认为 None
+        backend: 使用的语音识别后端，默认为 config.STT_BACKEND 指定的后端
+    返回：
+        text: 识别到的文本或 None
     """
-    直接用音频字节流（如PCM/wav）进行语音识别。
+    return _transcribe_wav(filepath, backend)
+
+def audio_to_text_from_types(audio_wav_buffer: BytesIO, backend: STTBackend | None = None):
+    """
+    直接用音频字节流（wav 格式）进行语音识别。
     参数:
-        audio_bytes: 音频的字节流（如 b''.join(frames) 的结果）
-        sample_rate: 采样率，默认16000
+        audio_wav_buffer: 包含 wav 数据的字节流
+        backend: 使用的语音识别后端，默认为 config.STT_BACKEND 指定的后端
     返回:
         识别到的文本或 None
     """
-    r = sr.Recognizer()
-    # 用 BytesIO 包装字节流，假设为 wav 格式
-    with sr.AudioFile(audio_wav_buffer) as source:
-        audio_data = r.record(source)
+    return _transcribe_wav(audio_wav_buffer, backend)
+
+async def audio_to_text_from_file_async(filepath: str = None):
+    """
+    audio_to_text_from_file 的 asyncio 版本。
+    speech_recognition 的识别请求是阻塞的，这里放到线程池中执行。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, audio_to_text_from_file, filepath)
+
+async def audio_to_text_from_types_async(audio_wav_buffer: BytesIO):
+    """
+    audio_to_text_from_types 的 asyncio 版本。
+    speech_recognition 的识别请求是阻塞的，这里放到线程池中执行。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, audio_to_text_from_types, audio_wav_buffer)
+
+def warm_up_microphone():
+    """在后台打开共享麦克风，选择语音输入时可以立即开始录音（录音模块在后台线程中导入）"""
+    def open_microphone():
         try:
-            text = r.recognize_google(audio_data, language='zh-CN')
-            print(f"识别结果: {text}")
-            return text
-        except sr.UnknownValueError:
-            print("Google 语音识别无法理解音频")
-        except sr.RequestError as e:
-            print(f"无法请求 Google 语音识别服务; {e}")
+            from modules.input_handler import audio_device_manager
+            audio_device_manager.open()
+        except Exception as e:
+            print(f"麦克风预热失败: {e}")
+
+    threading.Thread(target=open_microphone, name="AudioWarmUp", daemon=True).start()
+
+
+_voice_command_listener = None
+
+
+def start_voice_commands():
+    """在后台启动语音指令监听（加载模型和打开麦克风都在后台线程中进行），离线模型不可用时不启动"""
+    def start():
+        global _voice_command_listener
+        from modules.voice_commands import VoiceCommandListener
+
+        listener = VoiceCommandListener()
+        if listener.start():
+            _voice_command_listener = listener
+
+    if not VoskSTTBackend().is_available():
+        print("未安装 Vosk 离线模型，语音指令不可用")
+        return
+    threading.Thread(target=start, name="VoiceCommandsStart", daemon=True).start()
+
+
+def set_voice_commands_active(active: bool):
+    """开始或暂停语音指令监听（未启动时不做任何事）"""
+    if _voice_command_listener is not None:
+        _voice_command_listener.set_active(active)
+
+
+def release_microphone():
+    """停止语音指令监听并关闭共享麦克风（录音模块未被导入时不做任何事）"""
+    if _voice_command_listener is not None:
+        _voice_command_listener.stop()
+    input_handler = sys.modules.get('modules.input_handler')
+    if input_handler is not None:
+        input_handler.audio_device_manager.close()
+
 
 def record_and_transcribe_speech(filename: str = "temp_voice_input.wav",
                                  silence_thresh: int = 15000,
@@ -51,6 +294,8 @@ def record_and_transcribe_speech(filename: str = "temp_voice_input.wav",
     """
     录制语音并转换为文本，支持状态显示
     """
+    from modules.input_handler import AudioRecorder  # 录音依赖 PyAudio，首次录音时才导入
+
     input_handler = AudioRecorder(filename=filename, silence_thresh=silence_thresh, silence_limit=silence_limit)
 
     # 开始录音
@@ -58,6 +303,9 @@ def record_and_transcribe_speech(filename: str = "temp_voice_input.wav",
     if presentation_manager:
         presentation_manager.show_status_screen("正在录音...", "语音输入")
 
+    if config.STREAMING_STT:
+        return _record_and_transcribe_streaming(input_handler, silence_limit, presentation_manager)
+
     # 录制音频
     audio_buffer = input_handler.record_audio()
 
@@ -73,3 +321,37 @@ def record_and_transcribe_speech(filename: str = "temp_voice_input.wav",
     text = audio_to_text_from_types(audio_buffer)
 
     return text
+
+
+# 状态界面上显示的部分识别结果最多保留的字数（只显示末尾部分）
+PARTIAL_DISPLAY_CHARS = 18
+
+
+def _record_and_transcribe_streaming(input_handler, silence_limit: float, presentation_manager=None):
+    """
+    边录音边识别：说话停顿时把已结束的短句交给后台识别，录音结束时通常只剩最后一句需要等待。
+    识别出的部分结果显示在状态界面上。
+    """
+    from modules.streaming_stt import StreamingTranscriber
+
+    transcriber = StreamingTranscriber(get_stt_backend(), input_handler.RATE, end_silence=silence_limit)
+
+    def on_chunk(data: bytes, is_speech: bool) -> bool:
+        # 在录音线程（即界面线程）中更新状态界面
+        transcriber.feed(data, is_speech)
+        partial = transcriber.take_partial()
+        if partial and presentation_manager:
+            shown = partial if len(partial) <= PARTIAL_DISPLAY_CHARS else "…" + partial[-PARTIAL_DISPLAY_CHARS:]
+            presentation_manager.show_status_screen(shown, "语音输入")
+        return not transcriber.utterance_ended
+
+    if not input_handler.record_streaming(on_chunk):
+        transcriber.cancel()
+        print("录音失败")
+        return None
+
+    if transcriber.pending_phrases() and presentation_manager:
+        presentation_manager.show_status_screen("正在转录文本...", "语音识别")
+    text = transcriber.finish()
+    print(f"语音识别完成: {text}")
+    return text
@@ -1,54 +1,226 @@
+import abc
+import asyncio
+import itertools
 import os
+import queue
+import shutil
+import subprocess
+import threading
 import time
-from gtts import gTTS
-import pygame
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 import config
+from modules.asset_cache import ContentCache
+from modules.audio_clips import ClipCache
+from modules.audio_engine import AudioEngine
+from modules.sentence_splitter import split_sentences
+from modules.startup_profiler import startup_profiler
+
+
+class TTSBackend(abc.ABC):
+    '''
+    语音合成后端接口：把文本合成为音频文件。
+    suffix 为生成文件的扩展名，合成失败时抛出异常（由缓存层捕获）。
+    '''
+    name = "base"
+    suffix = ""
+
+    def is_available(self) -> bool:
+        """后端能否使用（例如本地引擎是否已安装）"""
+        return True
+
+    @abc.abstractmethod
+    def synthesize(self, text: str, language: str, slow: bool, output_path: str):
+        """把 text 合成为音频并写入 output_path，失败时抛出异常"""
+
+    def chain(self) -> list['TTSBackend']:
+        """按当前优先顺序依次尝试的后端（单个后端只有自身）"""
+        return [self]
+
+    def ranked(self) -> list['TTSBackend']:
+        """按音质从高到低排列的全部后端，不随在线状态变化（决定可以直接使用哪些后端的缓存）"""
+        return [self]
+
+    def report(self, backend: 'TTSBackend', success: bool, elapsed: float):
+        """记录 chain() 中某个后端的一次合成结果（供选择策略调整顺序）"""
+
+
+class GTTSBackend(TTSBackend):
+    '''Google Text-to-Speech 在线合成（MP3），请求设有超时'''
+    name = "gtts"
+    suffix = ".mp3"
+
+    def __init__(self, timeout: float = config.TTS_NETWORK_TIMEOUT):
+        self.timeout = timeout
+
+    def synthesize(self, text: str, language: str, slow: bool, output_path: str):
+        from gtts import gTTS  # 首次合成语音时才导入
+
+        gTTS(text=text, lang=language, slow=slow, timeout=self.timeout).save(output_path)
+
+
+class EspeakTTSBackend(TTSBackend):
+    '''
+    espeak-ng 本地合成：在设备上直接生成 WAV，不需要网络，合成一页文字通常只需几十毫秒。
+    '''
+    name = "espeak"
+    suffix = ".wav"
+    VOICES = {'zh': 'cmn', 'zh-CN': 'cmn', 'en': 'en'}
+    WORDS_PER_MINUTE = 150
+    SLOW_WORDS_PER_MINUTE = 110
+
+    def __init__(self):
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def is_available(self) -> bool:
+        return self.executable is not None
+
+    def synthesize(self, text: str, language: str, slow: bool, output_path: str):
+        speed = self.SLOW_WORDS_PER_MINUTE if slow else self.WORDS_PER_MINUTE
+        # 文本通过标准输入传入，避免命令行长度和转义问题
+        subprocess.run([self.executable, "-v", self.VOICES.get(language, language), "-s", str(speed),
+                        "-w", output_path, "--stdin"],
+                       input=text.encode('utf-8'), check=True, capture_output=True, timeout=30)
+
+
+class FallbackTTSBackend(TTSBackend):
+    '''
+    在线优先、本地兜底的合成策略：
+    在线合成失败或耗时超过 slow_threshold 秒时，之后 retry_after 秒内直接使用本地引擎，到期后再尝试在线合成。
+    '''
+    name = "auto"
+
+    def __init__(self, online: TTSBackend, local: TTSBackend,
+                 slow_threshold: float = config.TTS_SLOW_NETWORK_SECONDS,
+                 retry_after: float = config.TTS_ONLINE_RETRY_SECONDS):
+        self.online = online
+        self.local = local
+        self.slow_threshold = slow_threshold
+        self.retry_after = retry_after
+        self._online_disabled_until = 0.0
+        self._lock = threading.Lock()
+
+    def chain(self) -> list[TTSBackend]:
+        if not self.local.is_available():
+            return [self.online]
+        with self._lock:
+            online_ok = time.monotonic() >= self._online_disabled_until
+        return [self.online, self.local] if online_ok else [self.local, self.online]
+
+    def ranked(self) -> list[TTSBackend]:
+        return [self.online, self.local]
+
+    def report(self, backend: TTSBackend, success: bool, elapsed: float):
+        """记录一次合成结果：在线合成失败或过慢时暂时改用本地引擎"""
+        if backend is not self.online or (success and elapsed <= self.slow_threshold):
+            return
+        with self._lock:
+            self._online_disabled_until = time.monotonic() + self.retry_after
+        reason = "失败" if not success else f"耗时 {elapsed:.1f} 秒"
+        print(f"在线语音合成{reason}，{self.retry_after:.0f} 秒内改用本地语音合成")
+
+    def synthesize(self, text: str, language: str, slow: bool, output_path: str):
+        """
+        按 chain() 的顺序依次尝试，直到有一个后端合成成功（文件格式取决于成功的后端）。
+        TTSClient 会分别调用各个后端，使不同格式的音频分开缓存；这里供直接使用组合后端的调用方。
+        """
+        error = None
+        for backend in self.chain():
+            if not backend.is_available():
+                continue
+            start = time.monotonic()
+            try:
+                backend.synthesize(text, language, slow, output_path)
+            except Exception as e:
+                self.report(backend, False, time.monotonic() - start)
+                error = e
+                continue
+            self.report(backend, True, time.monotonic() - start)
+            return
+        raise error or RuntimeError("没有可用的语音合成后端")
+
+
+def create_tts_backend(name: str) -> TTSBackend:
+    """按名称创建语音合成后端：'gtts'、'espeak'，或在线优先本地兜底的 'auto'"""
+    if name == "gtts":
+        return GTTSBackend()
+    if name == "espeak":
+        return EspeakTTSBackend()
+    if name == "auto":
+        return FallbackTTSBackend(GTTSBackend(), EspeakTTSBackend())
+    print(f"未知的语音合成后端 {name}，使用 gTTS")
+    return GTTSBackend()
 
 
 class TTSClient:
     """
-    使用 Google Text-to-Speech (gTTS) 的文本转语音客户端
-    支持中文和英文文本转换为音频文件，并提供播放控制功能
+    文本转语音客户端：通过可替换的合成后端（gTTS 在线或 espeak-ng 本地，见 config.TTS_BACKEND）
+    把中文和英文文本转换为音频文件，并提供播放控制功能
     """
 
-    def __init__(self, language='zh', slow=False):
+    def __init__(self, language='zh', slow=False, backend: TTSBackend | None = None):
         """
         初始化 TTS 客户端
 
         Args:
             language: 语言代码，默认为 'zh' (中文)
             slow: 是否慢速播放，默认 False
+            backend: 语音合成后端，默认按 config.TTS_BACKEND 创建
         """
         self.language = language
         self.slow = slow
+        self.backend = backend or create_tts_backend(config.TTS_BACKEND)
         self.audio_dir = config.ASSETS_AUDIO_DIR
 
         # 确保音频目录存在
         os.makedirs(self.audio_dir, exist_ok=True)
 
-        # 初始化 pygame mixer 用于音频播放
-        try:
-            pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
-            self.mixer_initialized = True
-            print("pygame mixer 音频系统初始化成功")
-        except Exception as e:
-            print(f"pygame mixer 初始化失败: {e}")
-            self.mixer_initialized = False
-
-        # 音频播放状态
-        self.current_audio_file = None
-        self.is_playing = False
-        self.is_paused = False
+        # 朗读音频缓存：相同的文本、语言和语速直接复用已合成的音频，离线时也能朗读
+        self.audio_cache = ContentCache(config.AUDIO_CACHE_DIR,
+                                        max_bytes=config.AUDIO_CACHE_MAX_MB * 1024 * 1024,
+                                        name="朗读音频缓存")
+
+        # 音频引擎在自己的线程中初始化并独占 pygame mixer；解码后的朗读音频在翻页时直接播放，相邻页面的音频提前解码
+        self.clips = ClipCache(config.AUDIO_CLIP_CACHE_MB * 1024 * 1024)
+        self.engine = AudioEngine(self.clips)
+        # 逐句朗读时并发合成各句
+        self._synthesis_pool = ThreadPoolExecutor(max_workers=config.TTS_MAX_CONCURRENCY,
+                                                  thread_name_prefix="TTSSynthesis")
+        # 后台朗读请求：每次请求分配一个编号，开始播放前确认仍是最新的请求（读者没有翻走），否则丢弃。
+        # 检查与提交播放命令在同一把锁内完成，不会与界面线程的停止/播放命令交错。
+        # 所有请求由同一个朗读线程按顺序处理，合成前已过时的请求直接跳过
+        self._narration_lock = threading.RLock()
+        self._narration_ids = itertools.count(1)
+        self._current_narration: int | None = None
+        self._narration_queue: queue.Queue[tuple | None] = queue.Queue()
+        self._narration_thread: threading.Thread | None = None
         self.is_muted = False  # 添加静音状态
 
+    @property
+    def mixer_initialized(self) -> bool:
+        return self.engine.mixer_initialized
+
+    @property
+    def is_playing(self) -> bool:
+        return self.engine.is_playing
+
+    @property
+    def is_paused(self) -> bool:
+        return self.engine.is_paused
+
+    @property
+    def current_audio_file(self) -> str | None:
+        return self.engine.current_audio_file
+
     def generate_speech(self, text: str, filename: str = None) -> Optional[str]:
         """
-        将文本转换为语音并保存为 MP3 文件
+        将文本转换为语音并保存为音频文件（格式由合成后端决定）。
+        音频按 (文本, 语言, 语速, 后端) 缓存，命中缓存时不再合成；
+        按 chain() 的顺序尝试各后端，每个后端之前先查它以及音质更好的后端的缓存。
 
         Args:
             text: 要转换的文本
-            filename: 保存的文件名，如果不提供则自动生成
+            filename: 保留参数，仅用于日志；音频统一以内容哈希命名保存在缓存目录中
 
         Returns:
             str: 生成的音频文件路径，失败返回 None
@@ -57,41 +229,55 @@ class TTSClient:
             print("文本为空，无法生成语音")
             return None
 
-        try:
-            # 如果没有提供文件名，则生成一个基于时间戳的文件名
-            if filename is None:
-                timestamp = int(time.time())
-                filename = f"tts_audio_{timestamp}.mp3"
-
-            # 确保文件名以 .mp3 结尾
-            if not filename.endswith('.mp3'):
-                filename += '.mp3'
-
-            audio_path = os.path.join(self.audio_dir, filename)
-
-            print(f"正在生成语音: {text[:50]}...")
-
-            # 创建 gTTS 对象并生成语音
-            tts = gTTS(text=text, lang=self.language, slow=self.slow)
-            tts.save(audio_path)
-
-            print(f"语音文件已保存: {audio_path}")
-            return audio_path
-
-        except Exception as e:
-            print(f"生成语音失败: {e}")
-            return None
+        text = text.strip()
+        ranked = self.backend.ranked()
+        for backend in self.backend.chain():
+            # 只使用不比当前后端差的缓存：在线合成可用时不会一直复用本地引擎的录音，
+            # 本地引擎的缓存只在它排在首位（在线暂停使用）或在线合成失败后才会用到
+            better = ranked[:ranked.index(backend) + 1] if backend in ranked else [backend]
+            for cached_backend in better:
+                cached_path = self.audio_cache.get(self._cache_key(text, cached_backend))
+                if cached_path:
+                    print(f"语音命中缓存{f' ({filename})' if filename else ''}: {text[:50]}...")
+                    return cached_path
+
+            if not backend.is_available():
+                continue
+            print(f"正在生成语音 ({backend.name}): {text[:50]}...")
+            start = time.monotonic()
+            audio_path = self.audio_cache.put(
+                self._cache_key(text, backend),
+                lambda output_path: backend.synthesize(text, self.language, self.slow, output_path),
+                suffix=backend.suffix)
+            self.backend.report(backend, audio_path is not None, time.monotonic() - start)
+            if audio_path:
+                print(f"语音文件已保存: {audio_path}")
+                return audio_path
+
+        print("生成语音失败")
+        return None
+
+    def _cache_key(self, text: str, backend: TTSBackend) -> str:
+        return ContentCache.make_key(text, self.language, self.slow, backend.name)
+
+    async def generate_speech_async(self, text: str, filename: str = None) -> Optional[str]:
+        """
+        generate_speech 的 asyncio 版本。合成后端的调用都是阻塞的（在线请求或本地 espeak 进程），
+        这里放到线程池中执行，事件循环在等待期间可以继续处理其他请求。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.generate_speech, text, filename)
 
     def play_audio(self, audio_path: str, wait_for_completion: bool = False) -> bool:
         """
-        播放指定的音频文件
+        播放指定的音频文件（命令交给音频引擎线程执行，可在任意线程中调用）
 
         Args:
             audio_path: 音频文件路径
             wait_for_completion: 是否等待播放完成
 
         Returns:
-            bool: 播放是否成功开始
+            bool: 播放命令是否已提交
         """
         # 如果处于静音状态，不播放音频
         if self.is_muted:
@@ -106,60 +292,35 @@ class TTSClient:
             print(f"音频文件不存在: {audio_path}")
             return False
 
-        try:
-            # 停止当前播放的音频
-            self.stop_audio()
-
-            # 加载并播放新音频
-            pygame.mixer.music.load(audio_path)
-            pygame.mixer.music.play()
-
-            self.current_audio_file = audio_path
-            self.is_playing = True
-            self.is_paused = False
-
-            print(f"开始播放音频: {os.path.basename(audio_path)}")
-
-            # 如果需要等待播放完成
-            if wait_for_completion:
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
-                self.is_playing = False
-
-            return True
-
-        except Exception as e:
-            print(f"播放音频失败: {e}")
-            return False
+        with self._narration_lock:
+            self._current_narration = None  # 直接播放会取代尚未开始的后台朗读
+            self.engine.play(audio_path)
+        # 如果需要等待播放完成（引擎在朗读结束时通知，不轮询）
+        if wait_for_completion:
+            self.engine.wait_until_finished()
+        return True
 
     def pause_audio(self):
         """暂停音频播放"""
-        if self.mixer_initialized and self.is_playing:
-            pygame.mixer.music.pause()
-            self.is_paused = True
-            print("音频已暂停")
+        self.engine.pause()
 
     def resume_audio(self):
         """恢复音频播放"""
-        if self.mixer_initialized and self.is_paused:
-            pygame.mixer.music.unpause()
-            self.is_paused = False
-            print("音频已恢复播放")
+        self.engine.resume()
 
     def stop_audio(self):
-        """停止音频播放"""
-        if self.mixer_initialized:
-            pygame.mixer.music.stop()
-            self.is_playing = False
-            self.is_paused = False
-            self.current_audio_file = None
-            print("音频已停止")
+        """停止音频播放，并放弃尚未开始的后台朗读"""
+        with self._narration_lock:
+            self._current_narration = None
+            self.engine.stop()
 
     def is_audio_playing(self) -> bool:
         """检查音频是否正在播放"""
-        if self.mixer_initialized:
-            return pygame.mixer.music.get_busy() and not self.is_paused
-        return False
+        return self.is_playing and not self.is_paused
+
+    def preload_clips(self, audio_paths: list[str]):
+        """在后台提前解码即将播放的音频（例如相邻页面），翻页时即可立即开始朗读"""
+        self.engine.preload([path for path in audio_paths if path and os.path.exists(path)])
 
     def generate_and_play(self, text: str, filename: str = None, wait_for_completion: bool = False) -> bool:
         """
@@ -178,11 +339,135 @@ class TTSClient:
             print("当前处于静音状态，跳过音频播放")
             return True
 
+        if config.TTS_STREAMING and len(split_sentences(text or "", config.TTS_SENTENCE_MAX_CHARS)) > 1:
+            return self.generate_and_play_streaming(text, wait_for_completion)
+
         audio_path = self.generate_speech(text, filename)
         if audio_path:
             return self.play_audio(audio_path, wait_for_completion)
         return False
 
+    def request_narration(self, text: str, filename: str = None) -> int | None:
+        """
+        在后台合成并朗读文本，立即返回（界面线程只提交请求，不等待网络合成）。
+        合成完成时如果已有更新的播放请求（翻页、停止或播放其他音频），这次朗读被丢弃。
+
+        Returns:
+            int: 朗读请求编号；静音时不合成，返回 None
+        """
+        if self.is_muted:
+            print("当前处于静音状态，跳过音频播放")
+            return None
+        with self._narration_lock:
+            request_id = next(self._narration_ids)
+            self._current_narration = request_id
+            self.engine.stop()  # 上一页的朗读不再继续
+            self._narration_queue.put((request_id, text, filename))
+            if self._narration_thread is None or not self._narration_thread.is_alive():
+                self._narration_thread = threading.Thread(target=self._narration_worker, name="Narration",
+                                                          daemon=True)
+                self._narration_thread.start()
+        return request_id
+
+    def _narration_worker(self):
+        """朗读线程：按顺序处理朗读请求，快速翻页时积压的过时请求不再合成"""
+        while True:
+            request = self._narration_queue.get()
+            if request is None:
+                return
+            request_id, text, filename = request
+            with self._narration_lock:
+                stale = request_id != self._current_narration
+            if stale:
+                print("页面已切换，跳过过时的朗读请求")
+                continue
+            self._narrate(request_id, text, filename)
+
+    def _narrate(self, request_id: int, text: str, filename: str | None):
+        """合成语音，仍是最新请求时开始播放"""
+        try:
+            if config.TTS_STREAMING and len(split_sentences(text or "", config.TTS_SENTENCE_MAX_CHARS)) > 1:
+                self.generate_and_play_streaming(text, request_id=request_id)
+                return
+            audio_path = self.generate_speech(text, filename)
+            if audio_path:
+                self._start_if_current(request_id, lambda: self.play_audio(audio_path))
+        except Exception as e:
+            print(f"后台朗读失败: {e}")
+
+    def _start_if_current(self, request_id: int | None, start):
+        """
+        朗读请求仍是最新的请求时执行 start() 并返回其结果，否则返回 None。
+        request_id 为 None 表示调用方直接要求播放，总是执行并取代尚未开始的后台朗读。
+        """
+        with self._narration_lock:
+            if request_id is None:
+                self._current_narration = None
+            elif request_id != self._current_narration:
+                print("页面已切换，放弃过时的朗读")
+                return None
+            return start()
+
+    def generate_and_play_streaming(self, text: str, wait_for_completion: bool = False,
+                                    request_id: int | None = None) -> bool:
+        """
+        逐句合成并播放：按句子切分文本，并发合成各句，第一句合成完毕即开始朗读，
+        后续句子按顺序无缝排入混音器。每句的音频单独缓存，再次朗读时直接命中。
+        request_id 为后台朗读请求的编号，第一句合成完毕时请求已过时则不播放。
+
+        Returns:
+            bool: 第一句是否合成成功并开始播放
+        """
+        if self.is_muted:
+            print("当前处于静音状态，跳过音频播放")
+            return True
+        if not self.mixer_initialized:
+            print("音频系统未初始化，无法播放音频")
+            return False
+
+        sentences = split_sentences(text or "", config.TTS_SENTENCE_MAX_CHARS)
+        if not sentences:
+            print("文本为空，无法生成语音")
+            return False
+
+        futures = [self._synthesis_pool.submit(self.generate_speech, sentence) for sentence in sentences]
+        first_path = futures[0].result()
+        if not first_path:
+            for future in futures[1:]:
+                future.cancel()
+            return False
+
+        def start_stream() -> int:
+            stream_id = self.engine.start_stream()
+            self.engine.add_to_stream(stream_id, first_path)
+            return stream_id
+
+        stream_id = self._start_if_current(request_id, start_stream)
+        if stream_id is None:
+            for future in futures[1:]:
+                future.cancel()
+            return False
+        print(f"开始逐句朗读（共 {len(sentences)} 句）")
+
+        def feed_remaining():
+            # 按顺序把合成完的句子交给音频引擎；朗读被停止或取代后不再等待剩余的句子
+            for future in futures[1:]:
+                if self.engine.latest_stream != stream_id:
+                    break
+                audio_path = future.result()
+                if audio_path:
+                    self.engine.add_to_stream(stream_id, audio_path)
+            else:
+                self.engine.end_stream(stream_id)
+                return
+            for future in futures:
+                future.cancel()
+
+        threading.Thread(target=feed_remaining, name="NarrationFeed", daemon=True).start()
+        if wait_for_completion:
+            self.engine.wait_until_finished()
+        return True
+
     def set_mute(self, muted: bool):
         """
         设置静音状态
@@ -191,9 +476,9 @@ class TTSClient:
             muted: True 为静音，False 为取消静音
         """
         self.is_muted = muted
+        self.engine.set_muted(muted)
         if muted:
             # 静音时停止当前播放的音频
-            self.stop_audio()
             print("音频已静音")
         else:
             print("音频已取消静音")
@@ -206,8 +491,8 @@ class TTSClient:
             bool: 当前静音状态
         """
         self.is_muted = not self.is_muted
+        self.engine.set_muted(self.is_muted)
         if self.is_muted:
-            self.stop_audio()
             print("音频已静音")
         else:
             print("音频已取消静音")
@@ -224,11 +509,39 @@ class TTSClient:
 
     def cleanup(self):
         """清理资源"""
-        self.stop_audio()
-        if self.mixer_initialized:
-            pygame.mixer.quit()
-            print("TTS 客户端资源已清理")
+        self._narration_queue.put(None)
+        self.engine.shutdown()
+        self._synthesis_pool.shutdown(wait=False, cancel_futures=True)
+        self.clips.stop()
+        self.audio_cache.print_stats()
+        print("TTS 客户端资源已清理")
+
+
+class _LazyTTSClient:
+    """
+    全局 TTS 客户端的延迟代理：第一次使用时才创建 TTSClient（初始化 pygame.mixer 和音频缓存），
+    导入本模块不再有初始化音频设备的副作用。
+    """
+    def __init__(self):
+        self._client: TTSClient | None = None
+        self._lock = threading.Lock()
+
+    def _get_client(self) -> TTSClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    with startup_profiler.phase("TTS 客户端"):
+                        self._client = TTSClient()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
+
+    def cleanup(self):
+        """从未使用过的客户端无需清理"""
+        if self._client is not None:
+            self._client.cleanup()
 
 
-# 创建全局 TTS 客户端实例
-tts_client = TTSClient()
+# 创建全局 TTS 客户端实例（LAZY_STARTUP 时延迟到首次使用）
+tts_client = _LazyTTSClient() if config.LAZY_STARTUP else TTSClient()
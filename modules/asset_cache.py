@@ -0,0 +1,181 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+
+class ContentCache:
+    '''
+    内容寻址的磁盘缓存：以生成参数的哈希作为键，按总字节数上限进行 LRU 淘汰。
+    索引保存在缓存目录下的 index.json 中，程序重启后缓存依然有效。
+    命中时只在内存中更新最近使用时间，索引在写入新条目、打印统计或程序退出时才写回磁盘（减少 SD 卡写入）。
+    线程安全，可同时被后台生成线程和界面线程使用。
+    '''
+    INDEX_FILENAME = "index.json"
+
+    def __init__(self, cache_dir: str, max_bytes: int, name: str = "缓存"):
+        """
+        cache_dir: 缓存文件所在目录。
+        max_bytes: 缓存文件总大小上限（字节），超出时淘汰最久未使用的条目。
+        name: 用于日志输出的缓存名称。
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.name = name
+
+        # 命中、未命中和淘汰计数，用于调整缓存大小
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        # key -> {'file': 文件名, 'size': 字节数, 'last_access': 时间戳}，按最近使用顺序排列
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._total_bytes = 0
+        self._dirty = False  # 内存中的索引有尚未写回磁盘的修改
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """根据生成参数计算缓存键（SHA-256）"""
+        joined = "\x1f".join(str(part) for part in parts)
+        return hashlib.sha256(joined.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        查找缓存条目。
+        返回: 命中时返回缓存文件路径，否则返回 None。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                path = os.path.join(self.cache_dir, entry['file'])
+                if os.path.exists(path):
+                    entry['last_access'] = time.time()
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self._dirty = True
+                    return path
+                # 文件已被外部删除，移除失效的索引项
+                self._remove_entry(key)
+                self._dirty = True
+            self.misses += 1
+            return None
+
+    def put(self, key: str, writer: typing.Callable[[str], None], suffix: str = "") -> str | None:
+        """
+        将新内容写入缓存。
+        key: 缓存键（通常由 make_key 生成）。
+        writer: 接收目标文件路径并写入内容的函数，例如 PIL.Image.save。
+        suffix: 缓存文件扩展名，例如 '.png'。
+        返回: 缓存文件路径，写入失败时返回 None。
+        """
+        filename = f"{key}{suffix}"
+        path = os.path.join(self.cache_dir, filename)
+        temp_path = os.path.join(self.cache_dir, f".{key}.{threading.get_ident()}.tmp{suffix}")
+
+        try:
+            # 先写入临时文件再原子替换，避免中途失败留下不完整的缓存文件
+            writer(temp_path)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"写入{self.name}失败: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove_entry(key, delete_file=False)
+            self._entries[key] = {'file': filename, 'size': size, 'last_access': time.time()}
+            self._total_bytes += size
+            self._evict()
+            self._save_index()
+        return path
+
+    def stats(self) -> dict:
+        """返回缓存统计信息（命中、未命中、淘汰次数及占用空间）"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def flush(self):
+        """把内存中尚未保存的索引修改（如最近使用时间）写回磁盘"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def print_stats(self):
+        self.flush()
+        stats = self.stats()
+        print(f"{self.name}统计: 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, "
+              f"淘汰 {stats['evictions']} 次, 命中率 {stats['hit_rate']:.0%}, "
+              f"{stats['entries']} 个条目共 {stats['bytes'] / 1024 / 1024:.1f}/{stats['max_bytes'] / 1024 / 1024:.0f} MB")
+
+    def _evict(self):
+        """淘汰最久未使用的条目，直到总大小不超过上限（调用方需持有锁）"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest_key = next(iter(self._entries))
+            self._remove_entry(oldest_key)
+            self.evictions += 1
+
+    def _remove_entry(self, key: str, delete_file: bool = True):
+        """移除索引项并删除对应文件（调用方需持有锁）"""
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry['size']
+        if delete_file:
+            try:
+                os.remove(os.path.join(self.cache_dir, entry['file']))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"删除{self.name}文件 {entry['file']} 失败: {e}")
+
+    def _load_index(self):
+        """从磁盘加载索引，丢弃文件已不存在的条目"""
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        if not os.path.exists(index_path):
+            return
+
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"读取{self.name}索引失败，将重新建立索引: {e}")
+            return
+
+        for key, entry in sorted(entries.items(), key=lambda item: item[1].get('last_access', 0)):
+            if os.path.exists(os.path.join(self.cache_dir, entry.get('file', ''))):
+                self._entries[key] = entry
+                self._total_bytes += entry['size']
+
+        self._evict()
+        print(f"{self.name}已加载: {len(self._entries)} 个条目, {self._total_bytes / 1024 / 1024:.1f} MB")
+
+    def _save_index(self):
+        """原子地将索引写回磁盘（调用方需持有锁）"""
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        temp_path = index_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(temp_path, index_path)
+            self._dirty = False
+        except Exception as e:
+            print(f"保存{self.name}索引失败: {e}")
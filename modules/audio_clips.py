@@ -0,0 +1,102 @@
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+import pygame
+
+
+class ClipCache:
+    '''
+    已解码的朗读音频缓存。
+    每个音频文件只解码一次为 pygame.mixer.Sound（解码时即转换为混音器的采样率和格式），
+    翻页时直接播放内存中的样本；相邻页面的音频在后台线程中提前解码。
+    按解码后的样本字节数限制总内存，超出时淘汰最久未使用的音频。
+    '''
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clips: OrderedDict[str, tuple[pygame.mixer.Sound, int]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._preload_queue: queue.Queue[list[str] | None] = queue.Queue()
+        self._preload_thread: threading.Thread | None = None
+
+    def get(self, path: str) -> pygame.mixer.Sound | None:
+        """获取解码后的音频，未缓存时立即解码；解码失败返回 None"""
+        with self._lock:
+            entry = self._clips.get(path)
+            if entry is not None:
+                self._clips.move_to_end(path)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        return self._load(path)
+
+    def preload(self, paths: list[str]):
+        """在后台解码这些音频（新的请求会取代尚未开始的旧请求）"""
+        paths = [path for path in paths if path]
+        if not paths:
+            return
+        while True:
+            try:
+                self._preload_queue.get_nowait()
+            except queue.Empty:
+                break
+        self._preload_queue.put(paths)
+        if self._preload_thread is None or not self._preload_thread.is_alive():
+            self._preload_thread = threading.Thread(target=self._preload_worker, name="ClipPreload", daemon=True)
+            self._preload_thread.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'clips': len(self._clips), 'bytes': self._total_bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._clips.clear()
+            self._total_bytes = 0
+
+    def stop(self):
+        """结束后台解码线程"""
+        if self._preload_thread is not None and self._preload_thread.is_alive():
+            self._preload_queue.put(None)
+            self._preload_thread.join(timeout=1.0)
+        self._preload_thread = None
+
+    def _load(self, path: str) -> pygame.mixer.Sound | None:
+        if not os.path.exists(path):
+            return None
+        try:
+            sound = pygame.mixer.Sound(path)
+        except Exception as e:
+            print(f"解码音频失败 {os.path.basename(path)}: {e}")
+            return None
+
+        frequency, sample_format, channels = pygame.mixer.get_init()
+        size = int(sound.get_length() * frequency) * channels * (abs(sample_format) // 8)
+        with self._lock:
+            existing = self._clips.get(path)
+            if existing is not None:
+                return existing[0]  # 后台线程已经解码过
+            self._clips[path] = (sound, size)
+            self._total_bytes += size
+            # 淘汰最久未使用的音频，刚解码的这一个始终保留
+            while self._total_bytes > self.max_bytes and len(self._clips) > 1:
+                _, (_, evicted_size) = self._clips.popitem(last=False)
+                self._total_bytes -= evicted_size
+        return sound
+
+    def _preload_worker(self):
+        while True:
+            paths = self._preload_queue.get()
+            if paths is None:
+                return
+            for path in paths:
+                if not self._preload_queue.empty():
+                    break  # 已经翻页，改为处理新的请求
+                with self._lock:
+                    cached = path in self._clips
+                if not cached:
+                    self._load(path)
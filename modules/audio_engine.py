@@ -0,0 +1,334 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import pygame
+
+from modules.audio_clips import ClipCache
+from modules.event_dispatcher import NARRATION_END_EVENT
+
+
+class AudioEngine:
+    '''
+    音频引擎：在自己的线程中独占 pygame.mixer，按顺序执行播放命令。
+    任何线程（界面、后台生成任务）都可以通过命令队列提交 play/stop/pause/resume/mute/preload，
+    播放状态只由引擎线程修改。朗读结束时混音器通过 set_endevent 投递 NARRATION_END_EVENT，
+    界面在事件循环中收到结束通知，不需要轮询播放状态；引擎线程自己按音频时长定时醒来更新状态。
+
+    一段朗读可以由多个片段组成（逐句合成时）：片段陆续到达，引擎用 Channel.queue 预先排入下一个片段，
+    片段之间无缝衔接；只有最后一个片段播放完毕时才投递结束事件。
+    '''
+    # 朗读时长未知（退回 mixer.music 流式播放）时检查播放是否结束的间隔（秒）
+    UNKNOWN_LENGTH_CHECK = 0.5
+    # 片段即将播完但排队的片段尚未开始时，再次检查的间隔（秒）
+    HANDOVER_CHECK = 0.02
+
+    def __init__(self, clips: ClipCache, frequency: int = 22050, channels: int = 2, buffer: int = 512):
+        self.clips = clips
+        self.mixer_initialized = False
+
+        # 以下状态只由引擎线程修改，其他线程只读
+        self.is_playing = False
+        self.is_paused = False
+        self.current_audio_file: str | None = None
+        self.current_stream: int | None = None  # 正在播放的分段朗读编号
+        # 最近一次请求的分段朗读编号（由调用方线程设置，停止或播放其他音频时清空），供合成线程判断是否还需要继续
+        self.latest_stream: int | None = None
+
+        self._mixer_settings = (frequency, channels, buffer)
+        self._commands: queue.Queue[tuple] = queue.Queue()  # (代数, 命令, 参数...)
+        # 命令代数：play/start_stream 每次加一，其他命令沿用当前代数。
+        # 引擎只在处理完最新一代的命令后才标记空闲，之前排队的 stop 等命令不会让等待播放的调用方提前返回
+        self._generation = 0
+        self._handled_generation = 0
+        self._submit_lock = threading.Lock()
+        self._stream_ids = itertools.count(1)
+        self._ready = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._muted = False
+
+        self._channel: pygame.mixer.Channel | None = None
+        self._segments: deque[pygame.mixer.Sound] = deque()  # 已到达但还没交给混音器的片段
+        self._queued: pygame.mixer.Sound | None = None  # 已通过 Channel.queue 排队的片段
+        self._end_event_armed = False  # 当前片段播完时混音器是否会投递结束事件
+        self._stream_complete = True  # 所有片段都已到达
+        self._music_playing = False  # 无法解码时退回 mixer.music 流式播放
+        self._clip_end_time: float | None = None  # 当前片段预计播完的时间（monotonic）
+        self._remaining_when_paused: float | None = None
+
+        self._thread = threading.Thread(target=self._run, name="AudioEngine", daemon=True)
+        self._thread.start()
+        self._ready.wait(5.0)
+
+    # ---------- 可在任意线程中调用 ----------
+
+    def play(self, audio_path: str):
+        """播放音频文件（会先停止正在播放的音频）"""
+        self.latest_stream = None
+        self._submit('play', audio_path, new_generation=True)
+
+    def start_stream(self) -> int:
+        """开始一段分段朗读（会先停止正在播放的音频），返回朗读编号，之后用 add_to_stream 陆续加入片段"""
+        stream_id = next(self._stream_ids)
+        self.latest_stream = stream_id
+        self._submit('stream_start', stream_id, new_generation=True)
+        return stream_id
+
+    def add_to_stream(self, stream_id: int, audio_path: str):
+        """加入下一个片段；朗读已被停止或被新的朗读取代时忽略"""
+        self._submit('stream_add', stream_id, audio_path)
+
+    def end_stream(self, stream_id: int):
+        """所有片段都已加入，最后一个片段播完后朗读结束"""
+        self._submit('stream_end', stream_id)
+
+    def stop(self):
+        self.latest_stream = None
+        self._submit('stop')
+
+    def pause(self):
+        self._submit('pause')
+
+    def resume(self):
+        self._submit('resume')
+
+    def set_muted(self, muted: bool):
+        """静音时停止当前播放，之后的播放命令被忽略"""
+        if muted:
+            self.latest_stream = None
+        self._submit('mute', muted)
+
+    def preload(self, audio_paths: list[str]):
+        """提前解码音频（交给解码缓存的后台线程）"""
+        self._submit('preload', audio_paths)
+
+    def wait_until_finished(self, timeout: float | None = None) -> bool:
+        """阻塞直到当前朗读结束（或被停止），用于需要同步等待的调用方"""
+        return self._idle.wait(timeout)
+
+    def shutdown(self):
+        """停止播放、关闭混音器并结束引擎线程"""
+        if self._thread.is_alive():
+            self._submit('shutdown')
+            self._thread.join(timeout=2.0)
+
+    def _submit(self, command: str, *args, new_generation: bool = False):
+        """提交命令；开始新的播放时先清除空闲标记（加锁保证队列中的顺序与代数一致）"""
+        with self._submit_lock:
+            if new_generation:
+                self._generation += 1
+                self._idle.clear()
+            self._commands.put((self._generation, command, *args))
+
+    # ---------- 引擎线程 ----------
+
+    def _run(self):
+        frequency, channels, buffer = self._mixer_settings
+        try:
+            pygame.mixer.init(frequency=frequency, size=-16, channels=channels, buffer=buffer)
+            pygame.mixer.music.set_endevent(NARRATION_END_EVENT)
+            self.mixer_initialized = True
+            print("pygame mixer 音频系统初始化成功")
+        except Exception as e:
+            print(f"pygame mixer 初始化失败: {e}")
+        finally:
+            self._ready.set()
+
+        while True:
+            try:
+                generation, command, *args = self._commands.get(timeout=self._time_until_next_check())
+            except queue.Empty:
+                self._advance()
+                self._update_idle()
+                continue
+
+            self._handled_generation = generation
+
+            try:
+                if command == 'shutdown':
+                    self._halt()
+                    if self.mixer_initialized:
+                        pygame.mixer.quit()
+                        self.mixer_initialized = False
+                    return
+                if command == 'preload':
+                    if self.mixer_initialized:
+                        self.clips.preload(args[0])
+                elif command == 'mute':
+                    self._muted = args[0]
+                    if self._muted:
+                        self._halt()
+                elif self.mixer_initialized:
+                    getattr(self, f"_do_{command}")(*args)
+            except Exception as e:
+                print(f"音频命令 {command} 执行失败: {e}")
+            finally:
+                self._update_idle()
+
+    def _update_idle(self):
+        """没有在播放、且已处理到最新一代的命令时标记空闲（之后还有排队的播放命令时不标记）"""
+        if not self.is_playing and self._handled_generation == self._generation:
+            self._idle.set()
+
+    def _do_play(self, audio_path: str):
+        self._halt()
+        if self._muted:
+            print("当前处于静音状态，跳过音频播放")
+            return
+        if not os.path.exists(audio_path):
+            print(f"音频文件不存在: {audio_path}")
+            return
+
+        # 播放已解码的音频；无法解码为 Sound 时退回到流式播放
+        sound = self.clips.get(audio_path)
+        self.current_audio_file = audio_path
+        self.is_playing = True
+        if sound is not None:
+            self._segments.append(sound)
+            self._advance()
+        else:
+            pygame.mixer.music.load(audio_path)
+            pygame.mixer.music.play()
+            self._music_playing = True
+        print(f"开始播放音频: {os.path.basename(audio_path)}")
+
+    def _do_stream_start(self, stream_id: int):
+        self._halt()
+        if self._muted:
+            print("当前处于静音状态，跳过音频播放")
+            return
+        self.current_stream = stream_id
+        self._stream_complete = False
+        self.is_playing = True  # 等待第一个片段期间也算正在朗读
+        self.is_paused = False
+
+    def _do_stream_add(self, stream_id: int, audio_path: str):
+        if stream_id != self.current_stream:
+            return  # 已被停止或取代的朗读
+        sound = self.clips.get(audio_path)
+        if sound is None:
+            print(f"跳过无法播放的朗读片段: {audio_path}")
+            return
+        self._segments.append(sound)
+        if not self.is_paused:
+            self._advance()
+
+    def _do_stream_end(self, stream_id: int):
+        if stream_id != self.current_stream:
+            return
+        self._stream_complete = True
+        if not self.is_paused:
+            self._advance()
+
+    def _do_stop(self):
+        if self.is_playing:
+            self._halt()
+            print("音频已停止")
+
+    def _do_pause(self):
+        if self.is_playing and not self.is_paused:
+            pygame.mixer.pause()
+            pygame.mixer.music.pause()
+            if self._clip_end_time is not None:
+                self._remaining_when_paused = max(0.0, self._clip_end_time - time.monotonic())
+            self.is_paused = True
+            print("音频已暂停")
+
+    def _do_resume(self):
+        if self.is_paused:
+            pygame.mixer.unpause()
+            pygame.mixer.music.unpause()
+            if self._remaining_when_paused is not None:
+                self._clip_end_time = time.monotonic() + self._remaining_when_paused
+                self._remaining_when_paused = None
+            self.is_paused = False
+            self._advance()
+            print("音频已恢复播放")
+
+    def _advance(self):
+        """
+        推进播放：当前片段播完时开始下一个片段，排队位空出时用 Channel.queue 排入下一个片段，
+        全部片段播完时结束朗读。只在最后一个片段上设置结束事件，片段之间不会通知界面。
+        """
+        if not self.is_playing or self.is_paused:
+            return
+        if self._music_playing:
+            if not pygame.mixer.music.get_busy():
+                self._finish()
+            return
+
+        now = time.monotonic()
+        channel_busy = self._channel is not None and self._channel.get_busy()
+        if channel_busy and self._queued is not None and self._channel.get_queue() is None:
+            # 排队的片段已经开始播放
+            self._clip_end_time = max(self._clip_end_time or now, now) + self._queued.get_length()
+            self._queued = None
+
+        if not channel_busy:
+            self._queued = None
+            if not self._segments:
+                if self._stream_complete:
+                    if self._channel is not None and not self._end_event_armed:
+                        # 最后一个片段在“全部到达”之前就已播完，结束事件需要手动投递
+                        pygame.event.post(pygame.event.Event(NARRATION_END_EVENT))
+                    self._finish()
+                else:
+                    self._clip_end_time = None  # 等待下一个片段合成完毕
+                return
+            sound = self._segments.popleft()
+            self._channel = sound.play()
+            if self._channel is None:
+                print("没有空闲的音频通道")
+                self._finish()
+                return
+            self._clip_end_time = now + sound.get_length()
+
+        if self._queued is None and self._segments and self._channel.get_queue() is None:
+            self._queued = self._segments.popleft()
+            self._channel.queue(self._queued)
+
+        self._end_event_armed = self._stream_complete and not self._segments and self._queued is None
+        if self._end_event_armed:
+            self._channel.set_endevent(NARRATION_END_EVENT)
+        else:
+            self._channel.set_endevent()
+
+    def _finish(self):
+        """朗读自然结束"""
+        self._channel = None
+        self._queued = None
+        self._end_event_armed = False
+        self._music_playing = False
+        self._clip_end_time = None
+        self.current_audio_file = None
+        self.current_stream = None
+        self._stream_complete = True
+        self.is_playing = False
+
+    def _halt(self):
+        """停止播放并丢弃停止时产生的结束事件（只有自然播放完毕才通知界面）"""
+        self._segments.clear()
+        if self.mixer_initialized:
+            if self._channel is not None:
+                self._channel.set_endevent()
+                self._channel.stop()
+            pygame.mixer.music.stop()
+            # mixer.music 停止时会同步投递结束事件；上一段朗读尚未处理的结束事件也已过时
+            pygame.event.clear(NARRATION_END_EVENT, pump=False)
+        self._remaining_when_paused = None
+        self.is_paused = False
+        self._finish()
+
+    def _time_until_next_check(self) -> float | None:
+        """等待命令的超时时间：正在播放时到当前片段预计播完时醒来，否则一直等待命令"""
+        if not self.is_playing or self.is_paused:
+            return None
+        if self._music_playing:
+            return self.UNKNOWN_LENGTH_CHECK
+        if self._clip_end_time is None:
+            return None  # 等待片段到达（add_to_stream 会唤醒）
+        return max(self.HANDOVER_CHECK, self._clip_end_time - time.monotonic())
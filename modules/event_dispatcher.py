@@ -0,0 +1,70 @@
+import typing
+from collections import deque
+from contextlib import contextmanager
+
+import pygame
+
+# 自定义事件类型（所有界面共用，避免编号冲突）
+PAGE_READY_EVENT = pygame.USEREVENT + 1  # 后台生成的页面就绪（event.page_index 为页面索引）
+CURSOR_BLINK_EVENT = pygame.USEREVENT + 2  # 输入框光标闪烁定时器
+NARRATION_END_EVENT = pygame.USEREVENT + 3  # 朗读音频自然播放完毕（由音频引擎通过 set_endevent 投递）
+VOICE_COMMAND_EVENT = pygame.USEREVENT + 4  # 识别到语音指令（event.action 为对应的翻页动作）
+IDLE_TASK_EVENT = pygame.USEREVENT + 5  # 后台线程提交了空闲任务（只用于唤醒分发器，不交给界面）
+
+# 没有任何事件时阻塞等待的最长时间（毫秒），到时只是重新进入等待
+IDLE_WAKE_MS = 1000
+
+
+class EventDispatcher:
+    '''
+    基于阻塞式 pygame.event.wait(timeout) 的事件分发器。
+    所有等待输入的界面都通过它取事件：线程只在有输入、定时器或后台任务通知（pygame.event.post）时被唤醒，
+    空闲时不占用 CPU，按下按键后也无需等待下一轮轮询即可响应。
+    必须在主线程执行的工作（创建、转换 Surface 等）可由后台线程通过 call_when_idle 提交，
+    分发器在没有待处理事件时逐个执行，输入事件始终优先。
+    '''
+    def __init__(self, idle_timeout_ms: int = IDLE_WAKE_MS):
+        self.idle_timeout_ms = idle_timeout_ms
+        self._idle_tasks: deque[typing.Callable[[], None]] = deque()
+
+    def events(self) -> typing.Iterator[pygame.event.Event]:
+        """逐个返回事件，没有事件时阻塞等待；调用方在得到结果后直接 return 即可结束循环"""
+        while True:
+            if self._idle_tasks:
+                event = pygame.event.poll()
+            else:
+                event = pygame.event.wait(self.idle_timeout_ms)
+            if event.type == pygame.NOEVENT:
+                self._run_idle_task()
+            elif event.type != IDLE_TASK_EVENT:
+                yield event
+
+    def call_when_idle(self, task: typing.Callable[[], None]):
+        """提交一个在主线程空闲时执行的任务（可在后台线程中调用）"""
+        self._idle_tasks.append(task)
+        self.post(IDLE_TASK_EVENT)
+
+    def _run_idle_task(self):
+        try:
+            task = self._idle_tasks.popleft()
+        except IndexError:
+            return
+        try:
+            task()
+        except Exception as e:
+            print(f"空闲任务执行失败: {e}")
+
+    @staticmethod
+    def post(event_type: int, **attributes):
+        """投递自定义事件（可在后台线程中调用），唤醒正在等待的界面"""
+        pygame.event.post(pygame.event.Event(event_type, **attributes))
+
+    @staticmethod
+    @contextmanager
+    def timer(event_type: int, interval_ms: int):
+        """在 with 块内每隔 interval_ms 毫秒投递一次 event_type 事件，退出时停止定时器"""
+        pygame.time.set_timer(event_type, interval_ms)
+        try:
+            yield
+        finally:
+            pygame.time.set_timer(event_type, 0)
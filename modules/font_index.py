@@ -0,0 +1,415 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import typing
+
+import config
+
+if typing.TYPE_CHECKING:
+    from PIL import ImageFont
+
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc', '.otc')
+
+# 常用中文字体（按优先级排序），索引中存在时优先作为主字体
+PREFERRED_FONTS = {
+    'nt': [
+        "C:/Windows/Fonts/msyh.ttc",      # 微软雅黑
+        "C:/Windows/Fonts/simhei.ttf",    # 黑体
+        "C:/Windows/Fonts/simsun.ttc",    # 宋体
+        "C:/Windows/Fonts/simkai.ttf",    # 楷体
+    ],
+    'posix': [
+        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/truetype/noto/NotoSansSC-Regular.ttf",
+        "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+        "/usr/share/fonts/TTF/wqy-zenhei.ttc",
+        "/usr/share/fonts/TTF/wqy-microhei.ttc",
+        # 树莓派可能的路径
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/opt/vc/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+        # 最后才使用英文字体作为后备
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    ],
+}
+
+DEFAULT_FONT_DIRS = {
+    'nt': ["C:/Windows/Fonts"],
+    'posix': ["/usr/share/fonts", "/usr/local/share/fonts", "/opt/vc/share/fonts",
+              os.path.expanduser("~/.fonts"), os.path.expanduser("~/.local/share/fonts")],
+}
+
+
+class FontParseError(ValueError):
+    """字体文件无法解析"""
+
+
+def _table_directory(data: bytes, offset: int) -> dict[bytes, typing.Tuple[int, int]]:
+    """读取 sfnt 表目录: 表名 -> (偏移, 长度)"""
+    num_tables = struct.unpack_from(">H", data, offset + 4)[0]
+    tables = {}
+    for i in range(num_tables):
+        tag, _, table_offset, length = struct.unpack_from(">4sIII", data, offset + 12 + i * 16)
+        tables[tag] = (table_offset, length)
+    return tables
+
+
+def _cmap_ranges(data: bytes, cmap_offset: int) -> list[typing.Tuple[int, int]]:
+    """
+    解析 cmap 表，返回有字形的码位区间列表 [(起始, 结束)]（闭区间）。
+    支持最常用的 format 4（BMP）和 format 12（全部平面）子表。
+    """
+    num_subtables = struct.unpack_from(">H", data, cmap_offset + 2)[0]
+    candidates = {}
+    for i in range(num_subtables):
+        platform_id, encoding_id, offset = struct.unpack_from(">HHI", data, cmap_offset + 4 + i * 8)
+        subtable = cmap_offset + offset
+        subtable_format = struct.unpack_from(">H", data, subtable)[0]
+        if (platform_id, subtable_format) in ((0, 12), (3, 12)) or (platform_id, encoding_id) in ((0, 4), (0, 6)):
+            candidates.setdefault(12 if subtable_format == 12 else subtable_format, subtable)
+        elif subtable_format == 4 and (platform_id == 0 or (platform_id, encoding_id) == (3, 1)):
+            candidates.setdefault(4, subtable)
+
+    if 12 in candidates:
+        subtable = candidates[12]
+        num_groups = struct.unpack_from(">I", data, subtable + 12)[0]
+        ranges = []
+        for i in range(num_groups):
+            start, end, start_glyph = struct.unpack_from(">III", data, subtable + 16 + i * 12)
+            if start_glyph == 0:
+                start += 1  # 映射到 .notdef 的码位视为未覆盖
+            if start <= end:
+                ranges.append((start, end))
+        return ranges
+
+    if 4 in candidates:
+        subtable = candidates[4]
+        seg_count = struct.unpack_from(">H", data, subtable + 6)[0] // 2
+        end_codes = struct.unpack_from(f">{seg_count}H", data, subtable + 14)
+        start_codes = struct.unpack_from(f">{seg_count}H", data, subtable + 16 + seg_count * 2)
+        id_deltas = struct.unpack_from(f">{seg_count}h", data, subtable + 16 + seg_count * 4)
+        range_offsets_at = subtable + 16 + seg_count * 6
+        id_range_offsets = struct.unpack_from(f">{seg_count}H", data, range_offsets_at)
+
+        ranges = []
+        for i in range(seg_count):
+            start, end = start_codes[i], end_codes[i]
+            if start == 0xFFFF:
+                continue
+            if id_range_offsets[i] == 0:
+                # 整段按 idDelta 映射，只有映射到 0 的那一个码位没有字形
+                missing = (-id_deltas[i]) & 0xFFFF
+                if start <= missing <= end:
+                    if start < missing:
+                        ranges.append((start, missing - 1))
+                    if missing < end:
+                        ranges.append((missing + 1, end))
+                else:
+                    ranges.append((start, end))
+                continue
+
+            # 通过 glyphIdArray 映射，逐个码位检查
+            glyph_array_at = range_offsets_at + i * 2 + id_range_offsets[i]
+            run_start = None
+            for code in range(start, end + 1):
+                position = glyph_array_at + (code - start) * 2
+                glyph = struct.unpack_from(">H", data, position)[0] if position + 2 <= len(data) else 0
+                if glyph:
+                    run_start = code if run_start is None else run_start
+                elif run_start is not None:
+                    ranges.append((run_start, code - 1))
+                    run_start = None
+            if run_start is not None:
+                ranges.append((run_start, end))
+        return ranges
+
+    raise FontParseError("没有可用的 Unicode cmap 子表")
+
+
+def _ranges_to_bitmap(ranges: list[typing.Tuple[int, int]]) -> dict[int, int]:
+    """将码位区间转换为覆盖位图：每 256 个码位一块，块号 -> 256 位整数"""
+    blocks: dict[int, int] = {}
+    for start, end in ranges:
+        for block in range(start >> 8, (end >> 8) + 1):
+            low = max(start, block << 8) & 0xFF
+            high = min(end, (block << 8) | 0xFF) & 0xFF
+            blocks[block] = blocks.get(block, 0) | (((1 << (high - low + 1)) - 1) << low)
+    return blocks
+
+
+def parse_font_file(path: str) -> list[dict]:
+    """
+    解析字体文件（TTF/OTF/TTC），返回其中每个字形的索引条目：
+    路径、字形序号、字形数、度量信息（unitsPerEm、上行、下行、行距）、彩色位图尺寸和覆盖位图。
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if data[:4] == b'ttcf':
+        num_fonts = struct.unpack_from(">I", data, 8)[0]
+        face_offsets = struct.unpack_from(f">{num_fonts}I", data, 12)
+    else:
+        face_offsets = (0,)
+
+    faces = []
+    for face_index, offset in enumerate(face_offsets):
+        tables = _table_directory(data, offset)
+        if b'cmap' not in tables:
+            raise FontParseError("缺少 cmap 表")
+
+        units_per_em = struct.unpack_from(">H", data, tables[b'head'][0] + 18)[0] if b'head' in tables else 1000
+        ascender, descender, line_gap = (struct.unpack_from(">hhh", data, tables[b'hhea'][0] + 4)
+                                         if b'hhea' in tables else (0, 0, 0))
+        glyph_count = struct.unpack_from(">H", data, tables[b'maxp'][0] + 4)[0] if b'maxp' in tables else 0
+
+        # 彩色位图字体（如 Noto Color Emoji）只能按内嵌的像素尺寸加载
+        bitmap_sizes = []
+        if b'CBLC' in tables:
+            cblc_offset = tables[b'CBLC'][0]
+            num_sizes = struct.unpack_from(">I", data, cblc_offset + 4)[0]
+            bitmap_sizes = sorted({data[cblc_offset + 8 + i * 48 + 44] for i in range(num_sizes)})
+
+        coverage = _ranges_to_bitmap(_cmap_ranges(data, tables[b'cmap'][0]))
+        faces.append({
+            'path': path,
+            'face_index': face_index,
+            'glyph_count': glyph_count,
+            'units_per_em': units_per_em,
+            'ascender': ascender,
+            'descender': descender,
+            'line_gap': line_gap,
+            'bitmap_sizes': bitmap_sizes,
+            'coverage': coverage,
+        })
+    return faces
+
+
+class FontIndex:
+    '''
+    持久化的系统字体索引。
+    第一次运行时扫描字体目录，解析每个字体的 Unicode 覆盖范围（按 256 码位分块的位图）和度量信息，
+    保存到 config.FONT_INDEX_PATH；之后启动时直接读取索引，只有字体目录发生变化（目录修改时间改变）时才重新扫描。
+    '''
+    def __init__(self, index_path: str = config.FONT_INDEX_PATH, font_dirs: list[str] | None = None):
+        self.index_path = index_path
+        self.font_dirs = font_dirs if font_dirs is not None else DEFAULT_FONT_DIRS.get(os.name, [])
+        self.faces: list[dict] = []
+        self._load_or_scan()
+
+    def covers(self, face: dict, char: str) -> bool:
+        """字体是否包含字符的字形"""
+        codepoint = ord(char)
+        return bool((face['coverage'].get(codepoint >> 8, 0) >> (codepoint & 0xFF)) & 1)
+
+    def find_face(self, path: str, face_index: int = 0) -> dict | None:
+        for face in self.faces:
+            if face['path'] == path and face['face_index'] == face_index:
+                return face
+        return None
+
+    def find_primary_font(self, sample: str = "中") -> str | None:
+        """
+        选择主字体：优先使用常用中文字体列表中第一个覆盖 sample 的字体，
+        其次是覆盖 sample 且字形最多的字体；都没有时返回字形最多的字体。
+        """
+        for path in PREFERRED_FONTS.get(os.name, []):
+            face = self.find_face(path)
+            if face and all(self.covers(face, char) for char in sample):
+                return path
+
+        covering = [face for face in self.faces if all(self.covers(face, char) for char in sample)]
+        candidates = covering or self.faces
+        if not candidates:
+            return None
+        if not covering:
+            print("警告: 未找到支持中文的字体文件，需要安装中文字体")
+        return max(candidates, key=lambda face: face['glyph_count'])['path']
+
+    def fallback_chain(self, primary_path: str | None) -> list[dict]:
+        """后备字体顺序：主字体、常用字体列表中的其他字体，然后按字形数量从多到少排列的其余字体"""
+        preferred = PREFERRED_FONTS.get(os.name, [])
+
+        def priority(face: dict):
+            if face['path'] == primary_path:
+                return (0, 0, face['face_index'])
+            if face['path'] in preferred:
+                return (1, preferred.index(face['path']), face['face_index'])
+            return (2, -face['glyph_count'], face['face_index'])
+
+        return sorted(self.faces, key=priority)
+
+    def _directory_signature(self) -> str:
+        """字体目录及其所有子目录的修改时间摘要，增删字体文件会改变目录的修改时间"""
+        entries = []
+        for font_dir in self.font_dirs:
+            for dirpath, dirnames, _ in os.walk(font_dir):
+                dirnames.sort()
+                try:
+                    entries.append(f"{dirpath}:{os.stat(dirpath).st_mtime_ns}")
+                except OSError:
+                    continue
+        return hashlib.sha256("\n".join(entries).encode('utf-8')).hexdigest()
+
+    def _load_or_scan(self):
+        signature = self._directory_signature()
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('signature') == signature:
+                    self.faces = [self._decode_face(face) for face in index['faces']]
+                    print(f"字体索引已加载: {len(self.faces)} 个字体")
+                    return
+                print("字体目录已变化，重新扫描字体...")
+            except Exception as e:
+                print(f"读取字体索引失败，将重新扫描: {e}")
+
+        self.faces = self._scan()
+        self._save(signature)
+
+    def _scan(self) -> list[dict]:
+        faces = []
+        for font_dir in self.font_dirs:
+            for dirpath, dirnames, filenames in os.walk(font_dir):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if not filename.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(dirpath, filename).replace(os.sep, '/')
+                    try:
+                        faces.extend(parse_font_file(path))
+                    except Exception as e:
+                        print(f"跳过无法解析的字体 {path}: {e}")
+        print(f"字体扫描完成: {len(faces)} 个字体")
+        return faces
+
+    def _save(self, signature: str):
+        temp_path = self.index_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'signature': signature, 'faces': [self._encode_face(face) for face in self.faces]}, f)
+            os.replace(temp_path, self.index_path)
+        except Exception as e:
+            print(f"保存字体索引失败: {e}")
+
+    @staticmethod
+    def _encode_face(face: dict) -> dict:
+        """覆盖位图以 {块号: 十六进制} 的形式保存"""
+        return {**face, 'coverage': {str(block): format(bits, 'x') for block, bits in face['coverage'].items()}}
+
+    @staticmethod
+    def _decode_face(face: dict) -> dict:
+        return {**face, 'coverage': {int(block): int(bits, 16) for block, bits in face['coverage'].items()}}
+
+
+class ScaledBitmapFont:
+    '''
+    只能按固定像素尺寸加载的彩色位图字体（如 Noto Color Emoji）的包装：
+    按内嵌尺寸加载，度量值和渲染结果按比例缩放到目标字号。
+    '''
+    def __init__(self, font: 'ImageFont.FreeTypeFont', scale: float):
+        self.font = font
+        self.scale = scale
+
+    def getlength(self, text: str) -> float:
+        return self.font.getlength(text) * self.scale
+
+    def getbbox(self, text: str) -> typing.Tuple[int, int, int, int]:
+        return tuple(int(round(value * self.scale)) for value in self.font.getbbox(text))
+
+    def getmetrics(self) -> typing.Tuple[int, int]:
+        ascent, descent = self.font.getmetrics()
+        return int(round(ascent * self.scale)), int(round(descent * self.scale))
+
+    def render_glyph(self, char: str, color: tuple):
+        """渲染彩色字形并缩放到目标字号，返回 PIL RGBA 图像（无可见像素时返回 None）"""
+        from PIL import Image, ImageDraw
+
+        left, top, right, bottom = self.font.getbbox(char)
+        if right <= left or bottom <= top:
+            return None
+        image = Image.new('RGBA', (right - left, bottom - top), (255, 255, 255, 0))
+        ImageDraw.Draw(image).text((-left, -top), char, font=self.font, fill=color, embedded_color=True)
+        size = (max(1, int(round(image.width * self.scale))), max(1, int(round(image.height * self.scale))))
+        return image.resize(size, Image.Resampling.LANCZOS)
+
+
+class FontFallback:
+    '''
+    单个字号的逐字符后备字体链：主字体不包含某个字符时，按索引中的覆盖位图依次查找能显示该字符的字体。
+    每个字符的查找结果都会缓存，绘制时不需要额外测量。
+    '''
+    def __init__(self, font_index: FontIndex, primary_font: 'ImageFont.FreeTypeFont', primary_path: str, size: int):
+        self.font_index = font_index
+        self.primary_font = primary_font
+        self.size = size
+        self.chain = font_index.fallback_chain(primary_path)
+        self.primary_face = font_index.find_face(primary_path)
+        self._loaded: dict[tuple, typing.Any] = {}
+        self._resolved: dict[str, typing.Any] = {}
+
+    def font_for(self, char: str):
+        """返回用于绘制 char 的字体（没有任何字体包含该字符时返回主字体）"""
+        font = self._resolved.get(char)
+        if font is not None:
+            return font
+
+        font = self.primary_font
+        if char.isprintable() and not char.isspace() and not (self.primary_face and
+                                                              self.font_index.covers(self.primary_face, char)):
+            for face in self.chain:
+                if face is self.primary_face or not self.font_index.covers(face, char):
+                    continue
+                loaded = self._load(face)
+                if loaded is not None:
+                    font = loaded
+                    break
+        self._resolved[char] = font
+        return font
+
+    def _load(self, face: dict):
+        """按当前字号加载后备字体，加载失败的字体记为不可用"""
+        key = (face['path'], face['face_index'])
+        if key not in self._loaded:
+            from PIL import ImageFont
+
+            try:
+                if face['bitmap_sizes']:
+                    strike = min(face['bitmap_sizes'], key=lambda size: abs(size - self.size))
+                    font = ImageFont.truetype(face['path'], strike, index=face['face_index'])
+                    self._loaded[key] = ScaledBitmapFont(font, self.size / strike)
+                else:
+                    self._loaded[key] = ImageFont.truetype(face['path'], self.size, index=face['face_index'])
+            except Exception as e:
+                print(f"加载后备字体 {face['path']} 失败: {e}")
+                self._loaded[key] = None
+        return self._loaded[key]
+
+
+_font_index: FontIndex | None = None
+_fallbacks: dict[typing.Any, FontFallback] = {}
+_lock = threading.Lock()
+
+
+def get_font_index() -> FontIndex:
+    """获取进程内共享的字体索引（首次调用时加载或扫描）"""
+    global _font_index
+    with _lock:
+        if _font_index is None:
+            _font_index = FontIndex()
+        return _font_index
+
+
+def register_fallback(font: 'ImageFont.FreeTypeFont', font_path: str, size: int):
+    """为已加载的主字体启用后备字体链，之后换行和文字渲染都按字符选择字体"""
+    _fallbacks[font] = FontFallback(get_font_index(), font, font_path, size)
+
+
+def resolve_font(font, char: str):
+    """返回绘制 char 实际使用的字体；未注册后备链的字体直接返回自身"""
+    fallback = _fallbacks.get(font)
+    return fallback.font_for(char) if fallback is not None else font
@@ -1,30 +1,104 @@
-import os
-import shutil
-import time
+import asyncio
 import typing
 
 import config
 from modules.api_clients.image_gen_client import ImageGenClient
+from modules.asset_cache import ContentCache
 from modules.story_generator import StorySegment
 
 
 class ImageGenerator:
     def __init__(self):
         self.image_gen_client = ImageGenClient(api_key=config.GOOGLE_GENAI_API_KEY)
-        # 确保图片输出目录存在
-        os.makedirs(config.ASSETS_IMAGE_DIR, exist_ok=True)
-        # 检查图片输出目录是否为空，不为空则清空
-        self.output_dir = config.ASSETS_IMAGE_DIR
-        if os.path.exists(self.output_dir) and os.listdir(self.output_dir):
-            for filename in os.listdir(self.output_dir):
-                file_path = os.path.join(self.output_dir, filename)
-                try:
-                    if os.path.isfile(file_path) or os.path.islink(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                except Exception as e:
-                    print(f"清空目录时删除 {file_path} 失败: {e}")
+        # 插画缓存：相同的模型、图片提示和角色描述直接复用已生成的图片
+        self.image_cache = ContentCache(config.IMAGE_CACHE_DIR,
+                                        max_bytes=config.IMAGE_CACHE_MAX_MB * 1024 * 1024,
+                                        name="插画缓存")
+
+    def generate_illustration(self, index: int, segment: StorySegment) -> str | None:
+        """
+        为单个故事段落生成插画。
+        参数: index: 段落序号（从 0 开始），用于日志输出。
+              segment: 故事段落，包含 'image_prompt'。
+        返回: 生成图片的文件路径，失败时返回 None。
+        """
+        image_prompt = segment.get('image_prompt', '')
+
+        if not image_prompt:
+            print(f"警告：第 {index + 1} 段故事没有图片提示，跳过图片生成。")
+            return None
+
+        cache_key = self._cache_key(segment)
+        cached_path = self.image_cache.get(cache_key)
+        if cached_path:
+            print(f"第 {index + 1} 段故事的插画命中缓存: {cached_path}")
+            return cached_path
+
+        print(f"正在为第 {index + 1} 段故事生成图片，提示：'{image_prompt[:50]}...'")
+
+        # 调用 image_gen_client 生成图片
+        # 这里将 model_name 从 config 中获取
+        image_gen_text, image = self.image_gen_client.generate_image(
+            prompt_text=image_prompt,
+            model_name=config.GEMINI_IMAGE_GENERATION_MODEL
+        )
+
+        return self._save_to_cache(index, cache_key, image_gen_text, image)
+
+    async def generate_illustration_async(self, index: int, segment: StorySegment) -> str | None:
+        """
+        generate_illustration 的 asyncio 版本，图片请求通过 genai 的 aio 接口发出。
+        参数和返回值与 generate_illustration 相同。
+        """
+        image_prompt = segment.get('image_prompt', '')
+
+        if not image_prompt:
+            print(f"警告：第 {index + 1} 段故事没有图片提示，跳过图片生成。")
+            return None
+
+        # 缓存查找会访问磁盘，放到线程池中执行，避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        cache_key = self._cache_key(segment)
+        cached_path = await loop.run_in_executor(None, self.image_cache.get, cache_key)
+        if cached_path:
+            print(f"第 {index + 1} 段故事的插画命中缓存: {cached_path}")
+            return cached_path
+
+        print(f"正在为第 {index + 1} 段故事异步生成图片，提示：'{image_prompt[:50]}...'")
+
+        image_gen_text, image = await self.image_gen_client.generate_image_async(
+            prompt_text=image_prompt,
+            model_name=config.GEMINI_IMAGE_GENERATION_MODEL
+        )
+
+        # PNG 编码和写盘放到线程池中，避免阻塞事件循环
+        return await loop.run_in_executor(None, self._save_to_cache, index, cache_key, image_gen_text, image)
+
+    @staticmethod
+    def _cache_key(segment: StorySegment) -> str:
+        """插画缓存键：模型名称 + 图片提示 + 角色描述"""
+        return ContentCache.make_key(config.GEMINI_IMAGE_GENERATION_MODEL,
+                                     segment.get('image_prompt', ''),
+                                     segment.get('character_description', ''))
+
+    def _save_to_cache(self, index: int, cache_key: str, image_gen_text: str | None, image) -> str | None:
+        """检查生成结果，并将图片保存到插画缓存"""
+        # --- 检查并处理结果 ---
+        if image_gen_text:
+            print(f"\nGemini 返回的文本内容: '{image_gen_text}'")
+
+        if not image:
+            print("\n!!! 图片生成失败或未返回图片数据。")
+            return None
+
+        print(f"\n=== 第{index}段图片生成成功 ===")
+        # 保存图片到缓存目录
+        filepath = self.image_cache.put(cache_key, image.save, suffix=".png")
+        if filepath:
+            print(f"  图片已保存到: {filepath}")
+        else:
+            print("  ❌ 错误：图片保存失败。")
+        return filepath
 
     def generate_illustrations_for_story(self, story_segments: typing.List[StorySegment]) -> typing.List[
         typing.Tuple[str, str]]:
@@ -38,55 +112,36 @@ class ImageGenerator:
         print(f"\n----- 正在为 {len(story_segments)} 个故事段落生成插画 -----")
 
         for i, segment in enumerate(story_segments):
-            image_prompt = segment.get('image_prompt', '')
             audio_text = segment.get('audio_text', '')  # 提取 audio_text
-            character_description = segment.get('character_description', '')  # 提取角色描述
-
-            if not image_prompt:
-                print(f"警告：第 {i + 1} 段故事没有图片提示，跳过图片生成。")
-                generated_pages_data.append((audio_text, None))
-                continue
-
-            print(f"正在为第 {i + 1} 段故事生成图片，提示：'{image_prompt[:50]}...'")
-
-            # 调用 image_gen_client 生成图片
-            # 这里将 model_name 从 config 中获取
-            image_gen_text, image = self.image_gen_client.generate_image(
-                prompt_text=image_prompt,
-                model_name=config.GEMINI_IMAGE_GENERATION_MODEL
-            )
-
-            # --- 检查并处理结果 ---
-            if image_gen_text:
-                print(f"\nGemini 返回的文本内容: '{image_gen_text}'")
-
-            if image:
-                print(f"\n=== 第{i}段图片生成成功 ===")
-                try:
-                    # 保存图片到文件
-                    os.makedirs(self.output_dir, exist_ok=True)
-                    filename = f"generated_image_{i}.png"
-                    filepath = os.path.join(self.output_dir, filename)
-                    image.save(filepath)
-
-                    # 保存后立即检查； 检查后添加
-                    if os.path.exists(filepath):
-                        print(f"  ✅ 验证成功：文件已在磁盘上找到。")
-                        print(f"  图片已保存到: {filepath}")
-                        generated_pages_data.append((audio_text, filepath))
-                    else:
-                        print(f"  ❌ 错误：save() 命令执行后，文件未在路径 '{filepath}' 中找到。")
-                        generated_pages_data.append((audio_text, None))
-                        print("============================")
-
-                except Exception as e:
-                    print(f"处理或显示图片时发生错误: {e}")
-            else:
-                print("\n!!! 图片生成失败或未返回图片数据。")
-
-
-            # 可以添加一个短暂停顿，避免API请求过于频繁
-            time.sleep(1)
+            # 请求频率由 ImageGenClient 的共享限流器控制，这里无需固定停顿
+            filepath = self.generate_illustration(i, segment)
+            generated_pages_data.append((audio_text, filepath))
+
+        print("\n----- 插画生成完成 -----")
+        self.image_cache.print_stats()
+        return generated_pages_data
+
+    async def generate_illustrations_for_story_async(self,
+                                                     story_segments: typing.List[StorySegment],
+                                                     max_concurrency: int = config.IMAGE_MAX_CONCURRENCY
+                                                     ) -> typing.List[typing.Tuple[str, str]]:
+        """
+        generate_illustrations_for_story 的 asyncio 版本：在一个事件循环中并发请求所有插画，
+        同时进行的请求数不超过 max_concurrency。
+        返回值与 generate_illustrations_for_story 相同，顺序与 story_segments 一致。
+        """
+        print(f"\n----- 正在并发为 {len(story_segments)} 个故事段落生成插画（并发数 {max_concurrency}） -----")
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate_one(i: int, segment: StorySegment):
+            async with semaphore:
+                return segment.get('audio_text', ''), await self.generate_illustration_async(i, segment)
+
+        generated_pages_data = await asyncio.gather(
+            *(generate_one(i, segment) for i, segment in enumerate(story_segments))
+        )
 
         print("\n----- 插画生成完成 -----")
-        return generated_pages_data
\ No newline at end of file
+        self.image_cache.print_stats()
+        return list(generated_pages_data)
@@ -1,108 +1,368 @@
+import atexit
 import os
+import threading
 import time
+import typing
 import wave
 from io import BytesIO
 
 import numpy as np
 import pyaudio
 
+import config
 from config import ASSETS_AUDIO_DIR
+from modules.vad import AdaptiveVAD, FixedThresholdVAD
 
 
-class AudioRecorder:
+class PCMRingBuffer:
+    '''
+    预先分配的 16 位 PCM 环形缓冲区。
+    录音回调线程写入，读取方按绝对采样位置取出数据；written 为累计写入的采样数（只增不减）。
+    内存占用固定，不随录音时长增长；读取方需要在数据被覆盖前（容量对应的时长内）取走数据。
+    '''
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.written = 0
+
+    def reset(self):
+        self.written = 0
+
+    def write(self, samples: np.ndarray):
+        """写入一段采样（超出容量时覆盖最早的数据）"""
+        count = len(samples)
+        if count >= self.capacity:
+            samples = samples[-self.capacity:]
+            count_kept = self.capacity
+        else:
+            count_kept = count
+        start = (self.written + count - count_kept) % self.capacity
+        first = min(count_kept, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:count_kept - first] = samples[first:]
+        # 数据复制完成后再更新写入位置，读取方不会读到未写完的数据
+        self.written += count
+
+    def view(self, start: int, end: int) -> np.ndarray:
+        """
+        取出绝对位置 [start, end) 的采样。
+        数据在缓冲区中连续时直接返回视图（不复制），跨过缓冲区末尾时才拼接。
+        """
+        if start < self.written - self.capacity or end > self.written or start > end:
+            raise IndexError(f"采样区间 [{start}, {end}) 不在缓冲区内")
+        offset = start % self.capacity
+        if offset + (end - start) <= self.capacity:
+            return self.buffer[offset:offset + end - start]
+        return np.concatenate((self.buffer[offset:], self.buffer[:end % self.capacity]))
+
+
+class AudioDeviceManager:
+    '''
+    进程内共享的麦克风管理：PyAudio 只初始化一次，输入流打开后一直保持运行，
+    回调线程持续把数据写入环形缓冲区，因此开始录音时不需要探测设备和打开流，还能取到按下按钮之前的前导音频。
+    设备被拔出或数据中断时关闭并重新初始化 PyAudio（重新枚举设备）后再打开输入流。
+    '''
+    CHANNELS = 1
+    SAMPLE_WIDTH = 2  # 16 位采样
+    STALL_TIMEOUT = 1.0  # 超过该秒数没有收到数据即认为设备中断
+    RECOVERY_TIMEOUT = 3.0  # 重新打开设备最多尝试的总秒数（录音时在界面线程调用，不能长时间阻塞）
+    RECOVERY_BASE_DELAY = 0.25
+
+    def __init__(self, rate: int = config.AUDIO_SAMPLE_RATE, chunk: int = 512,
+                 pre_roll: float = config.AUDIO_PRE_ROLL_SECONDS,
+                 max_duration: float = config.RECORDING_MAX_SECONDS):
+        self.rate = rate
+        self.chunk = chunk
+        self.pre_roll_samples = int(rate * pre_roll)
+        # 缓冲区容纳前导音频、一次最长录音，以及录音结束后调用方处理数据所需的余量
+        self.ring = PCMRingBuffer(int(rate * (pre_roll + max_duration * 2)))
+        self.overflow_count = 0  # 输入溢出（丢失数据）的累计次数
+
+        self._audio = None
+        self._stream = None
+        self._lock = threading.RLock()
+        self._data_ready = threading.Condition()
+        self._last_data_time = 0.0
+
+    def open(self) -> bool:
+        """打开（或确认已打开）输入流，失败时返回 False"""
+        with self._lock:
+            if self._stream is not None:
+                return True
+            try:
+                if self._audio is None:
+                    self._audio = pyaudio.PyAudio()
+                self._last_data_time = time.monotonic()
+                self._stream = self._audio.open(
+                    format=pyaudio.paInt16,
+                    channels=self.CHANNELS,
+                    rate=self.rate,
+                    input=True,
+                    frames_per_buffer=self.chunk,
+                    stream_callback=self._stream_callback
+                )
+                print(f"麦克风已打开: {self.rate} Hz")
+                return True
+            except Exception as e:
+                print(f"录音设备初始化失败: {e}")
+                self._close_locked()
+                return False
+
+    def close(self):
+        """关闭输入流并释放 PyAudio"""
+        with self._lock:
+            self._close_locked()
+
+    def recover(self, timeout: float = RECOVERY_TIMEOUT) -> bool:
+        """
+        设备中断后重新初始化 PyAudio 并打开输入流：在 timeout 秒内退避重试，超时返回 False。
+        退避等待期间不持有锁，其他线程可以继续使用或同时恢复设备。
+        """
+        with self._lock:
+            if not self.is_stalled():
+                return True  # 其他线程刚刚恢复了设备
+            print("录音设备中断，正在重新打开...")
+            self._close_locked()
+
+        deadline = time.monotonic() + timeout
+        delay = self.RECOVERY_BASE_DELAY
+        while not self.open():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print("无法重新打开录音设备")
+                return False
+            time.sleep(min(delay, remaining))
+            delay *= 2
+        return True
+
+    def is_stalled(self) -> bool:
+        """输入流已停止或长时间没有数据"""
+        stream = self._stream
+        if stream is None:
+            return True
+        try:
+            active = stream.is_active()
+        except Exception:
+            active = False
+        return not active or time.monotonic() - self._last_data_time > self.STALL_TIMEOUT
+
+    def recent_start(self) -> int:
+        """包含前导音频的录音起始位置"""
+        return max(0, self.ring.written - self.pre_roll_samples, self.ring.written - self.ring.capacity)
+
+    def wait_for_data(self, position: int, timeout: float) -> int:
+        """
+        等待写入位置达到 position（或超时），返回当前写入位置。
+        录音回调每个块都会通知，这里在条件满足前继续等待，调用方每次醒来都能批量处理到 position 为止的数据。
+        """
+        with self._data_ready:
+            self._data_ready.wait_for(lambda: self.ring.written >= position, timeout)
+        return self.ring.written
+
+    def _stream_callback(self, in_data, frame_count, time_info, status):
+        """PyAudio 录音线程：只复制数据和记录状态，不做任何计算和输出"""
+        if status & pyaudio.paInputOverflow:
+            self.overflow_count += 1
+        self.ring.write(np.frombuffer(in_data, dtype=np.int16))
+        self._last_data_time = time.monotonic()
+        with self._data_ready:
+            self._data_ready.notify_all()
+        return None, pyaudio.paContinue
+
+    def _close_locked(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception as e:
+                print(f"关闭录音流时出错: {e}")
+            self._stream = None
+        if self._audio is not None:
+            try:
+                self._audio.terminate()
+            except Exception as e:
+                print(f"释放 PyAudio 时出错: {e}")
+            self._audio = None
+
 
+# 进程内共享的麦克风（首次使用时才打开设备）
+audio_device_manager = AudioDeviceManager()
+atexit.register(audio_device_manager.close)
+
+
+class AudioRecorder:
+    '''
+    从共享麦克风（AudioDeviceManager）的环形缓冲区中截取一次录音：
+    读取方把新到的块批量交给端点检测（modules.vad）判断人声和说话结束，整段录音以数组视图的形式一次性交给调用方。
+    '''
     def __init__(self,
                  filename: str = "temp_voice_input.wav",
                  silence_thresh: int = 15000,
-                 silence_limit: float = 3.0):
+                 silence_limit: float = 3.0,
+                 max_duration: float = config.RECORDING_MAX_SECONDS,
+                 device: AudioDeviceManager = audio_device_manager):
 
         self.output_path = os.path.join(ASSETS_AUDIO_DIR, filename)
         os.makedirs(ASSETS_AUDIO_DIR, exist_ok=True)
 
         self.silence_thresh = silence_thresh
         self.silence_limit = silence_limit
+        self.max_duration = max_duration
 
-        # 初始化 PyAudio
-        self.audio = pyaudio.PyAudio()
-        self.FORMAT = pyaudio.paInt16
-        self.CHANNELS = 1
-        self.RATE = 44100  # 语音识别常用采样率
-        self.CHUNK = 512  # 每次读取的帧大小
+        self.device = device
+        self.CHANNELS = device.CHANNELS
+        self.RATE = device.rate  # 语音识别常用采样率
+        self.CHUNK = device.chunk  # 每次处理的帧大小
+        self.overflow_count = 0  # 本次录音期间输入溢出（丢失数据）的次数
 
         # 明确禁用摄像头和图片描述功能
         self.camera = None
         print("AudioRecorder initialized. Image input (camera/AI description) is disabled.")
 
-    def __del__(self):
-        if self.audio:
-            self.audio.terminate()
-
     def record_audio(
         self,
         filename: str = "temp_voice_input.wav",
-        silence_thresh: int = 15000,
-        silence_limit: float = 3.0) -> BytesIO | None:
+        silence_thresh: int | None = None,
+        silence_limit: float | None = None,
+        save_to_disk: bool = config.SAVE_VOICE_RECORDINGS) -> BytesIO | None:
         """
 
         :param filename: 录音文件名
-        :param silence_thresh: 静音阈值，单位为音频采样的平均幅度
-        :param silence_limit: 允许的连续静音秒数
-        :return: 录音的字节流数据，如果录音失败则返回 None
+        :param silence_thresh: 静音阈值，单位为音频采样的平均幅度（仅固定阈值模式使用，默认使用构造时的设置）
+        :param silence_limit: 允许的连续静音秒数（仅固定阈值模式使用，默认使用构造时的设置）
+        :param save_to_disk: 是否同时把录音保存到 ASSETS_AUDIO_DIR
+        :return: 录音的 WAV 字节流，如果录音失败则返回 None
         """
-
-        output_path = os.path.join(ASSETS_AUDIO_DIR, filename)
-
-        try:
-            print("开始动态录音...")
-            time.sleep(0.5)
-
-            stream = self.audio.open(
-                format=self.FORMAT,
-                channels=self.CHANNELS,
-                rate=self.RATE,
-                input=True,
-                frames_per_buffer=self.CHUNK
-            )
-        except Exception as e:
-            print(f"录音设备初始化失败: {e}")
+        pcm = self.record_pcm(silence_thresh, silence_limit)
+        if pcm is None:
             return None
 
-        frames = []
-        silent_chunks = 0
-        max_silent_chunks = int(silence_limit * self.RATE / self.CHUNK)
-        while True:
-            data = stream.read(self.CHUNK)
-            frames.append(data)
-            # 计算当前块平均幅度
-            amplitude = np.frombuffer(data, dtype=np.int16)
-            current_volume = np.abs(amplitude).mean()
-            print(f"当前音量: {current_volume:.2f} | 安静阈值：{silence_thresh}")
-            if current_volume < silence_thresh:
-                silent_chunks += 1
-            else:
-                silent_chunks = 0
-            if silent_chunks >= max_silent_chunks:
-                print("检测到长时间静音，停止录音")
-                break
-
-        stream.stop_stream()
-        stream.close()
-
+        # 只编码一次 WAV，需要保存时直接写出同一份字节
         wav_buffer = BytesIO()
-
-        # 保存到文件
-        with wave.open(output_path, 'wb') as wf, wave.open(wav_buffer, 'wb') as wb:
-            self._write_wav_data(wf, frames)
+        with wave.open(wav_buffer, 'wb') as wb:
+            self._write_wav_data(wb, pcm)
+        if save_to_disk:
+            output_path = os.path.join(ASSETS_AUDIO_DIR, filename)
+            with open(output_path, 'wb') as f:
+                f.write(wav_buffer.getbuffer())
             print(f"录音已保存至 {output_path}")
-            self._write_wav_data(wb, frames)
-            print(f"录音数据已保存到内存缓冲区")
         wav_buffer.seek(0)
 
         return wav_buffer
 
-    def _write_wav_data(self, wav_file, frames):
+    def record_pcm(self, silence_thresh: int | None = None, silence_limit: float | None = None) -> np.ndarray | None:
+        """
+        录音直到端点检测判断说话结束（或始终没有开口、达到最长时长），录音包含开始前的前导音频。
+        :return: 录到的 PCM 采样（通常是环形缓冲区的视图，需要保留时请复制），录音失败时返回 None
+        """
+        vad = self._create_vad(silence_thresh, silence_limit)
+
+        def on_frames(frames: np.ndarray, first_sample: int) -> int | None:
+            processed_before = vad.frames
+            vad.feed(frames)
+            if vad.ended:
+                self._report_end(vad)
+                return first_sample + (vad.frames - processed_before) * self.CHUNK
+            return None
+
+        print("开始动态录音...")
+        captured = self._capture(on_frames, self.max_duration)
+        if captured is None:
+            return None
+        return self.device.ring.view(*captured)
+
+    def record_streaming(self, on_chunk, max_duration: float | None = None) -> bool:
+        """
+        边录边交付：每录到一个块就调用 on_chunk(data, is_speech)，is_speech 为端点检测对该块的判断。
+        data 为环形缓冲区的字节 memoryview（不复制），调用方需要在缓冲区被覆盖前使用或复制。
+        :param on_chunk: 回调，返回 False 时停止录音；端点检测判断说话结束时也会停止
+        :param max_duration: 最长录音秒数（不超过构造时的最长时长）
+        :return: 录音是否成功开始
+        """
+        ring = self.device.ring
+        vad = self._create_vad()
+
+        def on_frames(frames: np.ndarray, first_sample: int) -> int | None:
+            processed_before = vad.frames
+            flags = vad.feed(frames)
+            for i in range(vad.frames - processed_before):
+                start = first_sample + i * self.CHUNK
+                chunk = memoryview(ring.view(start, start + self.CHUNK)).cast('B')
+                if not on_chunk(chunk, bool(flags[i])):
+                    return start + self.CHUNK
+            if vad.ended:
+                self._report_end(vad)
+                return first_sample + (vad.frames - processed_before) * self.CHUNK
+            return None
+
+        max_duration = min(max_duration or self.max_duration, self.max_duration)
+        return self._capture(on_frames, max_duration) is not None
+
+    def _create_vad(self, silence_thresh: int | None = None, silence_limit: float | None = None):
+        """创建本次录音的端点检测：默认自适应，config.VAD_ADAPTIVE 关闭时使用固定阈值"""
+        # 录音包含前导音频，端点检测的最长时长相应加长，硬性上限仍由 _capture 保证
+        max_duration = self.max_duration + self.device.pre_roll_samples / self.RATE
+        if config.VAD_ADAPTIVE:
+            return AdaptiveVAD(self.RATE, self.CHUNK, max_duration=max_duration)
+        return FixedThresholdVAD(self.RATE, self.CHUNK,
+                                 silence_thresh=self.silence_thresh if silence_thresh is None else silence_thresh,
+                                 silence_limit=self.silence_limit if silence_limit is None else silence_limit,
+                                 max_duration=max_duration)
+
+    @staticmethod
+    def _report_end(vad):
+        if vad.end_reason == 'silence':
+            print("检测到说话结束，停止录音")
+        elif vad.end_reason == 'no_speech':
+            print("没有检测到说话，停止录音")
+        else:
+            print("已达到最长录音时间，停止录音")
+
+    def _capture(self, on_frames, max_duration: float) -> typing.Tuple[int, int] | None:
+        """
+        从共享输入流的前导音频处开始，每当有新数据时把新到的完整块（形状为 (块数, CHUNK) 的数组视图）
+        交给 on_frames(frames, 首个采样位置)。on_frames 返回停止位置（采样数）时结束录音；
+        达到 max_duration 时也结束。设备中断时尝试重新打开并继续录音。
+        :return: 录音的 (起始位置, 结束位置)，录音设备无法打开时返回 None
+        """
+        device = self.device
+        if not device.open():
+            return None
+
+        ring = device.ring
+        start = position = device.recent_start()
+        max_position = start + device.pre_roll_samples + int(max_duration * self.RATE)
+        overflows_before = device.overflow_count
+        end = None
+        while end is None:
+            written = device.wait_for_data(position + self.CHUNK, 0.1)
+            if written < position + self.CHUNK and device.is_stalled():
+                if not device.recover():
+                    if position == start:
+                        return None
+                    end = position
+                continue
+
+            # 读取方落后超过缓冲区容量时跳过已被覆盖的数据
+            position = max(position, written - ring.capacity + self.CHUNK)
+            chunk_count = (written - position) // self.CHUNK
+            if not chunk_count:
+                continue
+            block = ring.view(position, position + chunk_count * self.CHUNK)
+            end = on_frames(block.reshape(chunk_count, self.CHUNK), position)
+            position += chunk_count * self.CHUNK
+            if end is None and position >= max_position:
+                print("已达到最长录音时间，停止录音")
+                end = position
+
+        self.overflow_count = device.overflow_count - overflows_before
+        if self.overflow_count:
+            print(f"录音期间输入溢出 {self.overflow_count} 次")
+        return start, end
+
+    def _write_wav_data(self, wav_file, pcm: np.ndarray):
         """写入WAV文件数据的通用方法"""
         wav_file.setnchannels(self.CHANNELS)
-        wav_file.setsampwidth(self.audio.get_sample_size(self.FORMAT))
+        wav_file.setsampwidth(AudioDeviceManager.SAMPLE_WIDTH)
         wav_file.setframerate(self.RATE)
-        wav_file.writeframes(b''.join(frames))
\ No newline at end of file
+        wav_file.writeframes(memoryview(pcm).cast('B'))
@@ -1,10 +1,25 @@
+import functools
 import os
+import queue
+import threading
+from collections import OrderedDict
+
 import pygame
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageFont
 import typing
 import time
 from typing import cast, Literal
+
+import config
+from modules.api_clients.stt_client import set_voice_commands_active
 from modules.api_clients.tts_client import tts_client
+from modules.event_dispatcher import (CURSOR_BLINK_EVENT, NARRATION_END_EVENT, PAGE_READY_EVENT, VOICE_COMMAND_EVENT,
+                                      EventDispatcher)
+from modules.font_index import get_font_index, register_fallback
+from modules.startup_profiler import startup_profiler
+from modules.text_layout import wrap_text
+from modules.text_renderer import GlyphAtlasRenderer
+from modules.widgets import Button, ImagePane, Label, Panel, TextInput, WidgetScreen
 
 
 class PresentationManager:
@@ -16,6 +31,9 @@ class PresentationManager:
     支持翻页按钮和键盘输入进行页面翻阅。
     支持图片和文本的智能换行显示。
     '''
+    CURSOR_BLINK_MS = 500  # 输入框光标闪烁间隔（毫秒）
+    POPUP_CACHE_SIZE = 8  # 缓存的弹窗控件树数量
+
     def __init__(self, screen_size: tuple = (800, 480), test_mode: bool = None):
         self.screen_size = screen_size
         self.pygame_initialized = False
@@ -34,6 +52,8 @@ class PresentationManager:
         self.font_path = self._find_chinese_font()
         self.title_font_size = 28
         self.text_font_size = 20
+        self.text_renderer = GlyphAtlasRenderer()  # 文字渲染的字形缓存
+        self.event_dispatcher = EventDispatcher()  # 所有等待输入的界面共用的阻塞式事件分发器
 
         # 初始化按钮相关属性
         self.left_button_rect = None
@@ -46,12 +66,35 @@ class PresentationManager:
         self.back_button_rect = None  # 退出按钮区域
         self.back_button_image = None  # 退出按钮图片
 
+        # 保留模式控件树：各界面只创建一次，之后只重绘发生变化的区域
+        self._active_screen = None  # 当前显示在屏幕上的控件树
+        self._page_screen = None  # 故事页面（整页画面 + 按钮）
+        self._page_pane = None
+        self._mute_pane = None
+        self._main_menu_screen = None
+        self._status_screen = None
+        self._popup_cache: OrderedDict[tuple, typing.Tuple[WidgetScreen, ImagePane, Panel]] = OrderedDict()
+        self._overlay_surface = None  # 弹窗共用的半透明遮罩层
+
+        # 页面表面缓存：(页码, 文本, 图片路径, 是否生成中) -> 绘制好的整页 Surface，仅保留当前页 ±PAGE_CACHE_WINDOW 页
+        self._page_surface_cache: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self._page_cache_lock = threading.Lock()
+        self._prefetch_window: set = set()  # 当前缓存窗口内的页码
+        self._prefetch_queue: queue.Queue = queue.Queue()
+        self._prefetch_thread = None
+
         print(f"初始化模式: {'测试模式' if self.test_mode else '图形模式'}")
 
         if not self.test_mode:
             try:
-                # 初始化 pygame
-                pygame.init()
+                # 初始化 pygame：快速启动时只初始化显示子系统，音频由 TTS 客户端在首次播放时初始化
+                if config.LAZY_STARTUP:
+                    try:
+                        pygame.display.init()
+                    except pygame.error as display_error:
+                        print(f"显示子系统初始化失败: {display_error}")
+                else:
+                    pygame.init()
 
                 # 设置 SDL 视频驱动（树莓派特定优化）
                 if os.name == 'posix':  # Linux/Unix (包括树莓派)
@@ -94,6 +137,7 @@ class PresentationManager:
                 self.font_text = ImageFont.truetype(self.font_path, self.text_font_size)
                 # 加载一个指定路径（self.font_path）的字体文件，并设置字体大小为 self.text_font_size，生成一个字体对象，赋值给 self.font_text。
                 # 这样后续可以用 self.font_text 进行文本渲染，支持中文和自定义字号。
+                self._register_font_fallbacks()
 
                 # 加载按钮图片
                 self._load_button_images()
@@ -116,64 +160,24 @@ class PresentationManager:
             self._init_test_mode()
 
     def _find_chinese_font(self):
-        """查找系统中可用的中文字体"""
-        # 定义可能的字体路径（按优先级排序）
-        font_paths = []
-
-        if os.name == 'nt':  # Windows
-            font_paths = [
-                "C:/Windows/Fonts/msyh.ttc",      # 微软雅黑
-                "C:/Windows/Fonts/simhei.ttf",    # 黑体
-                "C:/Windows/Fonts/simsun.ttc",    # 宋体
-                "C:/Windows/Fonts/simkai.ttf",    # 楷体
-            ]
-        else:  # Linux/Unix (包括树莓派)
-            font_paths = [
-                "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-                "/usr/share/fonts/truetype/noto/NotoSansSC-Regular.ttf",
-                "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-                "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-                "/usr/share/fonts/TTF/wqy-zenhei.ttc",
-                "/usr/share/fonts/TTF/wqy-microhei.ttc",
-                # 树莓派可能的路径
-                "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-                "/opt/vc/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-                # 最后才使用英文字体作为后备
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-            ]
-
-        # 查找第一个存在的字体文件
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                print(f"找到可用字体: {font_path}")
-                # 验证字体是否支持中文
-                if self._test_font_chinese_support(font_path):
-                    return font_path
-                else:
-                    print(f"字体 {font_path} 不支持中文，继续查找...")
-
-        print("警告: 未找到支持中文的字体文件，需要安装中文字体")
-        # 如果都找不到，返回第一个存在的字体（可能不支持中文）
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                print(f"使用后备字体: {font_path}")
-                return font_path
-
-        return None
+        """从持久化的字体索引中查找支持中文的字体（不再逐个加载字体测试）"""
+        try:
+            with startup_profiler.phase("字体索引"):
+                font_path = get_font_index().find_primary_font("中")
+        except Exception as e:
+            print(f"读取字体索引失败: {e}")
+            return None
+        if font_path:
+            print(f"使用字体: {font_path}")
+        return font_path
 
-    def _test_font_chinese_support(self, font_path):
-        """测试字体���否支持中文字符"""
+    def _register_font_fallbacks(self):
+        """为标题和正文字体启用后备字体链，主字体没有的字符（emoji 等）由其他字体绘制"""
         try:
-            test_font = ImageFont.truetype(font_path, 20)
-            # 测试一个简单的中文字符
-            test_char = "中"
-            bbox = test_font.getbbox(test_char)
-            # 如果字体支持中文，bbox应该有合理的尺寸
-            return (bbox[2] - bbox[0]) > 0 and (bbox[3] - bbox[1]) > 0
+            register_fallback(self.font_title, self.font_path, self.title_font_size)
+            register_fallback(self.font_text, self.font_path, self.text_font_size)
         except Exception as e:
-            print(f"测试字体 {font_path} 时出错: {e}")
-            return False
+            print(f"启用后备字体失败: {e}")
 
     def _init_test_mode(self):
         """初始化测试模式"""
@@ -181,6 +185,7 @@ class PresentationManager:
             if self.font_path and os.path.exists(self.font_path):
                 self.font_title = ImageFont.truetype(self.font_path, self.title_font_size)
                 self.font_text = ImageFont.truetype(self.font_path, self.text_font_size)
+                self._register_font_fallbacks()
                 print(f"测试模式: 成功加载字体 {self.font_path}")
             else:
                 raise Exception(f"字体文件不存在: {self.font_path}")
@@ -200,56 +205,17 @@ class PresentationManager:
     @staticmethod
     def _wrap_text_for_display(text: str, font: ImageFont.FreeTypeFont, max_width: int) -> typing.List[str]:
         """
-        根据指定宽度和字体�����������文文本进行智能换行。
-        ���用于中文、英文文本，按字符逐个检查宽度，支持中英文混合。
+        根据指定宽度和字体对文本进行智能换行，支持中英文混合和换行符。
+        使用共享的字符宽度表一次遍历完成，结果按 (文本, 字体, 宽度) 缓存。
         """
-        lines = []
-        if not text:
-            return [""]
-
-        current_line = ""
-
-        for char in text:
-            # 测试添加当前字符后的行宽度
-            test_line = current_line + char
-
-            if font.getlength(test_line) <= max_width:
-                current_line += char
-            else:
-                # 如果当前行不为空，保存当前行
-                if current_line:
-                    lines.append(current_line)
-                    current_line = char
-                else:
-                    # 如果单个字符就超过最大宽度，强制添加
-                    current_line = char
-
-        # 添加最后一行
-        if current_line:
-            lines.append(current_line)
-
-        return lines if lines else [""]
+        return wrap_text(text, font, max_width)
 
     def _render_text_to_surface(self, text: str, font, color: tuple = (0, 0, 0), padding: int = 5) -> pygame.Surface:
-        """将文本渲染为 pygame Surface（通用方法）"""
+        """将文本渲染为 pygame Surface（通用方法），由字形缓存拼接而成"""
         try:
-            # 用指定的字体 font 计算字符串 text 的边界框
-            bbox = font.getbbox(text)
-            text_width = int(bbox[2] - bbox[0] + padding * 2)
-            text_height = int(bbox[3] - bbox[1] + padding * 2)
-
-            text_surface_pil = Image.new('RGBA', (text_width, text_height), (255, 255, 255, 0))
-            ImageDraw.Draw(text_surface_pil).text((padding, padding), text, font=font, fill=color)
-
-            text_surface_pygame = pygame.image.fromstring(
-                text_surface_pil.tobytes(),
-                text_surface_pil.size,
-                'RGBA'
-            ).convert_alpha()
-
-            return text_surface_pygame
+            return self.text_renderer.render(text, font, color, padding)
         except Exception as e:
-            print(f"文本��染失败: {e}")
+            print(f"文本渲染失败: {e}")
             return pygame.Surface((1, 1), pygame.SRCALPHA)
 
     def _check_test_mode_action(self, action_description: str) -> bool:
@@ -259,7 +225,20 @@ class PresentationManager:
             return True
         return False
 
-    def display_story_page(self, page_text: str, image_path: str | None, page_number: int | None = None, audio_path: str | None = None):
+    def notify_page_ready(self, page_index: int):
+        """
+        通知界面某一页已在后台生成完毕（可在任意线程中调用）。
+        page_index: 就绪页面的索引（从 0 开始）。
+        """
+        if not self.pygame_initialized:
+            return
+        try:
+            self.event_dispatcher.post(PAGE_READY_EVENT, page_index=page_index)
+        except pygame.error as e:
+            print(f"投递页面就绪事件失败: {e}")
+
+    def display_story_page(self, page_text: str, image_path: str | None, page_number: int | None = None,
+                           audio_path: str | None = None, pending: bool = False):
         """
         在屏幕上显示一个故事页面（图片和文本），并播放音频。
         根据屏幕尺寸自动判断横屏和竖屏模式：
@@ -270,10 +249,13 @@ class PresentationManager:
         image_path: 插画图片的文件路径。
         page_number: 当前页码 (可选)。
         audio_path: 音频文件路径 (可选)。
+        pending: 页面是否仍在后台生成中。为 True 时在图片区域显示“正在绘制”占位，且不播放音频。
         """
         # 使用新的测试模式检查方法
         if self._check_test_mode_action(f"显示第 {page_number or '?'} 页\n文本: {page_text}\n图片: {image_path}\n音频: {audio_path}"):
-            if image_path and os.path.exists(image_path):
+            if pending:
+                print("页面仍在生成中，显示“正在绘制”占位")
+            elif image_path and os.path.exists(image_path):
                 print(f"图片存在: {image_path}")
             else:
                 print(f"图片不存在或路径为空: {image_path}")
@@ -290,17 +272,30 @@ class PresentationManager:
             print("显示器未初始化，无法呈现内容。")
             return
 
-        # 播放当前页面的音频
-        if audio_path and os.path.exists(audio_path):
+        # 播放当前页面的音频（生成中的页面等就绪后重新显示时再播放）
+        if pending:
+            tts_client.stop_audio()
+        elif audio_path and os.path.exists(audio_path):
             print(f"开始播放第 {page_number or '?'} 页的音频")
             tts_client.play_audio(audio_path)
         elif page_text:
-            # 如果没有预生成的音频文件，实时生成并播放
-            print(f"实时生成第 {page_number or '?'} 页的音频")
-            tts_client.generate_and_play(page_text, f"temp_page_{page_number or 'unknown'}.mp3")
-
-        self.screen.fill((255, 255, 255))
-
+            # 没有预生成的音频文件时在后台合成，合成完毕再开始朗读；届时已翻到其他页面则放弃。
+            # 页面绘制不等待网络合成
+            print(f"后台生成第 {page_number or '?'} 页的音频")
+            tts_client.request_narration(page_text, f"temp_page_{page_number or 'unknown'}.mp3")
+
+        # 整页内容（插画、文字、页码）来自页面表面缓存，命中时翻页只需一次 blit
+        if self._page_screen is None:
+            self._page_screen = self._build_page_screen()
+        self._page_pane.set_image(self._get_page_surface(page_text, image_path, page_number, pending))
+        self._update_mute_button()
+        self._show_screen(self._page_screen)
+
+    def _page_layout(self) -> typing.Tuple[bool, tuple, tuple, tuple]:
+        """
+        计算故事页面的布局（只依赖屏幕尺寸，可在后台线程中调用）。
+        返回: (是否横屏, 图片区域, 文字区域, 插画中心点)。
+        """
         screen_width, screen_height = self.screen_size
         padding_x = 20
         padding_y = 10
@@ -317,6 +312,8 @@ class PresentationManager:
             image_area_rect = (padding_x, padding_y, image_display_width - padding_x, screen_height - 2 * padding_y)
             # 文字区域
             text_area_rect = (image_display_width + padding_x, padding_y, text_display_width - 2 * padding_x, screen_height - 2 * padding_y)
+            # 图片居中显示在左侧区域
+            image_center = (image_area_rect[0] + image_area_rect[2] // 2, screen_height // 2)
         else:
             # 竖屏模式：上下布局，图片在上，文字在下
             image_display_height = int(screen_height * 0.6)
@@ -326,43 +323,62 @@ class PresentationManager:
             image_area_rect = (padding_x, padding_y, screen_width - 2 * padding_x, image_display_height - padding_y)
             # 文字区域
             text_area_rect = (padding_x, image_display_height + padding_y, screen_width - 2 * padding_x, text_display_height - 2 * padding_y)
+            # 图片居中显示在上方区域
+            image_center = (screen_width // 2, image_area_rect[1] + image_area_rect[3] // 2)
+
+        return is_landscape, image_area_rect, text_area_rect, image_center
+
+    @staticmethod
+    def _load_page_image(image_path: str, max_size: typing.Tuple[int, int]) -> typing.Tuple[bytes, tuple, str]:
+        """
+        用 PIL 解码插画并等比缩放到 max_size 以内。
+        只做 PIL 和字节处理，不创建 pygame 对象，可在后台预取线程中调用。
+        返回: (像素数据, 尺寸, 模式)，交给 pygame.image.fromstring 使用。
+        """
+        max_img_width, max_img_height = max_size
+        with Image.open(image_path) as img_pil:
+            img_width, img_height = img_pil.size
+            scale_factor = min(max_img_width / img_width, max_img_height / img_height)
+            new_width = int(img_width * scale_factor)
+            new_height = int(img_height * scale_factor)
+
+            img_pil = img_pil.resize((new_width, new_height),
+                                     Image.Resampling.LANCZOS)
+            return img_pil.tobytes(), img_pil.size, img_pil.mode
+
+    def _compose_page_surface(self, page_text: str, image_path: str | None, page_number: int | None,
+                              pending: bool, prepared_image: typing.Tuple[bytes, tuple, str] | None = None
+                              ) -> pygame.Surface:
+        """
+        将故事页面的插画、文字和页码绘制到一个全屏 Surface 上（不含按钮）。
+        会创建和转换 Surface 并使用共享的字体对象，只能在主线程调用；
+        prepared_image 为后台线程用 _load_page_image 准备好的插画数据，没有时在这里加载。
+        """
+        surface = pygame.Surface(self.screen_size).convert()
+        surface.fill((255, 255, 255))
+
+        screen_width, screen_height = self.screen_size
+        is_landscape, image_area_rect, text_area_rect, image_center = self._page_layout()
 
         # 显示图片
-        if image_path and os.path.exists(image_path):
+        if prepared_image is not None or (image_path and os.path.exists(image_path)):
             try:
-                img_pil = Image.open(image_path)
-                img_width, img_height = img_pil.size
-
-                if is_landscape:
-                    max_img_width = image_area_rect[2]
-                    max_img_height = image_area_rect[3]
-                    # 图片居中显示在左侧区域
-                    img_center_x = image_area_rect[0] + image_area_rect[2] // 2
-                    img_center_y = screen_height // 2
-                else:
-                    max_img_width = image_area_rect[2]
-                    max_img_height = image_area_rect[3]
-                    # 图片居中显示在上方区域
-                    img_center_x = screen_width // 2
-                    img_center_y = image_area_rect[1] + image_area_rect[3] // 2
-
-                scale_factor = min(max_img_width / img_width, max_img_height / img_height)
-                new_width = int(img_width * scale_factor)
-                new_height = int(img_height * scale_factor)
-
-                img_pil = img_pil.resize((new_width, new_height),
-                                         Image.Resampling.LANCZOS)
-                mode = cast(Literal['P', 'RGB', 'RGBX', 'RGBA', 'ARGB'], img_pil.mode)
-                img_pygame = pygame.image.fromstring(img_pil.tobytes(),
-                                                     img_pil.size,
+                if prepared_image is None:
+                    prepared_image = self._load_page_image(image_path, image_area_rect[2:])
+                image_bytes, image_size, image_mode = prepared_image
+                mode = cast(Literal['P', 'RGB', 'RGBX', 'RGBA', 'ARGB'], image_mode)
+                img_pygame = pygame.image.fromstring(image_bytes,
+                                                     image_size,
                                                      mode
                                                      ).convert_alpha()
 
-                img_rect = img_pygame.get_rect(center=(img_center_x, img_center_y))
-                self.screen.blit(img_pygame, img_rect)
+                img_rect = img_pygame.get_rect(center=image_center)
+                surface.blit(img_pygame, img_rect)
 
             except Exception as e:
                 print(f"加载或显示图片 {image_path} 失败: {e}")
+        elif pending:
+            self._draw_pending_placeholder(surface, image_area_rect)
 
         # 显示文字
         if page_text:
@@ -392,7 +408,7 @@ class PresentationManager:
                     text_rect = text_surface_pygame.get_rect(
                         center=(screen_width // 2, current_y + text_surface_pygame.get_height() // 2))
 
-                self.screen.blit(text_surface_pygame, text_rect)
+                surface.blit(text_surface_pygame, text_rect)
                 current_y += text_surface_pygame.get_height() + 5
 
         # 显示页码 - 使用通用方法
@@ -401,86 +417,169 @@ class PresentationManager:
             page_num_surface_pygame = self._render_text_to_surface(page_num_text, self.font_text, (100, 100, 100))
             page_num_rect = page_num_surface_pygame.get_rect(
                 bottomright=(screen_width - 10, screen_height - 10))
-            self.screen.blit(page_num_surface_pygame, page_num_rect)
-
-        # 显示翻页按钮、静音按钮和退出按钮
-        self._draw_page_buttons()
-        self._draw_mute_button()
-        self._draw_back_button()
-
-        pygame.display.flip()
+            surface.blit(page_num_surface_pygame, page_num_rect)
+
+        return surface
+
+    def _get_page_surface(self, page_text: str, image_path: str | None, page_number: int | None,
+                          pending: bool) -> pygame.Surface:
+        """从页面表面缓存中获取页面，未命中时立即绘制并加入缓存"""
+        cache_key = (page_number, page_text, image_path, pending)
+        with self._page_cache_lock:
+            page_surface = self._page_surface_cache.get(cache_key)
+            if page_surface is not None:
+                self._page_surface_cache.move_to_end(cache_key)
+                return page_surface
+
+        page_surface = self._compose_page_surface(page_text, image_path, page_number, pending)
+        self._store_page_surface(cache_key, page_surface)
+        return page_surface
+
+    def _store_page_surface(self, cache_key: tuple, page_surface: pygame.Surface):
+        """加入页面表面缓存，超出窗口容量时淘汰最久未使用的页面"""
+        max_entries = 2 * config.PAGE_CACHE_WINDOW + 1
+        with self._page_cache_lock:
+            self._page_surface_cache[cache_key] = page_surface
+            self._page_surface_cache.move_to_end(cache_key)
+            while len(self._page_surface_cache) > max_entries:
+                self._page_surface_cache.popitem(last=False)
+
+    def prefetch_story_pages(self, current_page_number: int, neighbour_pages: typing.List[tuple]):
+        """
+        设置当前页，并预先绘制相邻页面，使翻页只需一次 blit：
+        插画的解码和缩放在后台线程进行，绘制在主线程等待输入的空闲时间进行。
+        窗口之外的页面表面会被释放，长故事的内存占用保持不变。
 
-    def _draw_mute_button(self):
-        """绘制静音按钮"""
-        if not self.pygame_initialized or not self.mute_button_image or not self.unmute_button_image:
+        current_page_number: 当前页码。
+        neighbour_pages: 相邻页面列表，每项为 (page_text, image_path, page_number, pending)。
+        """
+        if self.test_mode or not self.pygame_initialized:
             return
 
-        screen_width, screen_height = self.screen_size
-        button_margin = 20  # 按钮距离边缘的距离
-
-        # 获取静音按钮尺寸
-        mute_button_size = self.mute_button_image.get_size()
-
-        # 右侧边缘中间位置（静音按钮）
-        mute_x = screen_width - button_margin - mute_button_size[0]
-        mute_y = (screen_height - mute_button_size[1]) // 2  # 垂直居中
-        self.mute_button_rect = pygame.Rect(mute_x, mute_y, mute_button_size[0], mute_button_size[1])
+        window_page_numbers = {current_page_number} | {page[2] for page in neighbour_pages}
+        with self._page_cache_lock:
+            self._prefetch_window = window_page_numbers
+            for cache_key in list(self._page_surface_cache):
+                if cache_key[0] not in window_page_numbers:
+                    del self._page_surface_cache[cache_key]
 
-        # 根据当前静音状态选择显示的图标
-        if tts_client.is_muted_status():
-            self.screen.blit(self.mute_button_image, (mute_x, mute_y))
-        else:
-            self.screen.blit(self.unmute_button_image, (mute_x, mute_y))
-
-    def _draw_page_buttons(self):
-        """绘制翻页按钮"""
-        if not self.pygame_initialized or not self.left_button_image or not self.right_button_image:
-            return
-
-        screen_width, screen_height = self.screen_size
-        button_margin = 20  # 按钮距离边缘的距离
+        # 只保留最新的预取请求，旧请求直接丢弃
+        while not self._prefetch_queue.empty():
+            try:
+                self._prefetch_queue.get_nowait()
+            except queue.Empty:
+                break
+        self._prefetch_queue.put(list(neighbour_pages))
 
-        # 获取按钮尺寸
-        left_button_size = self.left_button_image.get_size()
-        right_button_size = self.right_button_image.get_size()
+        if self._prefetch_thread is None or not self._prefetch_thread.is_alive():
+            self._prefetch_thread = threading.Thread(target=self._prefetch_worker, name="PagePrefetch", daemon=True)
+            self._prefetch_thread.start()
 
-        # 左下角按钮（上一页）
-        left_x = button_margin
-        left_y = screen_height - button_margin - left_button_size[1]
-        self.left_button_rect = pygame.Rect(left_x, left_y, left_button_size[0], left_button_size[1])
+    def _prefetch_worker(self):
+        """
+        后台线程：为尚未缓存的相邻页面解码、缩放插画。
+        Surface 的创建和转换以及文字渲染都不是线程安全的，交给主线程在空闲时完成（_finish_prefetched_page）。
+        """
+        while True:
+            pages = self._prefetch_queue.get()
+            if pages is None:
+                return
+            image_size = self._page_layout()[1][2:]
+            for page_text, image_path, page_number, pending in pages:
+                if not self._prefetch_queue.empty():
+                    break  # 用户已经翻到别的页面，处理新的预取请求
+                cache_key = (page_number, page_text, image_path, pending)
+                with self._page_cache_lock:
+                    if cache_key in self._page_surface_cache:
+                        continue
+                prepared_image = None
+                if image_path and os.path.exists(image_path):
+                    try:
+                        prepared_image = self._load_page_image(image_path, image_size)
+                    except Exception as e:
+                        print(f"预取第 {page_number} 页的插画失败: {e}")
+                        continue
+                self.event_dispatcher.call_when_idle(
+                    functools.partial(self._finish_prefetched_page, cache_key, prepared_image))
+
+    def _finish_prefetched_page(self, cache_key: tuple, prepared_image: typing.Tuple[bytes, tuple, str] | None):
+        """主线程空闲时：用预取线程准备好的插画绘制页面并加入缓存（已缓存或已移出窗口的页面跳过）"""
+        page_number, page_text, image_path, pending = cache_key
+        with self._page_cache_lock:
+            if cache_key in self._page_surface_cache or page_number not in self._prefetch_window:
+                return
+        try:
+            page_surface = self._compose_page_surface(page_text, image_path, page_number, pending, prepared_image)
+            self._store_page_surface(cache_key, page_surface)
+        except Exception as e:
+            print(f"预取第 {page_number} 页失败: {e}")
 
-        # 右下角按钮（下一页）
-        right_x = screen_width - button_margin - right_button_size[0]
-        right_y = screen_height - button_margin - right_button_size[1]
-        self.right_button_rect = pygame.Rect(right_x, right_y, right_button_size[0], right_button_size[1])
+    def _draw_pending_placeholder(self, surface: pygame.Surface, area_rect: tuple):
+        """在图片区域绘制“正在绘制插画”的占位框"""
+        placeholder_rect = pygame.Rect(area_rect)
+        pygame.draw.rect(surface, (240, 240, 240), placeholder_rect, border_radius=12)
+        pygame.draw.rect(surface, (200, 200, 200), placeholder_rect, 2, border_radius=12)
 
-        # 绘制按钮
-        self.screen.blit(self.left_button_image, (left_x, left_y))
-        self.screen.blit(self.right_button_image, (right_x, right_y))
+        hint_surface = self._render_text_to_surface("插画还在绘制中…", self.font_title, (150, 150, 150))
+        hint_rect = hint_surface.get_rect(center=placeholder_rect.center)
+        surface.blit(hint_surface, hint_rect)
 
-    def _draw_back_button(self):
-        """绘制退出按钮"""
-        if not self.pygame_initialized or not self.back_button_image:
-            return
+    def _show_screen(self, widget_screen: WidgetScreen, full: bool = False):
+        """
+        将控件树提交到屏幕：切换到新界面时整屏刷新，否则只刷新发生变化的区域。
+        """
+        widget_screen.present(self.screen, full=full or self._active_screen is not widget_screen)
+        self._active_screen = widget_screen
 
+    def _build_page_screen(self) -> WidgetScreen:
+        """创建故事页面的控件树：整页画面 + 翻页按钮、静音按钮和退出按钮"""
         screen_width, screen_height = self.screen_size
         button_margin = 20  # 按钮距离边缘的距离
 
-        # 获取退出按钮尺寸
-        back_button_size = self.back_button_image.get_size()
-
-        # 左上角位置（退出按钮）
-        back_x = button_margin
-        back_y = button_margin
-        self.back_button_rect = pygame.Rect(back_x, back_y, back_button_size[0], back_button_size[1])
-
-        # 绘制按钮
-        self.screen.blit(self.back_button_image, (back_x, back_y))
-
-    def wait_for_page_flip_input(self) -> str | None:
+        page_screen = WidgetScreen(self.screen_size, background=None)
+        self._page_pane = page_screen.add(ImagePane((0, 0, screen_width, screen_height), None))
+
+        if self.left_button_image and self.right_button_image:
+            left_width, left_height = self.left_button_image.get_size()
+            right_width, right_height = self.right_button_image.get_size()
+
+            # 左下角按钮（上一页）、右下角按钮（下一页）
+            self.left_button_rect = pygame.Rect(button_margin, screen_height - button_margin - left_height,
+                                                left_width, left_height)
+            self.right_button_rect = pygame.Rect(screen_width - button_margin - right_width,
+                                                 screen_height - button_margin - right_height,
+                                                 right_width, right_height)
+            page_screen.add(ImagePane(self.left_button_rect, self.left_button_image))
+            page_screen.add(ImagePane(self.right_button_rect, self.right_button_image))
+
+        if self.mute_button_image and self.unmute_button_image:
+            # 右侧边缘中间位置（静音按钮）
+            mute_width, mute_height = self.mute_button_image.get_size()
+            self.mute_button_rect = pygame.Rect(screen_width - button_margin - mute_width,
+                                                (screen_height - mute_height) // 2,
+                                                mute_width, mute_height)
+            self._mute_pane = page_screen.add(ImagePane(self.mute_button_rect, None))
+
+        if self.back_button_image:
+            # 左上角位置（退出按钮）
+            back_width, back_height = self.back_button_image.get_size()
+            self.back_button_rect = pygame.Rect(button_margin, button_margin, back_width, back_height)
+            page_screen.add(ImagePane(self.back_button_rect, self.back_button_image))
+
+        return page_screen
+
+    def _update_mute_button(self):
+        """根据当前静音状态更新静音按钮的图标（只标记按钮区域需要重绘）"""
+        if self._mute_pane is not None:
+            self._mute_pane.set_image(self.mute_button_image if tts_client.is_muted_status()
+                                      else self.unmute_button_image)
+
+    def wait_for_page_flip_input(self, auto_advance: bool = config.AUTO_ADVANCE) -> str | None:
         """
-        等待用户进行翻页输入（键盘方向键或鼠标点击按钮）。
-        返回: 'next' (下一页), 'prev' (上一页), 'scroll_up' (向上滚动), 'scroll_down' (向下滚动), 'quit' (退出) 或 None (无有效输入)。
+        等待用户进行翻页输入（键盘方向键、鼠标点击按钮，或语音指令“下一页”“上一页”“退出”“静音”）。
+        auto_advance: 为 True 时当前页朗读完毕即自动翻到下一页（由音频引擎的结束事件唤醒，不额外占用 CPU）。
+        返回: 'next' (下一页), 'prev' (上一页), 'scroll_up' (向上滚动), 'scroll_down' (向下滚动), 'quit' (退出),
+              'page_ready' (后台有页面生成完毕) 或 None (无有效输入)。
         """
         if self.test_mode:
             # 测试模式：模拟用户输入
@@ -497,69 +596,101 @@ class PresentationManager:
             return None
 
         print("等待翻页输入：←/→ (左右翻页), ↑/↓ (上下滚动), Q (退出), 或点击屏幕按钮")
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return 'quit'  # 应用程序关闭事件
-
-                # 处理键盘输入
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RIGHT:
-                        print("检测到 -> (右翻页)")
-                        return 'next'
-                    elif event.key == pygame.K_LEFT:
-                        print("检测到 <- (左翻页)")
-                        return 'prev'
-                    elif event.key == pygame.K_UP:
-                        print("检测到 ↑ (向上滚���)")
-                        return 'scroll_up'
-                    elif event.key == pygame.K_DOWN:
-                        print("检测到 ↓ (向下滚动)")
-                        return 'scroll_down'
-                    elif event.key == pygame.K_q:
-                        print("检测到 Q (退出)")
-                        return 'quit'
-                    elif event.key == pygame.K_ESCAPE:  # 添加 ESC 键退出
-                        print("检测到 ESC (退出)")
-                        return 'quit'
+        # 只在等待翻页时监听语音指令
+        set_voice_commands_active(True)
+        try:
+            return self._wait_for_page_flip_event(auto_advance)
+        finally:
+            set_voice_commands_active(False)
+
+    def _wait_for_page_flip_event(self, auto_advance: bool) -> str | None:
+        for event in self.event_dispatcher.events():
+            if event.type == pygame.QUIT:
+                return 'quit'  # 应用程序关闭事件
+
+            # 后台页面生成完毕
+            if event.type == PAGE_READY_EVENT:
+                return 'page_ready'
+
+            # 当前页朗读完毕（只有自然播放结束才会收到）
+            if event.type == NARRATION_END_EVENT and auto_advance:
+                print("朗读结束，自动翻到下一页")
+                return 'next'
+
+            # 语音指令（由语音指令监听线程投递）
+            if event.type == VOICE_COMMAND_EVENT:
+                print(f"检测到语音指令 ({event.action})")
+                if event.action == 'mute_toggle':
+                    self._toggle_mute()
+                return event.action
+
+            # 处理键盘输入
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_RIGHT:
+                    print("检测到 -> (右翻页)")
+                    return 'next'
+                elif event.key == pygame.K_LEFT:
+                    print("检测到 <- (左翻页)")
+                    return 'prev'
+                elif event.key == pygame.K_UP:
+                    print("检测到 ↑ (向上滚���)")
+                    return 'scroll_up'
+                elif event.key == pygame.K_DOWN:
+                    print("检测到 ↓ (向下滚动)")
+                    return 'scroll_down'
+                elif event.key == pygame.K_q:
+                    print("检测到 Q (退出)")
+                    return 'quit'
+                elif event.key == pygame.K_ESCAPE:  # 添加 ESC 键退出
+                    print("检测到 ESC (退出)")
+                    return 'quit'
 
-                # 处理鼠标点击
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:  # 左键点击
-                        mouse_pos = event.pos
+            # 处理鼠标点击
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:  # 左键点击
+                    mouse_pos = event.pos
 
-                        # 检查是否点击了左按钮（上一页）
-                        if self.left_button_rect and self.left_button_rect.collidepoint(mouse_pos):
-                            print("检测到点击左按钮 (上一页)")
-                            return 'prev'
+                    # 检查是否点击了左按钮（上一页）
+                    if self.left_button_rect and self.left_button_rect.collidepoint(mouse_pos):
+                        print("检测到点击左按钮 (上一页)")
+                        return 'prev'
 
-                        # 检查是否点击了右按钮（下一页）
-                        if self.right_button_rect and self.right_button_rect.collidepoint(mouse_pos):
-                            print("检测到点击右按钮 (下一页)")
-                            return 'next'
+                    # 检查是否点击了右按钮（下一页）
+                    if self.right_button_rect and self.right_button_rect.collidepoint(mouse_pos):
+                        print("检测到点击右按钮 (下一页)")
+                        return 'next'
 
-                        # 检查是否点击了静音按钮
-                        if self.mute_button_rect and self.mute_button_rect.collidepoint(mouse_pos):
-                            # 切换静音状态
-                            is_muted = tts_client.toggle_mute()
-                            print(f"检测到点击静音按钮 ({'静音' if is_muted else '取消静音'})")
-                            # 重新绘制当前页面以更新静音按钮图标
-                            return 'mute_toggle'
+                    # 检查是否点击了静音按钮
+                    if self.mute_button_rect and self.mute_button_rect.collidepoint(mouse_pos):
+                        is_muted = self._toggle_mute()
+                        print(f"检测到点击静音按钮 ({'静音' if is_muted else '取消静音'})")
+                        return 'mute_toggle'
 
-                        # 检查是否点击了退出按钮
-                        if self.back_button_rect and self.back_button_rect.collidepoint(mouse_pos):
-                            print("检测到点击退出按钮")
-                            return 'quit'
+                    # 检查是否点击了退出按钮
+                    if self.back_button_rect and self.back_button_rect.collidepoint(mouse_pos):
+                        print("检测到点击退出按钮")
+                        return 'quit'
 
-                        # 如果点击了其他区域，可以添加其他交互逻辑
-                        print(f"检测到鼠标点击位置: {mouse_pos}")
+                    # 如果点击了其他区域，可以添加其他交互逻辑
+                    print(f"检测到鼠标点击位置: {mouse_pos}")
 
-            time.sleep(0.1)  # 减少CPU占用
+    def _toggle_mute(self) -> bool:
+        """切换静音状态，只重绘静音按钮所在的区域，页面其余部分保持不变"""
+        is_muted = tts_client.toggle_mute()
+        self._update_mute_button()
+        if self._page_screen is not None:
+            self._show_screen(self._page_screen)
+        return is_muted
 
     def cleanup(self):
         """
         处理 Pygame 资源。
         """
+        if self._prefetch_thread is not None and self._prefetch_thread.is_alive():
+            self._prefetch_queue.put(None)
+            self._prefetch_thread.join(timeout=1)
+        with self._page_cache_lock:
+            self._page_surface_cache.clear()
         if self.pygame_initialized and self.screen:
             pygame.quit()
         print("Pygame display cleaned up.")
@@ -770,76 +901,15 @@ class PresentationManager:
             print("显示器未初始化，无法显示弹窗。")
             return buttons[0]["value"]
 
-        screen_width, screen_height = self.screen_size
-
-        # 计算弹窗位置（居中）
-        popup_x = (screen_width - popup_width) // 2
-        popup_y = (screen_height - popup_height) // 2
-
-        # 创建半透明遮罩层
-        overlay = pygame.Surface((screen_width, screen_height), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))  # 半透明黑色
-
-        # 绘制弹窗背景
-        popup_surface = pygame.Surface((popup_width, popup_height), pygame.SRCALPHA)
-        pygame.draw.rect(popup_surface, (255, 255, 255), (0, 0, popup_width, popup_height))
-        pygame.draw.rect(popup_surface, (100, 100, 100), (0, 0, popup_width, popup_height), 2)
-
-        # 渲染标题 - 使用通用方法
-        title_surface = self._render_text_to_surface(title, self.font_title, (50, 50, 50))
-        title_rect = title_surface.get_rect(center=(popup_width // 2, 30))
-        popup_surface.blit(title_surface, title_rect)
-
-        # 渲染消息内容 - 使用通用方法和智能换行
-        wrapped_message_lines = self._wrap_text_for_display(message, self.font_text, popup_width - 40)
-        message_start_y = 70
-        line_height = 25
-
-        for i, line in enumerate(wrapped_message_lines):
-            line_surface = self._render_text_to_surface(line, self.font_text)
-            line_rect = line_surface.get_rect(center=(popup_width // 2, message_start_y + i * line_height))
-            popup_surface.blit(line_surface, line_rect)
-
-        # 创建按钮 - 支持多按钮布局
-        button_width = max(80, popup_width // (len(buttons) + 1))  # 动态计算按钮宽度
-        button_height = 35
-        button_y = popup_height - 60
-        button_rects = []
-
-        # 计算按钮总宽度和间距
-        total_button_width = len(buttons) * button_width
-        button_spacing = 15
-        total_spacing = (len(buttons) - 1) * button_spacing
-        buttons_area_width = total_button_width + total_spacing
-
-        # 按钮起始位置（居中）
-        start_x = (popup_width - buttons_area_width) // 2
-
-        for i, button_config in enumerate(buttons):
-            button_x = start_x + i * (button_width + button_spacing)
-            button_rect = pygame.Rect(button_x, button_y, button_width, button_height)
-            button_rects.append((button_rect, button_config))
-
-            # 绘制按钮背景
-            button_color = button_config.get("color", (70, 130, 180))
-            pygame.draw.rect(popup_surface, button_color, button_rect)
-            pygame.draw.rect(popup_surface, (50, 50, 50), button_rect, 2)
-
-            # 渲染按钮文本 - 使用通用方法
-            button_text_surface = self._render_text_to_surface(
-                button_config["text"], self.font_text, (255, 255, 255), padding=0
-            )
-            button_text_rect = button_text_surface.get_rect(center=button_rect.center)
-            popup_surface.blit(button_text_surface, button_text_rect)
-
-        # 显示弹窗
-        self.screen.blit(overlay, (0, 0))
-        self.screen.blit(popup_surface, (popup_x, popup_y))
-        pygame.display.flip()
+        popup_screen, background_pane, popup_panel = self._get_popup_screen(message, title, buttons,
+                                                                            popup_width, popup_height)
+        # 弹窗下方显示打开弹窗前的画面
+        background_pane.set_image(self.screen.copy())
+        self._show_screen(popup_screen, full=True)
 
         # 等待用户交互
-        while True:
-            for event in pygame.event.get():
+        try:
+            for event in self.event_dispatcher.events():
                 if event.type == pygame.QUIT:
                     return "quit"
 
@@ -858,20 +928,88 @@ class PresentationManager:
 
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:  # 左键点击
-                        mouse_pos = event.pos
-                        # 转换鼠标坐标到弹窗坐标系
-                        relative_pos = (mouse_pos[0] - popup_x, mouse_pos[1] - popup_y)
-
-                        # 检查���否点击了某个按钮
-                        for button_rect, button_config in button_rects:
-                            if button_rect.collidepoint(relative_pos):
-                                return button_config["value"]
+                        # 检查是否点击了某个按钮
+                        value = popup_screen.find_value_at(event.pos)
+                        if value is not None:
+                            return value
 
                         # 点击弹窗外部区域关闭弹窗（返回第一个按钮值）
-                        if not (0 <= relative_pos[0] <= popup_width and 0 <= relative_pos[1] <= popup_height):
+                        if not popup_panel.absolute_rect().collidepoint(event.pos):
                             return buttons[0]["value"]
+        finally:
+            # 弹窗控件树会被缓存复用，关闭后释放背景画面的副本
+            background_pane.set_image(None)
+
+    def _get_overlay_surface(self) -> pygame.Surface:
+        """弹窗共用的全屏半透明遮罩层（只创建一次）"""
+        if self._overlay_surface is None:
+            self._overlay_surface = pygame.Surface(self.screen_size, pygame.SRCALPHA)
+            self._overlay_surface.fill((0, 0, 0, 128))  # 半透明黑色
+        return self._overlay_surface
+
+    def _build_dialog_screen(self, message: str, title: str, popup_width: int,
+                             popup_height: int) -> typing.Tuple[WidgetScreen, ImagePane, Panel]:
+        """
+        创建对话框控件树：背景画面 + 半透明遮罩 + 居中的对话框（标题和换行后的消息）。
+        返回: (控件树, 背景画面控件, 对话框面板)。
+        """
+        screen_width, screen_height = self.screen_size
+
+        dialog_screen = WidgetScreen(self.screen_size, background=None)
+        background_pane = dialog_screen.add(ImagePane((0, 0, screen_width, screen_height), None))
+        dialog_screen.add(ImagePane((0, 0, screen_width, screen_height), self._get_overlay_surface()))
+
+        # 计算对话框位置（居中）
+        popup_x = (screen_width - popup_width) // 2
+        popup_y = (screen_height - popup_height) // 2
+        panel = dialog_screen.add(Panel((popup_x, popup_y, popup_width, popup_height),
+                                        (255, 255, 255), (100, 100, 100), 2))
+
+        # 标题
+        panel.add(Label((0, 10, popup_width, 40), title, self.font_title, self.text_renderer, (50, 50, 50)))
+
+        # 消息内容（智能换行，第一行中心位于 y=70，行高 25）
+        wrapped_message_lines = self._wrap_text_for_display(message, self.font_text, popup_width - 40)
+        line_height = 25
+        panel.add(Label((20, 70 - line_height // 2, popup_width - 40, line_height * len(wrapped_message_lines)),
+                        "\n".join(wrapped_message_lines), self.font_text, self.text_renderer,
+                        line_height=line_height))
+        return dialog_screen, background_pane, panel
+
+    def _get_popup_screen(self, message: str, title: str, buttons: list, popup_width: int,
+                          popup_height: int) -> typing.Tuple[WidgetScreen, ImagePane, Panel]:
+        """获取弹窗控件树，相同内容的弹窗直接复用已绘制好的控件"""
+        cache_key = (message, title, popup_width, popup_height,
+                     tuple((button["text"], button["value"], tuple(button.get("color", (70, 130, 180))))
+                           for button in buttons))
+        cached = self._popup_cache.get(cache_key)
+        if cached is not None:
+            self._popup_cache.move_to_end(cache_key)
+            return cached
+
+        popup_screen, background_pane, panel = self._build_dialog_screen(message, title, popup_width, popup_height)
 
-            time.sleep(0.01)  # 减少CPU占用
+        # 创建按钮 - 支持多按钮布局
+        button_width = max(80, popup_width // (len(buttons) + 1))  # 动态计算按钮宽度
+        button_height = 35
+        button_y = popup_height - 60
+
+        # 计算按钮总宽度和间距
+        button_spacing = 15
+        buttons_area_width = len(buttons) * button_width + (len(buttons) - 1) * button_spacing
+
+        # 按钮起始位置（居中）
+        start_x = (popup_width - buttons_area_width) // 2
+        for i, button_config in enumerate(buttons):
+            button_x = start_x + i * (button_width + button_spacing)
+            panel.add(Button((button_x, button_y, button_width, button_height), button_config["text"],
+                             self.font_text, self.text_renderer, button_config["value"],
+                             color=button_config.get("color", (70, 130, 180))))
+
+        self._popup_cache[cache_key] = (popup_screen, background_pane, panel)
+        while len(self._popup_cache) > self.POPUP_CACHE_SIZE:
+            self._popup_cache.popitem(last=False)
+        return popup_screen, background_pane, panel
 
     def show_confirm_dialog(self, message: str, title: str = "确认") -> bool:
         """显示确认对话框（是/否）"""
@@ -919,6 +1057,7 @@ class PresentationManager:
     def show_main_menu(self) -> str:
         """显示主菜单"""
         if self.test_mode:
+            startup_profiler.report()
             print("\n----- 主菜单 -----")
             menu_choice = input("请选择操作 (1: 语音录入, 2: 手动输入, Q: 退出): ").strip().lower()
             if menu_choice == '1':
@@ -943,82 +1082,63 @@ class PresentationManager:
                 else:
                     return 'invalid'
 
-            # 清空屏幕，显示白色背景
-            self.screen.fill((255, 255, 255))
-
-            screen_width, screen_height = self.screen_size
-
-            # 显示标题
-            title_text = "儿童绘本生成器"
-            title_surface = self._render_text_to_surface(title_text, self.font_title, (50, 50, 50))
-            title_rect = title_surface.get_rect(center=(screen_width // 2, screen_height // 4))
-            self.screen.blit(title_surface, title_rect)
-
-            # 显示欢迎信息
-            welcome_text = "欢迎使用树莓派个性化儿童绘本生成器！"
-            welcome_surface = self._render_text_to_surface(welcome_text, self.font_text, (100, 100, 100))
-            welcome_rect = welcome_surface.get_rect(center=(screen_width // 2, screen_height // 4 + 60))
-            self.screen.blit(welcome_surface, welcome_rect)
-
-            # 创建按钮
-            button_width = 200
-            button_height = 50
-            button_spacing = 20
-            buttons_start_y = screen_height // 2
-
-            buttons_config = [
-                {"text": "语音录入", "value": "voice", "color": (70, 130, 180)},
-                {"text": "手动输入", "value": "manual", "color": (40, 167, 69)},
-                {"text": "退出程序", "value": "quit", "color": (220, 53, 69)}
-            ]
-
-            button_rects = []
-            for i, button_config in enumerate(buttons_config):
-                button_x = (screen_width - button_width) // 2
-                button_y = buttons_start_y + i * (button_height + button_spacing)
-                button_rect = pygame.Rect(button_x, button_y, button_width, button_height)
-                button_rects.append((button_rect, button_config))
-
-                # 绘制按钮背景
-                button_color = button_config.get("color", (70, 130, 180))
-                pygame.draw.rect(self.screen, button_color, button_rect)
-                pygame.draw.rect(self.screen, (50, 50, 50), button_rect, 3)
-
-                # 渲染按钮文本
-                button_text_surface = self._render_text_to_surface(
-                    button_config["text"], self.font_text, (255, 255, 255), padding=0
-                )
-                button_text_rect = button_text_surface.get_rect(center=button_rect.center)
-                self.screen.blit(button_text_surface, button_text_rect)
-
-            # 刷新显示
-            pygame.display.flip()
+            # 主菜单控件树只创建一次，再次进入时直接使用缓存的控件画面
+            if self._main_menu_screen is None:
+                self._main_menu_screen = self._build_main_menu_screen()
+            self._show_screen(self._main_menu_screen, full=True)
+            startup_profiler.mark("绘制主菜单")
+            startup_profiler.report()
 
             # 等待用户交互
-            while True:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        return "quit"
-
-                    if event.type == pygame.KEYDOWN:
-                        # 键盘快捷键
-                        if event.key == pygame.K_1:
-                            return "voice"
-                        elif event.key == pygame.K_2:
-                            return "manual"
-                        elif event.key == pygame.K_q or event.key == pygame.K_ESCAPE:
-                            return "quit"
+            for event in self.event_dispatcher.events():
+                if event.type == pygame.QUIT:
+                    return "quit"
 
-                    if event.type == pygame.MOUSEBUTTONDOWN:
-                        if event.button == 1:  # 左键点击
-                            mouse_pos = event.pos
+                if event.type == pygame.KEYDOWN:
+                    # 键盘快捷键
+                    if event.key == pygame.K_1:
+                        return "voice"
+                    elif event.key == pygame.K_2:
+                        return "manual"
+                    elif event.key == pygame.K_q or event.key == pygame.K_ESCAPE:
+                        return "quit"
 
-                            # 检查是否点击了某个按钮
-                            for button_rect, button_config in button_rects:
-                                if button_rect.collidepoint(mouse_pos):
-                                    return button_config["value"]
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 1:  # 左键点击
+                        # 检查是否点击了某个按钮
+                        value = self._main_menu_screen.find_value_at(event.pos)
+                        if value is not None:
+                            return value
 
-                time.sleep(0.01)  # 减少CPU占用
+    def _build_main_menu_screen(self) -> WidgetScreen:
+        """创建主菜单控件树：标题、欢迎信息和三个按钮"""
+        screen_width, screen_height = self.screen_size
+        menu_screen = WidgetScreen(self.screen_size)
+
+        # 标题和欢迎信息
+        menu_screen.add(Label((0, screen_height // 4 - 30, screen_width, 60), "儿童绘本生成器",
+                              self.font_title, self.text_renderer, (50, 50, 50)))
+        menu_screen.add(Label((0, screen_height // 4 + 40, screen_width, 40), "欢迎使用树莓派个性化儿童绘本生成器！",
+                              self.font_text, self.text_renderer, (100, 100, 100)))
+
+        # 按钮
+        button_width = 200
+        button_height = 50
+        button_spacing = 20
+        buttons_start_y = screen_height // 2
+
+        buttons_config = [
+            {"text": "语音录入", "value": "voice", "color": (70, 130, 180)},
+            {"text": "手动输入", "value": "manual", "color": (40, 167, 69)},
+            {"text": "退出程序", "value": "quit", "color": (220, 53, 69)}
+        ]
+        for i, button_config in enumerate(buttons_config):
+            button_x = (screen_width - button_width) // 2
+            button_y = buttons_start_y + i * (button_height + button_spacing)
+            menu_screen.add(Button((button_x, button_y, button_width, button_height), button_config["text"],
+                                   self.font_text, self.text_renderer, button_config["value"],
+                                   color=button_config["color"], border_width=3))
+        return menu_screen
 
     def show_text_input_dialog(self, message: str, title: str = "输入", placeholder: str = "",
                                popup_width: int = 400, popup_height: int = 250) -> str:
@@ -1046,150 +1166,52 @@ class PresentationManager:
             user_input = input(f"{message} ({placeholder}): ").strip()
             return user_input
 
-        screen_width, screen_height = self.screen_size
+        dialog_screen, background_pane, panel = self._build_dialog_screen(message, title, popup_width, popup_height)
 
-        # 计算对话框位置（居中）
-        popup_x = (screen_width - popup_width) // 2
-        popup_y = (screen_height - popup_height) // 2
-
-        # 创建半透明遮罩层
-        overlay = pygame.Surface((screen_width, screen_height), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))
+        # 输入框
+        input_box = panel.add(TextInput((20, popup_height - 100, popup_width - 40, 40),
+                                        self.font_text, self.text_renderer, placeholder))
 
-        # 输���框状态
-        input_text = ""
-        cursor_visible = True
-        cursor_timer = 0
-        input_active = True
+        # 确定按钮和取消按钮
+        panel.add(Button((popup_width - 170, popup_height - 50, 70, 30), "确定",
+                         self.font_text, self.text_renderer, "ok", color=(70, 130, 180)))
+        panel.add(Button((popup_width - 90, popup_height - 50, 70, 30), "取消",
+                         self.font_text, self.text_renderer, "cancel", color=(150, 150, 150)))
 
-        # 输入框样式
-        input_box_width = popup_width - 40
-        input_box_height = 40
-        input_box_x = 20
-        input_box_y = popup_height - 100
+        # 对话框下方显示打开对话框前的画面
+        background_pane.set_image(self.screen.copy())
+        self._show_screen(dialog_screen, full=True)
 
-        while True:
-            # 更新光标闪烁
-            cursor_timer += 1
-            if cursor_timer >= 30:  # 每30帧切换一次光标显示状态
-                cursor_visible = not cursor_visible
-                cursor_timer = 0
-
-            # 处理事件
-            for event in pygame.event.get():
+        # 之后只重绘输入框：输入变化或光标闪烁（每 CURSOR_BLINK_MS 毫秒）时
+        with self.event_dispatcher.timer(CURSOR_BLINK_EVENT, self.CURSOR_BLINK_MS):
+            for event in self.event_dispatcher.events():
                 if event.type == pygame.QUIT:
                     return ""
 
-                if event.type == pygame.KEYDOWN:
+                if event.type == CURSOR_BLINK_EVENT:
+                    input_box.toggle_cursor()
+
+                elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         return ""  # 取消输入
                     elif event.key == pygame.K_RETURN:
-                        return input_text.strip()  # 确认输入
+                        return input_box.text.strip()  # 确认输入
                     elif event.key == pygame.K_BACKSPACE:
-                        if input_text:
-                            input_text = input_text[:-1]
-                    else:
-                        # 添加字符到输入文本
-                        if event.unicode and len(input_text) < 100:  # 限制最大长度
-                            input_text += event.unicode
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:  # 左键点击
-                        mouse_pos = event.pos
-                        relative_pos = (mouse_pos[0] - popup_x, mouse_pos[1] - popup_y)
-
-                        # 检查是否点击了确定按钮
-                        ok_button_rect = pygame.Rect(popup_width - 170, popup_height - 50, 70, 30)
-                        if ok_button_rect.collidepoint(relative_pos):
-                            return input_text.strip()
-
-                        # 检查是否点击了取消按钮
-                        cancel_button_rect = pygame.Rect(popup_width - 90, popup_height - 50, 70, 30)
-                        if cancel_button_rect.collidepoint(relative_pos):
-                            return ""
-
-                        # 检查是否点击了输入框
-                        input_rect = pygame.Rect(input_box_x, input_box_y, input_box_width, input_box_height)
-                        if input_rect.collidepoint(relative_pos):
-                            input_active = True
-                        else:
-                            input_active = False
-
-            # 绘制对话框
-            popup_surface = pygame.Surface((popup_width, popup_height), pygame.SRCALPHA)
-            pygame.draw.rect(popup_surface, (255, 255, 255), (0, 0, popup_width, popup_height))
-            pygame.draw.rect(popup_surface, (100, 100, 100), (0, 0, popup_width, popup_height), 2)
-
-            # 渲染标题
-            title_surface = self._render_text_to_surface(title, self.font_title, (50, 50, 50))
-            title_rect = title_surface.get_rect(center=(popup_width // 2, 30))
-            popup_surface.blit(title_surface, title_rect)
-
-            # 渲染提示消息
-            wrapped_message_lines = self._wrap_text_for_display(message, self.font_text, popup_width - 40)
-            message_start_y = 70
-            line_height = 25
-
-            for i, line in enumerate(wrapped_message_lines):
-                line_surface = self._render_text_to_surface(line, self.font_text)
-                line_rect = line_surface.get_rect(center=(popup_width // 2, message_start_y + i * line_height))
-                popup_surface.blit(line_surface, line_rect)
-
-            # 绘制输入框
-            input_rect = pygame.Rect(input_box_x, input_box_y, input_box_width, input_box_height)
-            input_color = (255, 255, 255) if input_active else (245, 245, 245)
-            border_color = (70, 130, 180) if input_active else (200, 200, 200)
-
-            pygame.draw.rect(popup_surface, input_color, input_rect)
-            pygame.draw.rect(popup_surface, border_color, input_rect, 2)
-
-            # 渲染输入文本或占位符
-            display_text = input_text if input_text else placeholder
-            text_color = (50, 50, 50) if input_text else (150, 150, 150)
-
-            if display_text:
-                # 确保文本不超出输入框
-                max_text_width = input_box_width - 20
-                if self.font_text.getlength(display_text) > max_text_width:
-                    # 如果文本太长，只显示末尾部分
-                    while display_text and self.font_text.getlength(display_text) > max_text_width:
-                        display_text = display_text[1:]
-
-                text_surface = self._render_text_to_surface(display_text, self.font_text, text_color, padding=0)
-                text_rect = text_surface.get_rect(midleft=(input_box_x + 10, input_box_y + input_box_height // 2))
-                popup_surface.blit(text_surface, text_rect)
-
-            # 绘制光标
-            if input_active and cursor_visible and input_text:
-                cursor_x = input_box_x + 10 + self.font_text.getlength(input_text)
-                if cursor_x < input_box_x + input_box_width - 10:
-                    pygame.draw.line(popup_surface, (50, 50, 50),
-                                   (cursor_x, input_box_y + 8),
-                                   (cursor_x, input_box_y + input_box_height - 8), 2)
-
-            # 绘制按钮
-            # 确定按钮
-            ok_button_rect = pygame.Rect(popup_width - 170, popup_height - 50, 70, 30)
-            pygame.draw.rect(popup_surface, (70, 130, 180), ok_button_rect)
-            pygame.draw.rect(popup_surface, (50, 50, 50), ok_button_rect, 2)
-            ok_text = self._render_text_to_surface("确定", self.font_text, (255, 255, 255), padding=0)
-            ok_text_rect = ok_text.get_rect(center=ok_button_rect.center)
-            popup_surface.blit(ok_text, ok_text_rect)
-
-            # 取消按钮
-            cancel_button_rect = pygame.Rect(popup_width - 90, popup_height - 50, 70, 30)
-            pygame.draw.rect(popup_surface, (150, 150, 150), cancel_button_rect)
-            pygame.draw.rect(popup_surface, (50, 50, 50), cancel_button_rect, 2)
-            cancel_text = self._render_text_to_surface("取消", self.font_text, (255, 255, 255), padding=0)
-            cancel_text_rect = cancel_text.get_rect(center=cancel_button_rect.center)
-            popup_surface.blit(cancel_text, cancel_text_rect)
-
-            # 显示对话框
-            self.screen.blit(overlay, (0, 0))
-            self.screen.blit(popup_surface, (popup_x, popup_y))
-            pygame.display.flip()
-
-            time.sleep(0.016)  # 约60 FPS
+                        input_box.set_text(input_box.text[:-1])
+                    elif event.unicode:
+                        # 添加字符到输入文本（超过最大长度的部分被忽略）
+                        input_box.set_text(input_box.text + event.unicode)
+
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # 左键点击
+                    value = dialog_screen.find_value_at(event.pos)
+                    if value == "ok":
+                        return input_box.text.strip()
+                    elif value == "cancel":
+                        return ""
+                    # 检查是否点击了输入框
+                    input_box.set_active(value == "input")
+
+                self._show_screen(dialog_screen)
 
     def show_status_screen(self, message: str, title: str = "状态") -> None:
         """
@@ -1207,27 +1229,27 @@ class PresentationManager:
             print(f"[状态] {title}: {message}")
             return
 
-        # 清空屏幕，显示白色背景
-        self.screen.fill((255, 255, 255))
-
-        screen_width, screen_height = self.screen_size
+        # 状态界面只创建一次；再次更新时只重绘内容发生变化的文字
+        if self._status_screen is None:
+            self._status_screen = self._build_status_screen()
+        title_label, message_label = self._status_screen.children[:2]
 
         # 如果有标题，在上方显示
-        if title and title != "状态":
-            title_surface = self._render_text_to_surface(title, self.font_title, (100, 100, 100))
-            title_rect = title_surface.get_rect(center=(screen_width // 2, screen_height // 2 - 50))
-            self.screen.blit(title_surface, title_rect)
-
+        title_label.set_text(title if title and title != "状态" else "")
         # 在屏幕中央显示主要消息
-        message_surface = self._render_text_to_surface(message, self.font_title, (50, 50, 50))
-        message_rect = message_surface.get_rect(center=(screen_width // 2, screen_height // 2))
-        self.screen.blit(message_surface, message_rect)
-
-        # 添加一个简单的加载动画指示（可选的点点点）
-        dots_text = "..."
-        dots_surface = self._render_text_to_surface(dots_text, self.font_text, (150, 150, 150))
-        dots_rect = dots_surface.get_rect(center=(screen_width // 2, screen_height // 2 + 40))
-        self.screen.blit(dots_surface, dots_rect)
-
-        # 刷新显示
-        pygame.display.flip()
+        message_label.set_text(message)
+
+        self._show_screen(self._status_screen)
+
+    def _build_status_screen(self) -> WidgetScreen:
+        """创建状态界面控件树：标题、消息和加载指示"""
+        screen_width, screen_height = self.screen_size
+        status_screen = WidgetScreen(self.screen_size)
+        status_screen.add(Label((0, screen_height // 2 - 75, screen_width, 50), "",
+                                self.font_title, self.text_renderer, (100, 100, 100)))
+        status_screen.add(Label((0, screen_height // 2 - 25, screen_width, 50), "",
+                                self.font_title, self.text_renderer, (50, 50, 50)))
+        # 一个简单的加载动画指示（点点点）
+        status_screen.add(Label((0, screen_height // 2 + 20, screen_width, 40), "...",
+                                self.font_text, self.text_renderer, (150, 150, 150)))
+        return status_screen
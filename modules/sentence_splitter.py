@@ -0,0 +1,44 @@
+import re
+
+# 句末标点（中英文），以及句子过长时可以断开的次级标点
+SENTENCE_END = "。！？!?；;…\n"
+CLAUSE_BREAK = "，,、：:"
+
+_SENTENCE_PATTERN = re.compile(f"[^{re.escape(SENTENCE_END)}]*(?:[{re.escape(SENTENCE_END)}]+[”’\"')）]*|$)")
+
+
+def split_sentences(text: str, max_chars: int = 60, min_chars: int = 4) -> list[str]:
+    """
+    将朗读文本按句子切分，供逐句合成语音。
+    句子超过 max_chars 时在逗号等次级标点处断开，仍然过长时按长度硬切；
+    少于 min_chars 的片段（如单独的“啊！”）并入前一句，避免产生过短的音频请求。
+    """
+    # 英文句号后跟空白时视为句末（不拆开 3.5 这样的数字）
+    text = re.sub(r"\.\s+", ".\n", text)
+    pieces = []
+    for match in _SENTENCE_PATTERN.finditer(text):
+        sentence = match.group().strip()
+        if sentence:
+            pieces.extend(_split_long(sentence, max_chars))
+
+    merged: list[str] = []
+    for piece in pieces:
+        if merged and (len(piece) < min_chars or len(merged[-1]) < min_chars) \
+                and len(merged[-1]) + len(piece) <= max_chars:
+            merged[-1] += piece
+        else:
+            merged.append(piece)
+    return merged
+
+
+def _split_long(sentence: str, max_chars: int) -> list[str]:
+    """在次级标点处把过长的句子断开，没有合适的标点时按 max_chars 硬切"""
+    parts = []
+    while len(sentence) > max_chars:
+        cut = max((sentence.rfind(mark, 0, max_chars) for mark in CLAUSE_BREAK), default=-1)
+        cut = cut + 1 if cut > 0 else max_chars
+        parts.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        parts.append(sentence)
+    return parts
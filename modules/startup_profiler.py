@@ -0,0 +1,57 @@
+import threading
+import time
+import typing
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    '''
+    启动耗时统计：记录从进程启动到主菜单可交互之间各阶段的耗时，并在菜单出现时打印汇总。
+    延迟初始化的子系统（Gemini 客户端、音频播放等）在首次使用时记录耗时，汇总之后的记录直接打印。
+    '''
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self._last_mark = self.start_time
+        self._phases: list[typing.Tuple[str, float]] = []
+        self._reported = False
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        """记录一个阶段：耗时为距上一次 mark（或进程启动）的时间"""
+        now = time.perf_counter()
+        with self._lock:
+            self._record(name, now - self._last_mark)
+            self._last_mark = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """统计 with 块的耗时，例如首次使用时才初始化的子系统"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._record(name, time.perf_counter() - start)
+
+    def report(self):
+        """打印启动耗时汇总（只打印一次）"""
+        with self._lock:
+            if self._reported:
+                return
+            self._reported = True
+            total = time.perf_counter() - self.start_time
+            print("\n----- 启动耗时 -----")
+            for name, seconds in self._phases:
+                print(f"  {seconds * 1000:8.1f} ms  {name}")
+            print(f"  {total * 1000:8.1f} ms  到达主菜单（合计）")
+
+    def _record(self, name: str, seconds: float):
+        """记录一个阶段的耗时（调用方需持有锁）"""
+        if self._reported:
+            print(f"[启动耗时] 延迟初始化 {name}: {seconds * 1000:.1f} ms")
+        else:
+            self._phases.append((name, seconds))
+
+
+# 进程内共享的启动耗时统计，尽早导入以便从进程启动开始计时
+startup_profiler = StartupProfiler()
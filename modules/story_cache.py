@@ -0,0 +1,170 @@
+import atexit
+import json
+import os
+import threading
+import time
+import typing
+import unicodedata
+
+import config
+from modules.asset_cache import ContentCache
+
+if typing.TYPE_CHECKING:
+    from modules.story_pipeline import ProgressiveStory, StoryPage
+
+
+class StoryCache:
+    '''
+    整篇故事的结果缓存：将“规范化主题 + 生成设置”映射到之前生成的完整故事（文本、插画和音频路径）。
+    插画和音频本身保存在各自的内容缓存中，这里只记录路径；任一素材被淘汰时该条目视为未命中。
+
+    新鲜度策略（config.STORY_CACHE_POLICY）：
+    - 'off': 不使用缓存。
+    - 'serve_cached': 未超过 STORY_CACHE_MAX_AGE_HOURS 的缓存直接使用，过期则重新生成。
+    - 'revalidate': 总是立即使用缓存；若已过期，同时在后台重新生成并更新缓存，下次请求得到新故事。
+    '''
+    POLICIES = ('off', 'serve_cached', 'revalidate')
+    # 规范化主题时去除的标点（中英文）
+    THEME_PUNCTUATION = "，。！？、；：…,.!?;:'\"“”‘’《》()（）"
+
+    def __init__(self,
+                 index_path: str = config.STORY_CACHE_INDEX,
+                 policy: str = config.STORY_CACHE_POLICY,
+                 max_age_hours: float = config.STORY_CACHE_MAX_AGE_HOURS,
+                 max_entries: int = config.STORY_CACHE_MAX_ENTRIES):
+        if policy not in self.POLICIES:
+            print(f"未知的故事缓存策略 '{policy}'，已改为 'off'")
+            policy = 'off'
+
+        self.index_path = index_path
+        self.policy = policy
+        self.max_age_seconds = max_age_hours * 3600
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._dirty = False  # 内存中的索引有尚未写回磁盘的修改（如最近使用时间）
+        self._refreshes: dict[str, 'ProgressiveStory'] = {}  # 正在后台重新生成的故事（按缓存键）
+        self._load_index()
+        atexit.register(self.flush)
+
+    @classmethod
+    def normalize_theme(cls, theme: str) -> str:
+        """规范化主题：全角转半角、转小写、去除空白和标点，使“小兔子的冒险！”与“ 小兔子的冒险 ”视为同一主题"""
+        normalized = unicodedata.normalize('NFKC', theme).lower()
+        return "".join(char for char in normalized
+                       if not char.isspace() and char not in cls.THEME_PUNCTUATION)
+
+    def make_key(self, theme: str, num_pages: int) -> str:
+        """缓存键包含影响故事内容的全部生成设置"""
+        return ContentCache.make_key(self.normalize_theme(theme),
+                                     config.GEMINI_TEXT_MODEL,
+                                     config.STORY_TEMPERATURE,
+                                     num_pages)
+
+    def lookup(self, theme: str, num_pages: int) -> typing.Tuple[dict, bool] | None:
+        """
+        查找缓存的故事。
+        返回: (条目, 是否需要后台重新生成) 或 None（未命中、已过期或素材已失效）。
+              条目包含 'pages' 和 'segments' 两个列表。
+        """
+        if self.policy == 'off':
+            return None
+
+        key = self.make_key(theme, num_pages)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if not self._assets_exist(entry):
+                print(f"缓存的故事 '{entry['theme']}' 的素材已被清理，重新生成。")
+                del self._entries[key]
+                self._dirty = True
+                return None
+
+            is_stale = time.time() - entry['created'] > self.max_age_seconds
+            if is_stale and self.policy == 'serve_cached':
+                print(f"缓存的故事 '{entry['theme']}' 已过期，重新生成。")
+                return None
+
+            # 命中时只更新内存中的使用时间，索引在 store() 或 flush() 时一起写回
+            entry['last_access'] = time.time()
+            self._dirty = True
+            return entry, is_stale and self.policy == 'revalidate'
+
+    def store(self, theme: str, num_pages: int, pages: typing.List['StoryPage'], segments: typing.List[dict]):
+        """保存一篇完整生成的故事，超出条目上限时淘汰最久未使用的故事"""
+        if self.policy == 'off':
+            return
+
+        key = self.make_key(theme, num_pages)
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {
+                'theme': theme,
+                'created': now,
+                'last_access': now,
+                'pages': [dict(page) for page in pages],
+                'segments': [dict(segment) for segment in segments],
+            }
+            while len(self._entries) > self.max_entries:
+                oldest_key = min(self._entries, key=lambda k: self._entries[k]['last_access'])
+                del self._entries[oldest_key]
+            self._save_index()
+        print(f"故事 '{theme}' 已保存到故事缓存")
+
+    def begin_refresh(self,
+                      theme: str,
+                      num_pages: int,
+                      create: typing.Callable[[], 'ProgressiveStory']) -> 'ProgressiveStory | None':
+        """
+        登记一次后台重新生成：同一故事已有尚未结束的重新生成时返回 None，
+        否则调用 create() 创建新的故事并记录下来（由调用方启动）。
+        """
+        key = self.make_key(theme, num_pages)
+        with self._lock:
+            running = self._refreshes.get(key)
+            if running is not None and not running.is_complete():
+                return None
+            story = create()
+            self._refreshes[key] = story
+            return story
+
+    def flush(self):
+        """把内存中尚未保存的索引修改写回磁盘（程序退出时自动调用）"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    @staticmethod
+    def _assets_exist(entry: dict) -> bool:
+        """检查条目引用的插画和音频文件是否仍然存在"""
+        for page in entry['pages']:
+            for path in (page.get('image_path'), page.get('audio_path')):
+                if path and not os.path.exists(path):
+                    return False
+        return True
+
+    def _load_index(self):
+        if self.policy == 'off' or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+            print(f"故事缓存已加载: {len(self._entries)} 篇故事")
+        except Exception as e:
+            print(f"读取故事缓存失败，将重新建立: {e}")
+            self._entries = {}
+
+    def _save_index(self):
+        """原子地将索引写回磁盘（调用方需持有锁）"""
+        temp_path = self.index_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+            self._dirty = False
+        except Exception as e:
+            print(f"保存故事缓存失败: {e}")
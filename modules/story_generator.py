@@ -1,13 +1,16 @@
 import os
 
-from google.genai import types
-
+from modules.api_clients.genai_client import genai_types
 from modules.api_clients.llm_client import LLMClient
 from modules.api_clients.tts_client import tts_client
+from modules.story_stream_parser import IncrementalStoryParser, StoryStreamError
 import config
 import json
 import typing  # 导入 typing 模块用于类型提示
 
+if typing.TYPE_CHECKING:
+    from google.genai import types
+
 
 # 定义故事段落结构
 class StorySegment(typing.TypedDict):
@@ -53,17 +56,11 @@ class StoryGenerator:
         self.llm_client = LLMClient(api_key=config.GOOGLE_GENAI_API_KEY)
         os.makedirs(config.ASSETS_IMAGE_DIR, exist_ok=True)
 
-    def generate_structured_story(self, theme: str, num_pages: int) -> typing.Tuple[
-                                                                           typing.List[StorySegment], str] | None:
-        """
-        根据主题和页数生成结构化故事。
-        theme: 故事的主题。
-        num_pages: 希望故事包含的场景/段落数量。
-        返回: (complete_story_list, story_text_summary) 或 None。
-        """
-        # 构建详细的 Prompt，引导模型生成结构化输出
+    @staticmethod
+    def _build_story_prompt(theme: str, num_pages: int) -> str:
+        """构建详细的 Prompt，引导模型生成结构化输出"""
         # 参考您提供的Animated_Story_Video_Generation_gemini.ipynb中的Prompt
-        prompt = f'''
+        return f'''
             你是一位动画视频制作人。请为一部关于 "{theme}" 的动画片，生成一个包含 {num_pages} 个场景的故事序列。每个场景大约1秒。
             
             请严格按照以下JSON结构输出内容。如果模型返回的不是有效的JSON，请尝试调整Prompt或降低温度。
@@ -83,33 +80,48 @@ class StoryGenerator:
             请确保只输出JSON内容，不要有任何额外文字。
             '''
 
+    @staticmethod
+    def _build_structured_output_config() -> 'types.GenerateContentConfig':
+        """构建要求 JSON 输出的生成配置（包含 StoryResponse 对应的 Schema）"""
+        types = genai_types()
+        story_segment_schema = types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "image_prompt": types.Schema(type=types.Type.STRING),
+                "audio_text": types.Schema(type=types.Type.STRING),
+                "character_description": types.Schema(type=types.Type.STRING)
+            },
+            required=["image_prompt", "audio_text", "character_description"]
+        )
+        structured_response_schema = types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "complete_story": types.Schema(
+                    type=types.Type.ARRAY,
+                    items=story_segment_schema  # 直接内联 StorySegment 的 Schema
+                ),
+                "pages": types.Schema(type=types.Type.INTEGER)
+            },
+        )
+        # 构建 types.GenerateContentConfig 对象
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=structured_response_schema  # 传递 types.Schema 对象
+        )
+
+    def generate_story_segments(self, theme: str, num_pages: int) -> typing.List[StorySegment] | None:
+        """
+        根据主题和页数生成结构化故事段落（仅文本，不生成音频）。
+        theme: 故事的主题。
+        num_pages: 希望故事包含的场景/段落数量。
+        返回: 故事段落列表或 None。
+        """
+        prompt = self._build_story_prompt(theme, num_pages)
+
         print(f"正在生成结构化故事，主题：'{theme}'，页数：{num_pages}...")
 
         try:
-            story_segment_schema = types.Schema(
-                type=types.Type.OBJECT,
-                properties={
-                    "image_prompt": types.Schema(type=types.Type.STRING),
-                    "audio_text": types.Schema(type=types.Type.STRING),
-                    "character_description": types.Schema(type=types.Type.STRING)
-                },
-                required=["image_prompt", "audio_text", "character_description"]
-            )
-            structured_response_schema = types.Schema(
-                type=types.Type.OBJECT,
-                properties={
-                    "complete_story": types.Schema(
-                        type=types.Type.ARRAY,
-                        items=story_segment_schema  # 直接内联 StorySegment 的 Schema
-                    ),
-                    "pages": types.Schema(type=types.Type.INTEGER)
-                },
-            )
-            # 构建 types.GenerateContentConfig 对象
-            structured_output_config = types.GenerateContentConfig(
-                response_mime_type="application/json",
-                response_schema=structured_response_schema  # 传递 types.Schema 对象
-            )
+            structured_output_config = self._build_structured_output_config()
 
             # 调用LLM客户端生成文本，并明确要求JSON输出和Schema
             response_text = self.llm_client.generate_text(
@@ -138,24 +150,7 @@ class StoryGenerator:
                 num_pages_returned = story_data.get('pages')
 
                 if complete_story_list and isinstance(complete_story_list, list) and num_pages_returned == num_pages:
-                    # 为每个故事段落生成音频文件
-                    print("正在为故事段落生成音频文件...")
-                    for i, segment in enumerate(complete_story_list):
-                        audio_text = segment.get('audio_text')
-                        if audio_text:
-                            # 为每个段落生成唯一的音频文件名
-                            filename = f"story_page_{i+1}.mp3"
-                            audio_path = tts_client.generate_speech(audio_text, filename)
-                            if audio_path:
-                                segment['audio_path'] = audio_path
-                                print(f"第 {i+1} 页音频已生成: {filename}")
-                            else:
-                                print(f"第 {i+1} 页音频生成失败")
-                                segment['audio_path'] = None
-
-                    # 提取一个整体的故事摘要，可以简单拼接audio_text
-                    story_summary = " ".join([seg['audio_text'] for seg in complete_story_list if 'audio_text' in seg])
-                    return complete_story_list, story_summary
+                    return complete_story_list
                 else:
                     print("JSON结构不符合预期或故事段落为空。")
                     return None
@@ -171,10 +166,70 @@ class StoryGenerator:
             print(f"调用故事生成服务时发生错误: {e}")
             return None
 
-    def generate_audio_for_story(self, story_segment: StorySegment) -> str | None:
+    def generate_story_segments_stream(self, theme: str, num_pages: int) -> typing.Iterator[StorySegment]:
+        """
+        以流式方式生成结构化故事段落：每个段落的 JSON 对象一闭合就立即返回该段落，
+        下游的插画和音频生成无需等待整个故事输出完毕。
+        theme: 故事的主题。
+        num_pages: 希望故事包含的场景/段落数量。
+        返回: StorySegment 的迭代器。输出结构异常时提前中止请求，迭代随之结束。
+        """
+        prompt = self._build_story_prompt(theme, num_pages)
+
+        print(f"正在流式生成结构化故事，主题：'{theme}'，页数：{num_pages}...")
+
+        parser = IncrementalStoryParser(expected_segments=num_pages)
+        text_stream = self.llm_client.generate_text_stream(
+            prompt_text=prompt,
+            model_name=config.GEMINI_TEXT_MODEL,
+            max_tokens=config.STORY_MAX_WORDS,
+            temperature=config.STORY_TEMPERATURE,
+            config_param=self._build_structured_output_config()
+        )
+
+        try:
+            for chunk in text_stream:
+                for segment in parser.feed(chunk):
+                    print(f"第 {parser.segments_emitted} 段故事文本已生成")
+                    yield segment
+            parser.close()
+            if parser.pages != num_pages:
+                print(f"警告：模型返回的页数 ({parser.pages}) 与请求的页数 ({num_pages}) 不一致。")
+        except StoryStreamError as e:
+            print(f"流式故事解析失败，提前中止请求: {e}")
+        except Exception as e:
+            print(f"流式生成故事时发生错误: {e}")
+        finally:
+            # 关闭底层流，中止剩余 token 的生成
+            text_stream.close()
+
+    def generate_structured_story(self, theme: str, num_pages: int) -> typing.Tuple[
+                                                                           typing.List[StorySegment], str] | None:
+        """
+        根据主题和页数生成结构化故事，并为每个段落生成音频。
+        theme: 故事的主题。
+        num_pages: 希望故事包含的场景/段落数量。
+        返回: (complete_story_list, story_text_summary) 或 None。
+        """
+        complete_story_list = self.generate_story_segments(theme, num_pages)
+        if not complete_story_list:
+            return None
+
+        # 为每个故事段落生成音频文件
+        print("正在为故事段落生成音频文件...")
+        for i, segment in enumerate(complete_story_list):
+            if segment.get('audio_text'):
+                segment['audio_path'] = self.generate_audio_for_story(segment, i + 1)
+
+        # 提取一个整体的故事摘要，可以简单拼接audio_text
+        story_summary = " ".join([seg['audio_text'] for seg in complete_story_list if 'audio_text' in seg])
+        return complete_story_list, story_summary
+
+    def generate_audio_for_story(self, story_segment: StorySegment, page_number: int) -> str | None:
         """
         为给定的故事段落生成音频。
         story_segment: 单个故事段落，包含文本和其他元数据。
+        page_number: 段落所在的页码（从 1 开始），用于生成唯一的文件名。
         返回: 音频文件的路径或 None。
         """
         audio_text = story_segment.get("audio_text")
@@ -184,11 +239,11 @@ class StoryGenerator:
 
         # 调用 TTS 客户端生成音频
         try:
-            audio_path = tts_client.generate_audio(
-                text=audio_text,
-                output_dir=config.ASSETS_AUDIO_DIR,  # 音频文件输出目录
-                file_name=f"story_segment_{story_segment.get('id')}.mp3"  # 生成唯一的文件名
-            )
+            audio_path = tts_client.generate_speech(audio_text, f"story_page_{page_number}.mp3")
+            if audio_path:
+                print(f"第 {page_number} 页音频已生成: {os.path.basename(audio_path)}")
+            else:
+                print(f"第 {page_number} 页音频生成失败")
             return audio_path
         except Exception as e:
             print(f"生成音频时发生错误: {e}")
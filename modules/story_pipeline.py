@@ -0,0 +1,253 @@
+import queue
+import threading
+import typing
+
+import config
+from modules.image_generator import ImageGenerator
+from modules.story_cache import StoryCache
+from modules.story_generator import StoryGenerator, StorySegment
+
+
+# 定义阅读器使用的单页结构
+class StoryPage(typing.TypedDict):
+    text: str
+    image_path: str | None
+    audio_path: str | None
+    ready: bool  # 插画和音频是否都已处理完毕（成功或失败）
+
+
+class ProgressiveStory:
+    '''
+    渐进式故事生成：在后台线程中逐页生成文本、音频和插画。
+    第 1 页就绪后即可开始阅读，其余页面继续在后台生成，每页就绪时通过 on_page_ready 回调通知。
+    启用 STORY_STREAMING 时，文本线程流式接收段落，素材线程同时为已到达的段落生成音频和插画。
+    '''
+    def __init__(self,
+                 story_generator: StoryGenerator,
+                 image_generator: ImageGenerator,
+                 on_page_ready: typing.Callable[[int], None] | None = None,
+                 on_complete: typing.Callable[['ProgressiveStory'], None] | None = None):
+        """
+        story_generator: 故事生成器（负责文本和音频）。
+        image_generator: 插画生成器。
+        on_page_ready: 可选回调，参数为就绪页面的索引（从 0 开始），在后台线程中调用。
+        on_complete: 可选回调，所有页面都成功生成（未取消）后在后台线程中调用。
+        """
+        self.story_generator = story_generator
+        self.image_generator = image_generator
+        self.on_page_ready = on_page_ready
+        self.on_complete = on_complete
+
+        self.pages: typing.List[StoryPage] = []
+        self.segments: typing.List[StorySegment] = []
+        self.expected_pages = 0
+        self.failed = False
+
+        self._lock = threading.Lock()
+        self._first_page_ready = threading.Event()
+        self._finished = threading.Event()
+        self._cancelled = threading.Event()
+        self._text_finished = threading.Event()
+        self._segment_queue: queue.Queue = queue.Queue()
+        self._text_worker = None
+        self._asset_worker = None
+
+    @classmethod
+    def from_cache(cls,
+                   story_generator: StoryGenerator,
+                   image_generator: ImageGenerator,
+                   pages: typing.List[StoryPage],
+                   segments: typing.List[StorySegment]) -> 'ProgressiveStory':
+        """用故事缓存中的完整故事构建一个已全部就绪的 ProgressiveStory"""
+        story = cls(story_generator, image_generator)
+        story.pages = [typing.cast(StoryPage, dict(page, ready=True)) for page in pages]
+        story.segments = list(segments)
+        story.expected_pages = len(story.pages)
+        story._text_finished.set()
+        story._first_page_ready.set()
+        story._finished.set()
+        return story
+
+    def start(self, theme: str, num_pages: int):
+        """在后台线程中开始生成故事，立即返回"""
+        self.expected_pages = num_pages
+        self._text_worker = threading.Thread(target=self._produce_text,
+                                             args=(theme, num_pages),
+                                             name="ProgressiveStoryText",
+                                             daemon=True)
+        self._asset_worker = threading.Thread(target=self._produce_assets,
+                                              name="ProgressiveStoryAssets",
+                                              daemon=True)
+        self._text_worker.start()
+        self._asset_worker.start()
+
+    def _produce_text(self, theme: str, num_pages: int):
+        """文本线程：生成段落文本，每到达一段就交给素材线程"""
+        try:
+            if config.STORY_STREAMING:
+                segments = self.story_generator.generate_story_segments_stream(theme, num_pages)
+            else:
+                segments = self.story_generator.generate_story_segments(theme, num_pages) or []
+
+            for segment in segments:
+                if self._cancelled.is_set():
+                    print("故事生成已取消，停止接收剩余段落。")
+                    break
+                with self._lock:
+                    index = len(self.pages)
+                    self.segments.append(segment)
+                    self.pages.append({'text': segment.get('audio_text', ''), 'image_path': None,
+                                       'audio_path': None, 'ready': False})
+                self._segment_queue.put((index, segment))
+        except Exception as e:
+            print(f"后台生成故事文本时发生错误: {e}")
+        finally:
+            self._text_finished.set()
+            self._segment_queue.put(None)
+
+            received_pages = self.page_count()
+            if 0 < received_pages < num_pages and self.on_page_ready:
+                # 实际段落少于预期：通知阅读器刷新，以便离开不存在的占位页
+                print(f"警告：只收到 {received_pages}/{num_pages} 段故事。")
+                self.on_page_ready(received_pages - 1)
+
+    def _produce_assets(self):
+        """素材线程：按到达顺序为每个段落生成音频和插画"""
+        try:
+            while True:
+                item = self._segment_queue.get()
+                if item is None:
+                    break
+                if self._cancelled.is_set():
+                    print("故事生成已取消，停止生成剩余页面。")
+                    break
+                self._produce_page(*item)
+        finally:
+            self.failed = not self.pages
+            self.image_generator.image_cache.print_stats()
+            self._first_page_ready.set()
+            self._finished.set()
+
+        if self.on_complete and self.is_fully_generated():
+            self.on_complete(self)
+
+    def _produce_page(self, index: int, segment: StorySegment):
+        """生成单页的音频和插画，并标记为就绪"""
+        audio_path = None
+        image_path = None
+        try:
+            if segment.get('audio_text'):
+                audio_path = self.story_generator.generate_audio_for_story(segment, index + 1)
+                segment['audio_path'] = audio_path
+            image_path = self.image_generator.generate_illustration(index, segment)
+        except Exception as e:
+            # 单页失败时仍标记为就绪，阅读器会显示纯文本页面，而不是一直停留在“绘制中”
+            print(f"生成第 {index + 1} 页时发生错误: {e}")
+
+        with self._lock:
+            page = self.pages[index]
+            page['audio_path'] = audio_path
+            page['image_path'] = image_path
+            page['ready'] = True
+
+        print(f"第 {index + 1} 页已就绪")
+        if index == 0:
+            self._first_page_ready.set()
+        if self.on_page_ready:
+            self.on_page_ready(index)
+
+    def wait_for_first_page(self, timeout: float | None = None) -> bool:
+        """
+        阻塞等待第 1 页就绪。
+        返回: 第 1 页就绪时为 True；生成失败或超时时为 False。
+        """
+        self._first_page_ready.wait(timeout)
+        return not self.failed and bool(self.pages) and self.pages[0]['ready']
+
+    def wait_until_complete(self, timeout: float | None = None) -> bool:
+        """阻塞等待所有页面生成完毕"""
+        return self._finished.wait(timeout)
+
+    def is_complete(self) -> bool:
+        return self._finished.is_set()
+
+    def cancel(self):
+        """取消尚未开始的页面生成（正在进行的请求会自然结束）"""
+        self._cancelled.set()
+
+    def page_count(self) -> int:
+        """
+        当前可翻阅的页数。文本仍在生成时返回预期页数，尚未到达的页面以“生成中”占位。
+        """
+        with self._lock:
+            if not self._text_finished.is_set():
+                return max(self.expected_pages, len(self.pages))
+            return len(self.pages)
+
+    def get_page(self, index: int) -> StoryPage:
+        """获取指定页面的快照（副本），可安全地在主线程中使用"""
+        with self._lock:
+            if index >= len(self.pages):
+                # 段落文本尚未到达
+                return {'text': '', 'image_path': None, 'audio_path': None, 'ready': False}
+            return typing.cast(StoryPage, dict(self.pages[index]))
+
+    def snapshot(self) -> typing.Tuple[typing.List[StoryPage], typing.List[StorySegment]]:
+        """获取所有页面和段落的副本"""
+        with self._lock:
+            return ([typing.cast(StoryPage, dict(page)) for page in self.pages],
+                    [typing.cast(StorySegment, dict(segment)) for segment in self.segments])
+
+    def get_summary(self) -> str:
+        """拼接所有段落的 audio_text 作为故事摘要"""
+        with self._lock:
+            return " ".join([seg['audio_text'] for seg in self.segments if 'audio_text' in seg])
+
+    def is_fully_generated(self) -> bool:
+        """所有预期页面均已生成且每页都有插画和音频（用于判断是否值得写入故事缓存）"""
+        with self._lock:
+            return (not self._cancelled.is_set()
+                    and len(self.pages) == self.expected_pages
+                    and all(page['ready'] and page['image_path'] and page['audio_path'] for page in self.pages))
+
+    def has_any_image(self) -> bool:
+        with self._lock:
+            return any(page['image_path'] for page in self.pages)
+
+
+def open_story(theme: str,
+               num_pages: int,
+               story_generator: StoryGenerator,
+               image_generator: ImageGenerator,
+               story_cache: StoryCache | None = None,
+               on_page_ready: typing.Callable[[int], None] | None = None) -> ProgressiveStory:
+    """
+    打开一个故事：优先使用故事缓存，未命中时在后台开始生成。
+    缓存策略为 'revalidate' 且缓存已过期时，立即返回缓存的故事，同时在后台重新生成并更新缓存。
+    生成完整的新故事会自动写入缓存。
+    """
+    def store_story(story: ProgressiveStory):
+        pages, segments = story.snapshot()
+        story_cache.store(theme, num_pages, pages, segments)
+
+    on_complete = store_story if story_cache else None
+
+    cached = story_cache.lookup(theme, num_pages) if story_cache else None
+    if cached:
+        entry, needs_refresh = cached
+        print(f"故事 '{theme}' 命中故事缓存，直接打开。")
+        if needs_refresh:
+            refresh = story_cache.begin_refresh(
+                theme, num_pages,
+                lambda: ProgressiveStory(story_generator, image_generator, on_complete=on_complete))
+            if refresh is None:
+                print("缓存的故事已过期，后台重新生成已在进行中。")
+            else:
+                print("缓存的故事已过期，正在后台重新生成...")
+                refresh.start(theme, num_pages)
+        return ProgressiveStory.from_cache(story_generator, image_generator, entry['pages'], entry['segments'])
+
+    story = ProgressiveStory(story_generator, image_generator,
+                             on_page_ready=on_page_ready, on_complete=on_complete)
+    story.start(theme, num_pages)
+    return story
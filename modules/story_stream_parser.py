@@ -0,0 +1,157 @@
+import json
+import re
+import typing
+
+if typing.TYPE_CHECKING:
+    # 仅用于类型提示，避免与 story_generator 循环导入
+    from modules.story_generator import StorySegment
+
+
+class StoryStreamError(ValueError):
+    """流式故事 JSON 结构不符合预期时抛出，调用方应据此提前中止请求"""
+
+
+class IncrementalStoryParser:
+    '''
+    增量解析流式返回的故事 JSON：{"complete_story": [{...}, {...}], "pages": N}。
+    每当 complete_story 数组中的一个段落对象闭合，就立即解析并返回该 StorySegment，
+    无需等待整个响应结束。支持并忽略 ```json 代码块前缀。
+    '''
+    REQUIRED_FIELDS = ("image_prompt", "audio_text", "character_description")
+    STORY_KEY = "complete_story"
+    # 根对象 '{' 之前唯一允许出现的非空白内容
+    CODE_FENCE_PREFIX = "```json"
+
+    def __init__(self, expected_segments: int | None = None):
+        """
+        expected_segments: 期望的段落数量。若模型输出的段落超过该数量，视为异常并中止。
+        """
+        self.expected_segments = expected_segments
+        self.segments_emitted = 0
+        self.pages: int | None = None
+
+        self._buffer = ""
+        self._pos = 0  # 下一个待扫描字符的位置
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._root_started = False
+        self._root_closed = False
+        self._prefix = ""
+
+        self._string_start = 0
+        self._pending_key = None  # 根对象中最近一个闭合的字符串（可能是键）
+        self._current_key = None  # 根对象中当前值对应的键
+        self._in_story_array = False
+        self._story_array_closed = False
+        self._segment_start = None  # 当前段落对象在缓冲区中的起始位置
+        self._array_start = 0
+        self._array_end = 0
+
+    def feed(self, chunk: str) -> typing.List['StorySegment']:
+        """
+        输入一段新到达的文本，返回本次新闭合的段落列表（可能为空）。
+        结构异常时抛出 StoryStreamError。
+        """
+        self._buffer += chunk
+        segments = []
+
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            i = self._pos
+            char = buffer[i]
+            self._pos += 1
+
+            if self._root_closed:
+                continue
+
+            if not self._root_started:
+                if char == '{':
+                    self._root_started = True
+                    self._depth = 1
+                elif not char.isspace():
+                    self._prefix += char
+                    if not self.CODE_FENCE_PREFIX.startswith(self._prefix.lower()):
+                        raise StoryStreamError(f"响应不是以 JSON 对象开头: {buffer[:50]!r}")
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._pending_key = buffer[self._string_start:i]
+                continue
+
+            if self._in_story_array and self._depth == 2:
+                # 数组的直接子元素只允许是段落对象
+                if char == '{':
+                    self._segment_start = i
+                elif char == ']':
+                    self._in_story_array = False
+                    self._story_array_closed = True
+                    self._array_end = i + 1
+                elif not (char.isspace() or char == ','):
+                    raise StoryStreamError(f"complete_story 数组中出现非对象元素: {char!r}")
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i + 1
+                continue
+
+            if char in '{[':
+                if char == '[' and self._depth == 1 and self._current_key == self.STORY_KEY:
+                    self._in_story_array = True
+                    self._array_start = i
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._in_story_array and self._depth == 2 and char == '}' and self._segment_start is not None:
+                    segments.append(self._parse_segment(buffer[self._segment_start:i + 1]))
+                    self._segment_start = None
+                elif self._depth == 0:
+                    self._root_closed = True
+                    # 在数组之外的根对象文本中查找 pages（它可能位于数组之前或之后）
+                    self._parse_pages(buffer[:self._array_start] + buffer[self._array_end:i])
+            elif char == ':' and self._depth == 1:
+                self._current_key = self._pending_key
+
+        return segments
+
+    def close(self):
+        """
+        标记流结束，检查整体结构是否完整。
+        结构不完整（例如被截断）时抛出 StoryStreamError。
+        """
+        if not self._root_started:
+            raise StoryStreamError("响应为空或不包含 JSON 对象")
+        if not self._story_array_closed:
+            raise StoryStreamError("complete_story 数组未完整输出，响应可能被截断")
+        if not self._root_closed:
+            raise StoryStreamError("JSON 根对象未闭合，响应可能被截断")
+
+    def _parse_segment(self, segment_text: str) -> 'StorySegment':
+        """解析单个段落对象并校验必需字段"""
+        try:
+            segment = json.loads(segment_text)
+        except json.JSONDecodeError as e:
+            raise StoryStreamError(f"段落 JSON 解析错误: {e}; 原始文本: {segment_text[:200]}...") from e
+
+        missing = [field for field in self.REQUIRED_FIELDS if not isinstance(segment.get(field), str)]
+        if missing:
+            raise StoryStreamError(f"段落缺少必需字段: {', '.join(missing)}")
+
+        self.segments_emitted += 1
+        if self.expected_segments is not None and self.segments_emitted > self.expected_segments:
+            raise StoryStreamError(f"段落数量超过预期的 {self.expected_segments} 段")
+
+        return typing.cast('StorySegment', segment)
+
+    def _parse_pages(self, tail_text: str):
+        """从根对象（不含 complete_story 数组）的文本中提取 pages 字段"""
+        match = re.search(r'"pages"\s*:\s*(\d+)', tail_text)
+        if match:
+            self.pages = int(match.group(1))
@@ -0,0 +1,167 @@
+import queue
+import threading
+import typing
+from collections import deque
+
+import config
+
+if typing.TYPE_CHECKING:
+    from modules.api_clients.stt_client import STTBackend
+
+
+class StreamingTranscriber:
+    '''
+    流式语音识别：录音过程中按到达的 PCM 块切分短句，每句结束（停顿超过 phrase_gap 秒）就交给后台线程识别。
+    说话结束时大部分短句已经识别完成，只需等待最后一句；部分识别结果可随时通过 take_partial() 取得。
+    调用方负责判断每个音频块是否有人声（feed 的 is_speech 参数），本类只处理分句和识别调度。
+    '''
+    def __init__(self, backend: 'STTBackend', sample_rate: int, sample_width: int = 2,
+                 phrase_gap: float = config.STT_PHRASE_GAP, end_silence: float = 3.0,
+                 pre_roll: float = 0.3, min_speech: float = 0.15, max_phrase: float = 10.0):
+        """
+        backend: 语音识别后端。
+        sample_rate / sample_width: PCM 的采样率和每个采样的字节数（单声道）。
+        phrase_gap: 停顿超过该秒数即结束当前短句并开始识别。
+        end_silence: 说过话之后静音超过该秒数即认为整段语音结束（utterance_ended）。
+        pre_roll: 短句开始前保留的音频秒数，避免切掉第一个音节。
+        min_speech: 人声少于该秒数的短句视为噪声，直接丢弃。
+        max_phrase: 短句的最长秒数，超过时强制切分，避免一句话过长导致识别延迟。
+        """
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.phrase_gap = phrase_gap
+        self.end_silence = end_silence
+        self.pre_roll = pre_roll
+        self.min_speech = min_speech
+        self.max_phrase = max_phrase
+
+        self._bytes_per_second = sample_rate * sample_width
+        self._pre_roll_chunks: deque[bytes] = deque()
+        self._pre_roll_bytes = 0
+        self._phrase: list[bytes] = []
+        # 时长都以字节数累计，避免浮点误差
+        self._phrase_bytes = 0
+        self._phrase_speech = 0
+        self._phrase_silence = 0
+        self._since_speech = 0
+        self._heard_speech = False
+
+        self._results: list[str] = []
+        self._partial_changed = False
+        self._submitted = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[bytes | None] = queue.Queue()
+        self._worker: threading.Thread | None = None
+
+    @property
+    def utterance_ended(self) -> bool:
+        """说过话之后已经静音足够长时间，可以停止录音"""
+        return self._heard_speech and self._since_speech >= self.end_silence * self._bytes_per_second
+
+    def feed(self, data: bytes | memoryview, is_speech: bool):
+        """
+        送入一个刚录到的 PCM 块。
+        录音方传入的可能是环形缓冲区的视图（memoryview），短句结束前数据可能已被覆盖，这里先复制一份（每块只有几十毫秒）。
+        """
+        data = bytes(data)
+        size = len(data)
+        if is_speech:
+            self._heard_speech = True
+            self._since_speech = 0
+        else:
+            self._since_speech += size
+
+        if self._phrase:
+            self._phrase.append(data)
+            self._phrase_bytes += size
+            if is_speech:
+                self._phrase_speech += size
+                self._phrase_silence = 0
+            else:
+                self._phrase_silence += size
+            if (self._phrase_silence >= self.phrase_gap * self._bytes_per_second
+                    or self._phrase_bytes >= self.max_phrase * self._bytes_per_second):
+                self._end_phrase()
+        elif is_speech:
+            # 新短句从保留的前导音频开始
+            self._phrase = list(self._pre_roll_chunks) + [data]
+            self._phrase_bytes = self._pre_roll_bytes + size
+            self._phrase_speech = size
+            self._phrase_silence = 0
+            self._pre_roll_chunks.clear()
+            self._pre_roll_bytes = 0
+        else:
+            self._pre_roll_chunks.append(data)
+            self._pre_roll_bytes += len(data)
+            max_bytes = self.pre_roll * self._bytes_per_second
+            while self._pre_roll_chunks and self._pre_roll_bytes - len(self._pre_roll_chunks[0]) >= max_bytes:
+                self._pre_roll_bytes -= len(self._pre_roll_chunks.popleft())
+
+    def take_partial(self) -> str | None:
+        """返回自上次调用以来更新过的部分识别结果，没有新结果时返回 None"""
+        with self._lock:
+            if not self._partial_changed:
+                return None
+            self._partial_changed = False
+            return "".join(self._results)
+
+    def pending_phrases(self) -> int:
+        """已结束但尚未识别完成的短句数（包括还没结束的当前短句）"""
+        with self._lock:
+            return self._submitted - self._completed + (1 if self._phrase else 0)
+
+    def finish(self, timeout: float | None = None) -> str | None:
+        """结束录音：提交最后一句，等待所有短句识别完成并返回完整文本（没有识别结果时返回 None）"""
+        if self._phrase:
+            self._end_phrase()
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join(timeout)
+        with self._lock:
+            text = "".join(self._results)
+        return text or None
+
+    def cancel(self):
+        """放弃识别：丢弃未开始的短句并结束后台线程"""
+        self._phrase = []
+        if self._worker is not None:
+            while not self._queue.empty():
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put(None)
+
+    def _end_phrase(self):
+        """当前短句结束：人声足够长时交给后台识别，否则当作噪声丢弃"""
+        phrase, speech = self._phrase, self._phrase_speech
+        self._phrase = []
+        self._phrase_bytes = self._phrase_speech = self._phrase_silence = 0
+        if speech < self.min_speech * self._bytes_per_second:
+            return
+
+        with self._lock:
+            self._submitted += 1
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._transcribe_worker, name="StreamingSTT", daemon=True)
+            self._worker.start()
+        self._queue.put(b''.join(phrase))
+
+    def _transcribe_worker(self):
+        """按顺序识别短句（单线程，保证结果顺序与说话顺序一致）"""
+        while True:
+            pcm = self._queue.get()
+            if pcm is None:
+                return
+            try:
+                text = self.backend.transcribe_pcm(pcm, self.sample_rate, self.sample_width)
+            except Exception as e:
+                print(f"短句识别失败: {e}")
+                text = None
+            with self._lock:
+                self._completed += 1
+                if text:
+                    self._results.append(text.strip())
+                    self._partial_changed = True
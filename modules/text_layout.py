@@ -0,0 +1,127 @@
+import threading
+import typing
+from collections import OrderedDict
+
+from modules.font_index import resolve_font
+
+if typing.TYPE_CHECKING:
+    from PIL import ImageFont
+
+# 换行结果缓存的最大条目数（页面文字、弹窗消息等）
+LAYOUT_CACHE_SIZE = 256
+
+
+class FontMetrics:
+    '''
+    单个字体的字符宽度表：每个字符只向字体查询一次宽度，之后直接查表。
+    西文字符对之间的字距调整（kerning）同样按字符对缓存；中文等全角字符之间不做字距调整。
+    主字体没有的字符按后备字体链（modules.font_index）测量，宽度同样只查询一次。
+    '''
+    # 低于该码位的字符才考虑字距调整（拉丁、希腊、西里尔字母及常用标点）
+    KERNING_MAX_CODEPOINT = 0x2E80
+
+    def __init__(self, font: 'ImageFont.FreeTypeFont'):
+        self.font = font
+        self._advances: dict[str, float] = {}
+        self._kerning: dict[typing.Tuple[str, str], float] = {}
+
+    def advance(self, char: str) -> float:
+        """字符的前进宽度（像素）"""
+        width = self._advances.get(char)
+        if width is None:
+            width = self._advances[char] = (float(resolve_font(self.font, char).getlength(char))
+                                            if char.isprintable() else 0.0)
+        return width
+
+    def kerning(self, left: str, right: str) -> float:
+        """两个相邻字符之间的字距修正（像素，通常为 0 或负数）"""
+        if (not left or ord(left) >= self.KERNING_MAX_CODEPOINT or ord(right) >= self.KERNING_MAX_CODEPOINT
+                or left.isspace() or right.isspace()):
+            return 0.0
+        if resolve_font(self.font, left) is not self.font or resolve_font(self.font, right) is not self.font:
+            return 0.0  # 不同字体的字符之间没有字距信息
+        pair = (left, right)
+        adjustment = self._kerning.get(pair)
+        if adjustment is None:
+            adjustment = float(self.font.getlength(left + right)) - self.advance(left) - self.advance(right)
+            # 忽略浮点误差级别的差值
+            self._kerning[pair] = adjustment = adjustment if abs(adjustment) >= 0.01 else 0.0
+        return adjustment
+
+    def measure(self, text: str) -> float:
+        """文本的总宽度（像素）"""
+        width = 0.0
+        previous = ""
+        for char in text:
+            width += self.kerning(previous, char) + self.advance(char)
+            previous = char
+        return width
+
+    def fit_tail(self, text: str, max_width: float) -> str:
+        """返回能放进 max_width 的最长文本末尾部分（用于输入框只显示最后输入的内容）"""
+        width = 0.0
+        start = len(text)
+        while start > 0:
+            char = text[start - 1]
+            next_char = text[start] if start < len(text) else ""
+            step = self.advance(char) + (self.kerning(char, next_char) if next_char else 0.0)
+            if width + step > max_width:
+                break
+            width += step
+            start -= 1
+        return text[start:]
+
+
+_font_metrics: dict[typing.Any, FontMetrics] = {}
+_layout_cache: OrderedDict[tuple, typing.Tuple[str, ...]] = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_font_metrics(font: 'ImageFont.FreeTypeFont') -> FontMetrics:
+    """获取字体共享的字符宽度表（换行和字形渲染共用）"""
+    metrics = _font_metrics.get(font)
+    if metrics is None:
+        with _lock:
+            metrics = _font_metrics.setdefault(font, FontMetrics(font))
+    return metrics
+
+
+def wrap_text(text: str, font: 'ImageFont.FreeTypeFont', max_width: int) -> typing.List[str]:
+    """
+    根据指定宽度和字体对文本进行换行，支持中英文混合，换行符强制换行。
+    逐字符累加宽度，一次遍历完成；结果按 (文本, 字体, 宽度) 缓存。
+    """
+    if not text:
+        return [""]
+
+    cache_key = (text, font, max_width)
+    with _lock:
+        lines = _layout_cache.get(cache_key)
+        if lines is not None:
+            _layout_cache.move_to_end(cache_key)
+            return list(lines)
+
+    metrics = get_font_metrics(font)
+    lines = []
+    for paragraph in text.split("\n"):
+        current_line = ""
+        line_width = 0.0
+        previous = ""
+        for char in paragraph:
+            char_width = metrics.kerning(previous, char) + metrics.advance(char)
+            if line_width + char_width <= max_width or not current_line:
+                # 单个字符就超过最大宽度时也强制放入当前行
+                current_line += char
+                line_width += char_width
+            else:
+                lines.append(current_line)
+                current_line = char
+                line_width = metrics.advance(char)
+            previous = char
+        lines.append(current_line)
+
+    with _lock:
+        _layout_cache[cache_key] = tuple(lines)
+        while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return lines
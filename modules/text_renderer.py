@@ -0,0 +1,112 @@
+import math
+import typing
+
+import pygame
+from PIL import Image, ImageDraw, ImageFont
+
+from modules.font_index import ScaledBitmapFont, resolve_font
+from modules.text_layout import get_font_metrics
+
+
+class GlyphAtlasRenderer:
+    '''
+    基于字形缓存的文本渲染器。
+    每个 (字体, 颜色, 字符) 只用 PIL 光栅化一次并转换为 pygame Surface，
+    之后渲染字符串时直接按字符宽度依次 blit 缓存的字形，不再为每行文字分配 PIL 图像并整块复制像素。
+    主字体没有的字符（例如 emoji）使用后备字体链中的字体光栅化，并按基线与主字体对齐。
+    只能在主线程中使用：字形转换需要调用 convert_alpha()（依赖显示表面），
+    页面预取也是通过 EventDispatcher.call_when_idle 在主线程空闲时合成页面，不会从其他线程调用。
+    '''
+    def __init__(self):
+        # (字体, 颜色, 字符) -> (字形 Surface 或 None（空白字符）, x 偏移, y 偏移)
+        self._glyphs: dict[tuple, typing.Tuple[pygame.Surface | None, int, int]] = {}
+        # 字体 -> (ascent, descent)
+        self._line_metrics: dict[ImageFont.FreeTypeFont, typing.Tuple[int, int]] = {}
+
+    def render(self, text: str, font: ImageFont.FreeTypeFont, color: tuple = (0, 0, 0),
+               padding: int = 5) -> pygame.Surface:
+        """
+        将单行文本渲染为带透明背景的 Surface。
+        text: 要渲染的文本（换行等控制字符不占宽度）。
+        font: PIL 字体对象，用于光栅化字形和计算字符宽度。
+        color: 文字颜色。
+        padding: 四周留白（像素）。
+        """
+        color = tuple(color)
+        ascent, descent = self._get_line_metrics(font)
+
+        # 先确定每个字形的位置，再一次性创建目标 Surface；字符宽度和字距与换行引擎共用同一张宽度表
+        metrics = get_font_metrics(font)
+        placements = []
+        pen_x = 0.0
+        right_edge = 0
+        previous = ""
+        for char in text:
+            if not char.isprintable():
+                continue
+            pen_x += metrics.kerning(previous, char)
+            glyph, offset_x, offset_y = self._get_glyph(font, color, char)
+            x = int(round(pen_x))
+            if glyph is not None:
+                placements.append((glyph, x + offset_x, offset_y))
+                right_edge = max(right_edge, x + offset_x + glyph.get_width())
+            pen_x += metrics.advance(char)
+            previous = char
+
+        width = max(1, max(int(math.ceil(pen_x)), right_edge) + padding * 2)
+        height = max(1, ascent + descent + padding * 2)
+        text_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        text_surface.blits([(glyph, (padding + x, padding + y)) for glyph, x, y in placements], doreturn=False)
+        return text_surface
+
+    def glyph_count(self) -> int:
+        """已缓存的字形数量"""
+        return len(self._glyphs)
+
+    def clear(self):
+        """清空字形缓存（例如切换字体后）"""
+        self._glyphs.clear()
+        self._line_metrics.clear()
+
+    def _get_line_metrics(self, font: ImageFont.FreeTypeFont) -> typing.Tuple[int, int]:
+        """获取字体的上行高度和下行高度，所有行使用相同的行高"""
+        metrics = self._line_metrics.get(font)
+        if metrics is None:
+            if hasattr(font, 'getmetrics'):
+                metrics = font.getmetrics()
+            else:
+                # 默认位图字体没有 getmetrics，用一个较高的字符估算
+                bbox = font.getbbox("Ag")
+                metrics = (bbox[3], 0)
+            self._line_metrics[font] = metrics
+        return metrics
+
+    def _get_glyph(self, font: ImageFont.FreeTypeFont, color: tuple,
+                   char: str) -> typing.Tuple[pygame.Surface | None, int, int]:
+        """从缓存中获取字形，未命中时用 PIL 光栅化一次"""
+        key = (font, color, char)
+        glyph = self._glyphs.get(key)
+        if glyph is not None:
+            return glyph
+
+        glyph_font = resolve_font(font, char)
+        left, top, right, bottom = glyph_font.getbbox(char)
+        glyph_image = None
+        if right > left and bottom > top:
+            if isinstance(glyph_font, ScaledBitmapFont):
+                glyph_image = glyph_font.render_glyph(char, color)
+            else:
+                glyph_image = Image.new('RGBA', (right - left, bottom - top), (255, 255, 255, 0))
+                ImageDraw.Draw(glyph_image).text((-left, -top), char, font=glyph_font, fill=color)
+
+        if glyph_image is None:
+            glyph = (None, 0, 0)  # 空格等没有可见像素的字符
+        else:
+            if glyph_font is not font:
+                # 后备字体的上行高度不同，按基线与主字体对齐
+                top += self._get_line_metrics(font)[0] - self._get_line_metrics(glyph_font)[0]
+            glyph_surface = pygame.image.fromstring(glyph_image.tobytes(), glyph_image.size, 'RGBA').convert_alpha()
+            glyph = (glyph_surface, left, top)
+
+        self._glyphs[key] = glyph
+        return glyph
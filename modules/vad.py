@@ -0,0 +1,192 @@
+import numpy as np
+
+import config
+
+# 16 位满幅的能量（用于换算 dBFS）以及数字静音时的能量下限
+_FULL_SCALE_POWER = 32768.0 ** 2
+_MIN_POWER = 1e-3
+
+
+def frame_features(frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    批量计算每一帧的能量（dBFS）和过零率。
+    frames: 形状为 (帧数, 每帧采样数) 的 int16 数组。
+    返回 (energy_db, zcr)，过零率为相邻采样符号变化的比例（0~1）。
+    """
+    samples = frames.astype(np.float32)
+    power = np.einsum('ij,ij->i', samples, samples) / frames.shape[1]
+    energy_db = 10.0 * np.log10(np.maximum(power, _MIN_POWER) / _FULL_SCALE_POWER)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+    return energy_db, zcr
+
+
+class AdaptiveVAD:
+    '''
+    自适应端点检测：不依赖固定的音量阈值，而是估计当前麦克风和房间的噪声底，按相对噪声底的能量判断人声。
+        - 开始录音时用最初 calibration 秒（通常是按下按钮前的前导音频）的低分位能量作为噪声底，
+          之后在非人声帧上慢速上调、快速下调，跟随环境噪声的变化；
+        - 能量高于噪声底 margin_db 的帧视为人声；能量稍低但过零率高的帧视为清辅音（如“s”“x”），
+          过零率接近白噪声且能量不够高的帧视为噪声；已经在说话时只需高于一半门限即可延续；
+        - 连续 min_speech 秒人声后才算开始说话，说话后静音超过 hangover 秒即结束；
+        - 始终没有开口时 no_speech_timeout 秒后结束，总时长达到 max_duration 秒时强制结束。
+    帧特征对整块数据批量计算，逐帧只做状态更新。
+    '''
+    def __init__(self, sample_rate: int, frame_size: int = 512,
+                 margin_db: float = config.VAD_MARGIN_DB,
+                 hangover: float = config.VAD_HANGOVER_SECONDS,
+                 max_duration: float = config.RECORDING_MAX_SECONDS,
+                 no_speech_timeout: float = config.VAD_NO_SPEECH_TIMEOUT,
+                 calibration: float = 0.25, min_speech: float = 0.1,
+                 fricative_zcr: float = 0.3, noise_zcr: float = 0.45,
+                 floor_rise: float = 0.02, min_floor_db: float = -75.0):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.margin_db = margin_db
+        self.fricative_zcr = fricative_zcr
+        self.noise_zcr = noise_zcr
+        self.floor_rise = floor_rise
+        self.min_floor_db = min_floor_db
+
+        frame_seconds = frame_size / sample_rate
+        self._calibration_frames = max(1, round(calibration / frame_seconds))
+        self._min_speech_frames = max(1, round(min_speech / frame_seconds))
+        self._hangover_frames = max(1, round(hangover / frame_seconds))
+        self._max_frames = int(max_duration / frame_seconds)
+        self._no_speech_frames = int(no_speech_timeout / frame_seconds)
+        self.reset()
+
+    def reset(self):
+        self.noise_floor_db: float | None = None
+        self.speech_started = False
+        self.ended = False
+        self.end_reason: str | None = None  # 'silence'、'no_speech' 或 'max_duration'
+        self.end_frame: int | None = None  # 结束时已处理的帧数
+        self.speech_start_frame: int | None = None
+        self.last_speech_frame: int | None = None
+        self.frames = 0
+        self._calibration: list[np.ndarray] = []
+        self._speech_run = 0
+        self._silence_run = 0
+
+    def restart(self):
+        """开始检测下一段语音，保留已估计的噪声底（持续监听时使用）"""
+        noise_floor_db = self.noise_floor_db
+        self.reset()
+        self.noise_floor_db = noise_floor_db
+
+    @property
+    def end_sample(self) -> int | None:
+        """结束位置（相对于第一帧的采样数）"""
+        return None if self.end_frame is None else self.end_frame * self.frame_size
+
+    def feed(self, frames: np.ndarray) -> np.ndarray:
+        """
+        送入若干完整的帧（形状为 (帧数, frame_size) 的 int16 数组，或长度为 frame_size 整数倍的一维数组）。
+        返回每一帧是否为人声；检测到结束后的帧不再处理（全部为 False）。
+        """
+        frames = frames.reshape(-1, self.frame_size)
+        flags = np.zeros(len(frames), dtype=bool)
+        if self.ended or not len(frames):
+            return flags
+
+        energy_db, zcr = frame_features(frames)
+        offset = 0
+        if self.noise_floor_db is None:
+            # 校准阶段：收集最初几帧的能量，取低分位数作为噪声底（前导音频里偶尔的人声不会抬高噪声底）
+            needed = self._calibration_frames - sum(len(chunk) for chunk in self._calibration)
+            offset = min(needed, len(frames))
+            self._calibration.append(energy_db[:offset])
+            if offset == needed:
+                collected = np.concatenate(self._calibration)
+                self.noise_floor_db = max(float(np.percentile(collected, 20)), self.min_floor_db)
+                self._calibration.clear()
+            # 校准用的帧只计时，不判断人声
+            for _ in range(offset):
+                self._update_state(False)
+            if offset == len(frames) or self.ended:
+                return flags
+
+        # 整块按块开始时的噪声底批量判断，噪声底的更新从下一块开始生效（每块只有几十毫秒）
+        strong, weak = self._classify(energy_db[offset:], zcr[offset:])
+        for i, (is_strong, is_weak) in enumerate(zip(strong.tolist(), weak.tolist()), offset):
+            # 双门限：高于门限的帧开始人声，人声持续中只需高于一半门限（音节尾部渐弱时不会提前断开）
+            is_speech = is_strong or (is_weak and self._speech_run > 0)
+            if not is_speech:
+                self._track_floor(float(energy_db[i]))
+            flags[i] = is_speech
+            self._update_state(is_speech)
+            if self.ended:
+                break
+        return flags
+
+    def _classify(self, energy_db: np.ndarray, zcr: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """返回 (strong, weak)：strong 为明确的人声帧，weak 为高于一半门限、可以延续人声的帧"""
+        above = energy_db - self.noise_floor_db
+        weak = above >= self.margin_db / 2
+        voiced = above >= self.margin_db
+        fricative = weak & (zcr >= self.fricative_zcr)
+        noise_like = (zcr >= self.noise_zcr) & (above < self.margin_db * 2)
+        return (voiced | fricative) & ~noise_like, weak & ~noise_like
+
+    def _track_floor(self, energy_db: float):
+        """非人声帧上更新噪声底：环境变安静时快速下调，变吵时慢速上调"""
+        if energy_db < self.noise_floor_db:
+            self.noise_floor_db = max((self.noise_floor_db + energy_db) / 2, self.min_floor_db)
+        else:
+            self.noise_floor_db += self.floor_rise * (energy_db - self.noise_floor_db)
+
+    def _update_state(self, is_speech: bool):
+        self.frames += 1
+        if is_speech:
+            self._speech_run += 1
+            self._silence_run = 0
+            self.last_speech_frame = self.frames
+            if not self.speech_started and self._speech_run >= self._min_speech_frames:
+                self.speech_started = True
+                self.speech_start_frame = self.frames - self._speech_run
+        else:
+            self._speech_run = 0
+            self._silence_run += 1
+
+        if self.speech_started and self._silence_run >= self._hangover_frames:
+            self._end('silence')
+        elif not self.speech_started and self.frames >= self._no_speech_frames:
+            self._end('no_speech')
+        elif self.frames >= self._max_frames:
+            self._end('max_duration')
+
+    def _end(self, reason: str):
+        self.ended = True
+        self.end_reason = reason
+        self.end_frame = self.frames
+
+
+class FixedThresholdVAD(AdaptiveVAD):
+    '''
+    原来的固定阈值判断（每帧平均幅度低于 silence_thresh 即为静音，连续静音 silence_limit 秒结束），
+    保留为 config.VAD_ADAPTIVE = False 时的行为，也作为基准测试的对照。
+    '''
+    def __init__(self, sample_rate: int, frame_size: int = 512, silence_thresh: float = 15000,
+                 silence_limit: float = 3.0, max_duration: float = config.RECORDING_MAX_SECONDS):
+        self.silence_thresh = silence_thresh
+        super().__init__(sample_rate, frame_size, hangover=silence_limit, max_duration=max_duration,
+                         no_speech_timeout=max_duration, min_speech=0.0)
+
+    def feed(self, frames: np.ndarray) -> np.ndarray:
+        frames = frames.reshape(-1, self.frame_size)
+        flags = np.zeros(len(frames), dtype=bool)
+        if self.ended:
+            return flags
+        levels = np.abs(frames, dtype=np.int32).mean(axis=1)
+        for i, level in enumerate(levels):
+            flags[i] = level >= self.silence_thresh
+            self._update_state(bool(flags[i]))
+            if self.ended:
+                break
+        return flags
+
+    def reset(self):
+        super().reset()
+        # 原来的行为：从录音开始就计算连续静音，不要求先开口
+        self.speech_started = True
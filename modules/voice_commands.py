@@ -0,0 +1,177 @@
+import json
+import threading
+import typing
+
+import config
+
+if typing.TYPE_CHECKING:
+    from modules.input_handler import AudioDeviceManager
+
+
+def build_grammar(commands: dict[str, str]) -> list[str]:
+    """
+    Vosk 的限定词表：每条指令同时给出整词和逐字两种写法（模型词表中不存在的写法会被忽略），
+    再加上 "[unk]" 吸收指令以外的声音，避免把任意语音都硬凑成指令。
+    """
+    grammar = []
+    for phrase in commands:
+        grammar.extend(dict.fromkeys((phrase, " ".join(phrase))))
+    grammar.append("[unk]")
+    return grammar
+
+
+def match_command(result_json: str, commands: dict[str, str], min_confidence: float) -> str | None:
+    """
+    解析 Vosk 的识别结果（需开启 SetWords），返回匹配的指令动作。
+    结果中含有 [unk]、与指令不完全一致或任一词的置信度低于 min_confidence 时返回 None。
+    """
+    try:
+        result = json.loads(result_json)
+    except ValueError:
+        return None
+    words = result.get("result") or []
+    text = "".join(word.get("word", "") for word in words) or result.get("text", "").replace(" ", "")
+    if not text or "[unk]" in text:
+        return None
+    if any(word.get("conf", 1.0) < min_confidence for word in words):
+        return None
+    return commands.get(text)
+
+
+class VoiceCommandListener:
+    '''
+    常开的语音指令监听：从共享麦克风（AudioDeviceManager）的环形缓冲区读取音频，不另外打开输入流。
+        - 平时每隔 POLL_SECONDS 秒醒来一次，只用自适应端点检测（modules.vad）判断有没有人说话，几乎不占 CPU；
+        - 检测到一段语音结束后，才把这一小段音频交给只认识指令词表的 Vosk 识别器（限定词表比完整识别快得多）；
+        - 超过 max_utterance 秒的语音（例如正常说话或朗读声）不做识别；
+        - 识别出指令后投递 VOICE_COMMAND_EVENT（event.action 为 'next'、'prev'、'quit'、'mute_toggle' 等）。
+    只在 set_active(True) 期间（翻页界面等待输入时）监听，其余时间线程阻塞等待，不读取音频。
+    '''
+    POLL_SECONDS = 0.25
+    PRE_ROLL_SECONDS = 0.2  # 识别时在语音开始前多取的音频，避免切掉第一个字
+
+    def __init__(self, device: 'AudioDeviceManager' = None,
+                 commands: dict[str, str] = config.VOICE_COMMANDS,
+                 model_path: str = config.VOSK_MODEL_PATH,
+                 max_utterance: float = config.VOICE_COMMAND_MAX_SECONDS,
+                 min_confidence: float = config.VOICE_COMMAND_MIN_CONFIDENCE):
+        self.device = device
+        self.commands = commands
+        self.model_path = model_path
+        self.max_utterance = max_utterance
+        self.min_confidence = min_confidence
+        self.recognized = 0  # 识别出的指令次数
+        self.rejected = 0  # 交给识别器但不是指令的语音段数
+
+        self._active = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> bool:
+        """加载模型并启动监听线程（此时还不监听，需要 set_active(True)）；模型或依赖不可用时返回 False"""
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        try:
+            import vosk
+            from modules.api_clients.stt_client import load_vosk_model
+
+            if self.device is None:
+                from modules.input_handler import audio_device_manager
+                self.device = audio_device_manager
+            recognizer = vosk.KaldiRecognizer(load_vosk_model(self.model_path), self.device.rate,
+                                              json.dumps(build_grammar(self.commands), ensure_ascii=False))
+            recognizer.SetWords(True)
+        except Exception as e:
+            print(f"语音指令不可用: {e}")
+            return False
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(recognizer,), name="VoiceCommands", daemon=True)
+        self._thread.start()
+        print(f"语音指令已启动: {'、'.join(self.commands)}")
+        return True
+
+    def set_active(self, active: bool):
+        """开始或暂停监听（暂停时监听线程不读取音频）"""
+        if active:
+            self._active.set()
+        else:
+            self._active.clear()
+
+    def stop(self):
+        """结束监听线程"""
+        self._stopped.set()
+        self._active.set()  # 唤醒等待中的线程
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self._active.clear()
+
+    def _run(self, recognizer):
+        while not self._stopped.is_set():
+            self._active.wait()
+            if self._stopped.is_set():
+                return
+            if not self.device.open():
+                print("麦克风无法打开，语音指令停止")
+                return
+            self._listen(recognizer)
+
+    def _listen(self, recognizer):
+        """监听直到被暂停或停止：从当前写入位置开始，每次批量检测新到的音频块"""
+        import numpy as np
+
+        from modules.vad import AdaptiveVAD
+
+        device = self.device
+        ring = device.ring
+        chunk = device.chunk
+        poll_samples = int(self.POLL_SECONDS * device.rate)
+        pre_roll = int(self.PRE_ROLL_SECONDS * device.rate)
+        # 指令词很短：静音 0.4 秒即结束一段语音，没人说话时 5 秒重新开始一轮（保留噪声底）
+        vad = AdaptiveVAD(device.rate, chunk, hangover=0.4, no_speech_timeout=5.0,
+                          max_duration=self.max_utterance + 5.0)
+        origin = position = ring.written - ring.written % chunk
+
+        while self._active.is_set() and not self._stopped.is_set():
+            written = device.wait_for_data(position + poll_samples, self.POLL_SECONDS * 2)
+            if written < position + chunk:
+                if device.is_stalled() and not device.recover():
+                    print("麦克风中断，语音指令停止")
+                    self._active.clear()
+                    return
+                continue
+            if written - position > ring.capacity - chunk:
+                # 落后太多（数据已被覆盖），从最新位置重新开始
+                origin = position = written - written % chunk
+                vad.restart()
+                continue
+
+            count = (written - position) // chunk
+            vad.feed(ring.view(position, position + count * chunk).reshape(count, chunk))
+            position += count * chunk
+
+            if not vad.ended:
+                continue
+
+            if vad.end_reason == 'silence':
+                speech_frames = vad.last_speech_frame - vad.speech_start_frame
+                if speech_frames * chunk <= self.max_utterance * device.rate:
+                    start = max(origin + vad.speech_start_frame * chunk - pre_roll, ring.written - ring.capacity)
+                    end = origin + vad.end_frame * chunk
+                    self._recognize(recognizer, np.ascontiguousarray(ring.view(start, end)))
+                # 较长的语音（正常说话、朗读声）不是指令，不做识别
+            # 从这一段结束的位置继续检测下一段（同一批中尚未检测的块会重新送入）
+            origin = position = origin + vad.frames * chunk
+            vad.restart()
+
+    def _recognize(self, recognizer, pcm):
+        recognizer.AcceptWaveform(pcm.tobytes())
+        action = match_command(recognizer.FinalResult(), self.commands, self.min_confidence)
+        if action is None:
+            self.rejected += 1
+            return
+        self.recognized += 1
+        print(f"识别到语音指令: {action}")
+        from modules.event_dispatcher import VOICE_COMMAND_EVENT, EventDispatcher
+        EventDispatcher.post(VOICE_COMMAND_EVENT, action=action)
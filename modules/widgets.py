@@ -0,0 +1,295 @@
+import typing
+
+import pygame
+
+from modules.text_layout import get_font_metrics
+
+if typing.TYPE_CHECKING:
+    from PIL import ImageFont
+    from modules.text_renderer import GlyphAtlasRenderer
+
+
+class Widget:
+    '''
+    保留模式界面控件的基类。
+    每个控件缓存自己绘制好的 Surface（不含子控件），只有内容改变时才重新绘制；
+    控件改变时把自己在屏幕上的区域报告给根节点，由根节点只重绘并提交这些区域。
+    rect 为相对父控件的位置和大小。
+    '''
+    def __init__(self, rect: pygame.Rect | tuple, value: typing.Any = None):
+        self.rect = pygame.Rect(rect)
+        self.value = value  # 点击控件时返回的值（按钮等可交互控件）
+        self.parent: 'Widget | None' = None
+        self.children: list['Widget'] = []
+        self.visible = True
+        self._surface: pygame.Surface | None = None
+        self._surface_valid = False
+
+    def add(self, child: 'Widget') -> 'Widget':
+        """添加子控件并返回该子控件"""
+        child.parent = self
+        self.children.append(child)
+        child.invalidate()
+        return child
+
+    def absolute_rect(self) -> pygame.Rect:
+        """控件在屏幕上的位置"""
+        rect = self.rect.copy()
+        parent = self.parent
+        while parent is not None:
+            rect.move_ip(parent.rect.topleft)
+            parent = parent.parent
+        return rect
+
+    def invalidate(self):
+        """内容已改变：丢弃缓存的 Surface 并将所在区域标记为需要重绘"""
+        self._surface_valid = False
+        root = self
+        while root.parent is not None:
+            root = root.parent
+        if isinstance(root, WidgetScreen):
+            root.mark_dirty(self.absolute_rect())
+
+    def set_visible(self, visible: bool):
+        if visible != self.visible:
+            self.visible = visible
+            self.invalidate()
+
+    def get_surface(self) -> pygame.Surface | None:
+        if not self._surface_valid:
+            self._surface = self._render()
+            self._surface_valid = True
+        return self._surface
+
+    def _render(self) -> pygame.Surface | None:
+        """绘制控件本身（不含子控件），由子类实现"""
+        return None
+
+    def draw(self, target: pygame.Surface, offset: typing.Tuple[int, int] = (0, 0)):
+        """将控件及其子控件绘制到 target（target 的裁剪区域决定实际绘制的范围）"""
+        if not self.visible:
+            return
+        position = (offset[0] + self.rect.x, offset[1] + self.rect.y)
+        surface = self.get_surface()
+        if surface is not None:
+            target.blit(surface, position)
+        for child in self.children:
+            child.draw(target, position)
+
+    def find_value_at(self, pos: typing.Tuple[int, int]) -> typing.Any:
+        """返回屏幕坐标 pos 处最上层可交互控件的 value，没有则返回 None"""
+        if not self.visible:
+            return None
+        for child in reversed(self.children):
+            value = child.find_value_at(pos)
+            if value is not None:
+                return value
+        if self.value is not None and self.absolute_rect().collidepoint(pos):
+            return self.value
+        return None
+
+
+class Panel(Widget):
+    '''纯色背景（可带边框、半透明）的容器，例如弹窗背景或全屏遮罩'''
+    def __init__(self, rect, color: tuple = (255, 255, 255), border_color: tuple | None = None,
+                 border_width: int = 0, value: typing.Any = None):
+        super().__init__(rect, value)
+        self.color = color
+        self.border_color = border_color
+        self.border_width = border_width
+
+    def _render(self) -> pygame.Surface:
+        flags = pygame.SRCALPHA if len(self.color) == 4 else 0
+        surface = pygame.Surface(self.rect.size, flags)
+        surface.fill(self.color)
+        if self.border_color and self.border_width:
+            pygame.draw.rect(surface, self.border_color, surface.get_rect(), self.border_width)
+        return surface
+
+
+class ImagePane(Widget):
+    '''显示一张已经准备好的 Surface（页面画面、图片按钮等）'''
+    def __init__(self, rect, image: pygame.Surface | None, value: typing.Any = None):
+        super().__init__(rect, value)
+        self.image = image
+
+    def set_image(self, image: pygame.Surface | None):
+        if image is not self.image:
+            self.image = image
+            self.invalidate()
+
+    def _render(self) -> pygame.Surface | None:
+        return self.image
+
+
+class Label(Widget):
+    '''一行或多行文字，在控件区域内居中（或左对齐）显示'''
+    def __init__(self, rect, text: str, font: 'ImageFont.FreeTypeFont', renderer: 'GlyphAtlasRenderer',
+                 color: tuple = (0, 0, 0), align: str = 'center', line_height: int | None = None, padding: int = 5):
+        super().__init__(rect)
+        self.text = text
+        self.font = font
+        self.renderer = renderer
+        self.color = color
+        self.align = align
+        self.line_height = line_height
+        self.padding = padding
+
+    def set_text(self, text: str, color: tuple | None = None):
+        if text != self.text or (color is not None and color != self.color):
+            self.text = text
+            self.color = color or self.color
+            self.invalidate()
+
+    def _render(self) -> pygame.Surface:
+        surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        lines = self.text.split("\n") if self.text else []
+        line_surfaces = [self.renderer.render(line, self.font, self.color, self.padding) for line in lines]
+        if not line_surfaces:
+            return surface
+
+        line_height = self.line_height or line_surfaces[0].get_height()
+        top = (self.rect.height - line_height * len(line_surfaces)) // 2
+        for i, line_surface in enumerate(line_surfaces):
+            center_y = top + i * line_height + line_height // 2
+            if self.align == 'left':
+                line_rect = line_surface.get_rect(midleft=(0, center_y))
+            else:
+                line_rect = line_surface.get_rect(center=(self.rect.width // 2, center_y))
+            surface.blit(line_surface, line_rect)
+        return surface
+
+
+class Button(Widget):
+    '''带背景色、边框和居中文字的按钮'''
+    def __init__(self, rect, text: str, font: 'ImageFont.FreeTypeFont', renderer: 'GlyphAtlasRenderer',
+                 value: typing.Any, color: tuple = (70, 130, 180), text_color: tuple = (255, 255, 255),
+                 border_color: tuple = (50, 50, 50), border_width: int = 2):
+        super().__init__(rect, value)
+        self.text = text
+        self.font = font
+        self.renderer = renderer
+        self.color = color
+        self.text_color = text_color
+        self.border_color = border_color
+        self.border_width = border_width
+
+    def _render(self) -> pygame.Surface:
+        surface = pygame.Surface(self.rect.size)
+        surface.fill(self.color)
+        pygame.draw.rect(surface, self.border_color, surface.get_rect(), self.border_width)
+        text_surface = self.renderer.render(self.text, self.font, self.text_color, padding=0)
+        surface.blit(text_surface, text_surface.get_rect(center=surface.get_rect().center))
+        return surface
+
+
+class TextInput(Widget):
+    '''单行文本输入框：过长时只显示末尾部分，激活时显示光标'''
+    def __init__(self, rect, font: 'ImageFont.FreeTypeFont', renderer: 'GlyphAtlasRenderer',
+                 placeholder: str = "", max_length: int = 100):
+        super().__init__(rect, value='input')
+        self.font = font
+        self.renderer = renderer
+        self.placeholder = placeholder
+        self.max_length = max_length
+        self.text = ""
+        self.active = True
+        self.cursor_visible = True
+
+    def set_text(self, text: str):
+        text = text[:self.max_length]
+        if text != self.text:
+            self.text = text
+            self.cursor_visible = True  # 输入时光标保持可见
+            self.invalidate()
+
+    def set_active(self, active: bool):
+        if active != self.active:
+            self.active = active
+            self.invalidate()
+
+    def toggle_cursor(self):
+        self.cursor_visible = not self.cursor_visible
+        if self.active and self.text:
+            self.invalidate()
+
+    def _render(self) -> pygame.Surface:
+        surface = pygame.Surface(self.rect.size)
+        surface.fill((255, 255, 255) if self.active else (245, 245, 245))
+        pygame.draw.rect(surface, (70, 130, 180) if self.active else (200, 200, 200), surface.get_rect(), 2)
+
+        display_text = self.text or self.placeholder
+        if not display_text:
+            return surface
+
+        # 如果文本太长，只显示末尾部分
+        metrics = get_font_metrics(self.font)
+        display_text = metrics.fit_tail(display_text, self.rect.width - 20)
+        text_color = (50, 50, 50) if self.text else (150, 150, 150)
+        text_surface = self.renderer.render(display_text, self.font, text_color, padding=0)
+        surface.blit(text_surface, text_surface.get_rect(midleft=(10, self.rect.height // 2)))
+
+        if self.active and self.cursor_visible and self.text:
+            cursor_x = 10 + metrics.measure(display_text)
+            if cursor_x < self.rect.width - 10:
+                pygame.draw.line(surface, (50, 50, 50), (cursor_x, 8), (cursor_x, self.rect.height - 8), 2)
+        return surface
+
+
+class WidgetScreen(Widget):
+    '''
+    控件树的根节点，对应整个屏幕。
+    收集子控件报告的脏区域，present() 只重绘这些区域并用 pygame.display.update(rects) 提交。
+    '''
+    def __init__(self, size: typing.Tuple[int, int], background: tuple | None = (255, 255, 255)):
+        super().__init__((0, 0, *size))
+        self.background = background
+        self._dirty_rects: list[pygame.Rect] = []
+        self._full_redraw = True
+
+    def mark_dirty(self, rect: pygame.Rect):
+        clipped = rect.clip(self.rect)
+        if clipped.width and clipped.height:
+            self._dirty_rects.append(clipped)
+
+    def _render(self) -> pygame.Surface | None:
+        if self.background is None:
+            return None
+        surface = pygame.Surface(self.rect.size)
+        surface.fill(self.background)
+        return surface
+
+    def present(self, display: pygame.Surface, full: bool = False):
+        """
+        将变化提交到屏幕。
+        full: 为 True 时（例如刚切换到这个界面）重绘整个屏幕并 flip。
+        """
+        if full or self._full_redraw:
+            self.draw(display)
+            pygame.display.flip()
+        elif self._dirty_rects:
+            rects = self._merge_rects(self._dirty_rects)
+            for rect in rects:
+                display.set_clip(rect)
+                self.draw(display)
+            display.set_clip(None)
+            pygame.display.update(rects)
+        self._dirty_rects = []
+        self._full_redraw = False
+
+    def invalidate_all(self):
+        """下一次 present 时重绘整个屏幕"""
+        self._full_redraw = True
+
+    @staticmethod
+    def _merge_rects(rects: list[pygame.Rect]) -> list[pygame.Rect]:
+        """合并相互重叠的脏区域，避免同一区域重复绘制"""
+        merged: list[pygame.Rect] = []
+        for rect in rects:
+            rect = rect.copy()
+            overlapping = [other for other in merged if other.colliderect(rect)]
+            for other in overlapping:
+                merged.remove(other)
+                rect.union_ip(other)
+            merged.append(rect)
+        return merged
@@ -0,0 +1,95 @@
+import argparse
+import os
+import sys
+import time
+import wave
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.api_clients.stt_client import create_stt_backend
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "stt")
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """字符级编辑距离，用于计算字错误率"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def _load_fixtures(fixture_dir: str) -> list[tuple]:
+    """读取录音样本：每个 .wav 文件可附带同名 .txt 作为参考文本"""
+    fixtures = []
+    for filename in sorted(os.listdir(fixture_dir)):
+        if not filename.lower().endswith(".wav"):
+            continue
+        path = os.path.join(fixture_dir, filename)
+        with wave.open(path, 'rb') as wav_file:
+            pcm = wav_file.readframes(wav_file.getnframes())
+            sample_rate = wav_file.getframerate()
+            sample_width = wav_file.getsampwidth()
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        reference = None
+        if os.path.exists(reference_path):
+            with open(reference_path, 'r', encoding='utf-8') as f:
+                reference = f.read().strip()
+        fixtures.append((filename, pcm, sample_rate, sample_width, reference))
+    return fixtures
+
+
+def benchmark_stt(backend_names: list[str], fixture_dir: str):
+    """逐个后端识别所有样本，统计延迟、CPU 时间和字错误率"""
+    print("----- 语音识别后端性能对比 -----")
+    fixtures = _load_fixtures(fixture_dir)
+    if not fixtures:
+        print(f"没有找到录音样本: {fixture_dir}（放入 16 位单声道 .wav 文件，可附带同名 .txt 参考文本）")
+        return
+
+    for name in backend_names:
+        backend = create_stt_backend(name)
+        if not backend.is_available():
+            print(f"\n[{name}] 不可用，跳过")
+            continue
+
+        # 预热一次（加载离线模型、建立连接），不计入统计
+        _, pcm, sample_rate, sample_width, _ = fixtures[0]
+        backend.transcribe_pcm(pcm, sample_rate, sample_width)
+
+        print(f"\n[{name}]")
+        total_latency = total_cpu = 0.0
+        errors = reference_chars = 0
+        for filename, pcm, sample_rate, sample_width, reference in fixtures:
+            cpu_start = time.process_time()
+            start = time.perf_counter()
+            text = backend.transcribe_pcm(pcm, sample_rate, sample_width) or ""
+            latency = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            total_latency += latency
+            total_cpu += cpu
+            if reference is not None:
+                errors += _edit_distance(reference, text)
+                reference_chars += len(reference)
+            audio_seconds = len(pcm) / (sample_rate * sample_width)
+            print(f"  {filename}: {latency * 1000:7.0f} ms  CPU {cpu * 1000:7.0f} ms  "
+                  f"(音频 {audio_seconds:.1f} s)  {text}")
+
+        count = len(fixtures)
+        print(f"  平均延迟 {total_latency / count * 1000:.0f} ms，平均 CPU 时间 {total_cpu / count * 1000:.0f} ms")
+        if reference_chars:
+            print(f"  字错误率 {errors / reference_chars:.1%}")
+
+    print("\n----- 语音识别后端性能对比完成 -----")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对比语音识别后端的延迟、CPU 时间和准确率")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR, help="录音样本目录")
+    parser.add_argument("--backends", nargs="+", default=["vosk", "google", "offline_first", "race"])
+    args = parser.parse_args()
+    benchmark_stt(args.backends, args.fixtures)
@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.vad import AdaptiveVAD, FixedThresholdVAD
+from vad_fixtures import (DEFAULT_FIXTURE_DIR, FRAME_SIZE, SAMPLE_RATE, frame_accuracy, recorded_fixtures,
+                           replay, synthetic_fixtures)
+
+
+def benchmark_vad(fixture_dir: str, hangover: float):
+    """
+    对比自适应端点检测和原来的固定阈值：
+    结束延迟（最后一段人声结束到停止录音的秒数，负数表示截断了人声）、帧判断准确率、结束原因和 CPU 时间。
+    """
+    print("----- 录音端点检测对比 -----")
+    fixtures = synthetic_fixtures() + recorded_fixtures(fixture_dir)
+    detectors = {
+        "adaptive": lambda: AdaptiveVAD(SAMPLE_RATE, FRAME_SIZE, hangover=hangover),
+        "fixed": lambda: FixedThresholdVAD(SAMPLE_RATE, FRAME_SIZE),
+    }
+
+    for name, create in detectors.items():
+        print(f"\n[{name}]")
+        latencies = []
+        truncated = wrong_reason = 0
+        total_cpu = total_audio = 0.0
+        for fixture in fixtures:
+            result = replay(create(), fixture['samples'])
+            accuracy = frame_accuracy(result['flags'], fixture['speech'])
+            total_cpu += result['cpu']
+            total_audio += len(result['flags']) * FRAME_SIZE / SAMPLE_RATE
+            wrong_reason += result['reason'] != fixture['expect']
+
+            latency_text = "     -  "
+            if fixture['speech'] and result['end_time'] is not None:
+                latency = result['end_time'] - fixture['speech'][-1][1]
+                latencies.append(latency)
+                truncated += latency < 0
+                latency_text = f"{latency:+6.2f} s"
+            end_text = f"{result['end_time']:5.2f} s" if result['end_time'] is not None else "未结束"
+            print(f"  {fixture['name']:<20} 结束 {end_text}  延迟 {latency_text}  "
+                  f"准确率 {accuracy:6.1%}  {result['reason']}")
+
+        if latencies:
+            print(f"  平均结束延迟 {sum(latencies) / len(latencies):+.2f} s，截断人声 {truncated} 次")
+        print(f"  结束原因不符 {wrong_reason} 次，CPU 占用 {total_cpu / max(total_audio, 1e-9):.2%}（相对音频时长）")
+
+    print("\n----- 录音端点检测对比完成 -----")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="用合成样本和录制样本回放对比录音端点检测")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR,
+                        help="录制样本目录（16 kHz 16 位单声道 .wav，附带同名 .json 人声区间标注）")
+    parser.add_argument("--hangover", type=float, default=0.8, help="自适应检测的结束静音秒数")
+    args = parser.parse_args()
+    benchmark_vad(args.fixtures, args.hangover)
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.asset_cache import ContentCache
+
+
+def _write_bytes(size: int):
+    """返回一个向指定路径写入 size 字节的 writer"""
+    def writer(path: str):
+        with open(path, 'wb') as f:
+            f.write(b'\0' * size)
+    return writer
+
+
+def test_asset_cache():
+    """验证缓存命中、LRU 淘汰以及重启后索引的恢复"""
+    print("----- 正在测试 asset_cache 模块 -----")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ContentCache(cache_dir, max_bytes=300, name="测试缓存")
+        keys = [ContentCache.make_key("model", f"prompt {i}", "角色") for i in range(4)]
+
+        # 1. 未命中后写入，再次查找命中
+        assert cache.get(keys[0]) is None
+        path = cache.put(keys[0], _write_bytes(100), suffix=".png")
+        assert path and os.path.exists(path)
+        assert cache.get(keys[0]) == path
+        print("写入后再次查找命中缓存")
+
+        # 2. 超过容量上限时淘汰最久未使用的条目
+        cache.put(keys[1], _write_bytes(100), suffix=".png")
+        cache.put(keys[2], _write_bytes(100), suffix=".png")
+        cache.get(keys[0])  # keys[0] 变为最近使用，keys[1] 成为最久未使用
+        cache.put(keys[3], _write_bytes(100), suffix=".png")
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+        assert cache.stats()['evictions'] == 1
+        print("超出容量后淘汰了最久未使用的条目")
+
+        # 3. 命中只更新内存中的访问时间，flush 时才写回索引
+        index_path = os.path.join(cache_dir, ContentCache.INDEX_FILENAME)
+        with open(index_path, 'rb') as f:
+            saved_index = f.read()
+        cache.get(keys[2])
+        with open(index_path, 'rb') as f:
+            assert f.read() == saved_index
+        cache.flush()
+        with open(index_path, 'rb') as f:
+            assert f.read() != saved_index
+        print("命中缓存时不写索引文件，flush 后写回")
+
+        # 4. 重新创建缓存对象（模拟程序重启），索引仍然有效
+        reopened = ContentCache(cache_dir, max_bytes=300, name="测试缓存")
+        assert reopened.get(keys[3]) is not None
+        assert reopened.stats()['entries'] == 3
+        reopened.print_stats()
+
+    print("\n----- asset_cache 模块测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_asset_cache()
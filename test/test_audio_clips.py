@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+import pytest
+
+from modules.audio_clips import ClipCache
+
+# 替身混音器参数：1000 Hz、16 位、单声道，每秒音频解码后占 2000 字节
+MIXER_INIT = (1000, -16, 1)
+BYTES_PER_SECOND = 2000
+
+
+class FakeSound:
+    """替身 pygame.mixer.Sound：不解码文件，时长由文件名决定，并记录每个文件被解码的次数"""
+    lengths: dict[str, float] = {}
+    loads: list[str] = []
+
+    def __init__(self, path: str):
+        self.path = path
+        FakeSound.loads.append(os.path.basename(path))
+
+    def get_length(self) -> float:
+        return FakeSound.lengths[os.path.basename(self.path)]
+
+
+@pytest.fixture
+def clip_files(monkeypatch):
+    """用替身替换解码函数，并生成几个空的音频文件（ClipCache 只检查文件是否存在）"""
+    monkeypatch.setattr(pygame.mixer, "Sound", FakeSound)
+    monkeypatch.setattr(pygame.mixer, "get_init", lambda: MIXER_INIT)
+    FakeSound.lengths = {"a.wav": 1.0, "b.wav": 1.0, "c.wav": 1.0, "d.wav": 1.0, "long.wav": 5.0}
+    FakeSound.loads = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = {}
+        for name in FakeSound.lengths:
+            paths[name] = os.path.join(temp_dir, name)
+            with open(paths[name], 'wb') as f:
+                f.write(b'\0')
+        yield paths
+
+
+def test_eviction_at_byte_budget(clip_files):
+    """验证超出字节预算时淘汰最久未使用的音频，刚解码的音频即使超出预算也保留"""
+    cache = ClipCache(max_bytes=5000)
+
+    # 1. 命中不重复解码，并把音频移到最近使用的位置
+    sound_a = cache.get(clip_files["a.wav"])
+    cache.get(clip_files["b.wav"])
+    assert cache.get(clip_files["a.wav"]) is sound_a
+    assert cache.stats() == {'clips': 2, 'bytes': 2 * BYTES_PER_SECOND, 'hits': 1, 'misses': 2}
+
+    # 2. 第三个音频超出预算：淘汰最久未使用的 b，保留刚使用过的 a
+    cache.get(clip_files["c.wav"])
+    assert cache.stats()['clips'] == 2 and cache.stats()['bytes'] == 2 * BYTES_PER_SECOND
+    assert cache.get(clip_files["a.wav"]) is sound_a
+    cache.get(clip_files["b.wav"])
+    assert FakeSound.loads == ["a.wav", "b.wav", "c.wav", "b.wav"]
+
+    # 3. 单个音频超出预算时淘汰其他所有音频，只保留它自己
+    cache.get(clip_files["long.wav"])
+    assert cache.stats()['clips'] == 1 and cache.stats()['bytes'] == 5 * BYTES_PER_SECOND
+
+    # 4. 不存在的文件不解码
+    assert cache.get(clip_files["a.wav"] + ".missing") is None
+    assert FakeSound.loads[-1] == "long.wav"
+    print("按字节预算淘汰正确")
+
+
+def test_preload_skips_cached_paths(clip_files):
+    """验证预取时已缓存的音频不会重新解码，预取完成后播放直接命中"""
+    cache = ClipCache(max_bytes=10 * BYTES_PER_SECOND)
+    sound_a = cache.get(clip_files["a.wav"])
+
+    cache.preload([clip_files["a.wav"], None, clip_files["d.wav"]])
+    deadline = time.monotonic() + 2.0
+    while cache.stats()['clips'] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    cache.stop()
+
+    assert FakeSound.loads == ["a.wav", "d.wav"]
+    misses = cache.stats()['misses']
+    assert cache.get(clip_files["a.wav"]) is sound_a
+    assert cache.get(clip_files["d.wav"]).path == clip_files["d.wav"]
+    assert cache.stats()['misses'] == misses and FakeSound.loads == ["a.wav", "d.wav"]
+    print("预取跳过已缓存的音频")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,160 @@
+import os
+import sys
+import tempfile
+import time
+import wave
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+import pytest
+
+from modules.audio_clips import ClipCache
+from modules.audio_engine import AudioEngine
+from modules.event_dispatcher import NARRATION_END_EVENT
+
+CLIP_SECONDS = 0.2
+SEGMENT_SECONDS = 0.15
+
+
+def _write_wav(path: str, seconds: float):
+    """生成一段低音量的单声道 16 位 WAV"""
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(22050)
+        wav_file.writeframes(b'\x10\x00' * int(22050 * seconds))
+
+
+@pytest.fixture(scope="module")
+def engine_and_files():
+    """在 dummy 音频驱动上启动一个音频引擎（事件队列需要先初始化显示子系统）"""
+    pygame.display.init()
+    engine = AudioEngine(ClipCache(16 * 1024 * 1024))
+    if not engine.mixer_initialized:
+        pytest.skip("混音器无法初始化")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = {'clip': os.path.join(temp_dir, "clip.wav"), 'long': os.path.join(temp_dir, "long.wav")}
+        _write_wav(files['clip'], CLIP_SECONDS)
+        _write_wav(files['long'], 1.0)
+        files['segments'] = []
+        for index in range(3):
+            path = os.path.join(temp_dir, f"segment_{index}.wav")
+            _write_wav(path, SEGMENT_SECONDS)
+            files['segments'].append(path)
+        yield engine, files
+    engine.shutdown()
+    pygame.display.quit()
+
+
+def _end_events(settle: float = 0.2) -> int:
+    """等待可能迟到的结束事件，返回队列中 NARRATION_END_EVENT 的个数"""
+    time.sleep(settle)
+    return len(pygame.event.get(NARRATION_END_EVENT))
+
+
+def test_clip_posts_end_event_once(engine_and_files):
+    engine, files = engine_and_files
+    pygame.event.clear()
+
+    start = time.monotonic()
+    engine.play(files['clip'])
+    assert engine.wait_until_finished(3.0)
+    # 播放前的 _halt 不会让等待提前返回
+    assert time.monotonic() - start >= CLIP_SECONDS * 0.75
+    assert _end_events() == 1
+    assert not engine.is_playing and engine.current_audio_file is None
+
+    # 播放中被新的音频取代：只有后一段会通知
+    engine.play(files['long'])
+    time.sleep(0.1)
+    engine.play(files['clip'])
+    assert engine.wait_until_finished(3.0)
+    assert _end_events(1.0) == 1
+    print("单段音频只投递一次结束事件")
+
+
+def test_stream_posts_end_event_once(engine_and_files):
+    engine, files = engine_and_files
+    pygame.event.clear()
+
+    # 1. 所有片段先到达：排队衔接，最后一个片段播完时投递一次
+    start = time.monotonic()
+    stream_id = engine.start_stream()
+    for path in files['segments']:
+        engine.add_to_stream(stream_id, path)
+    engine.end_stream(stream_id)
+    assert engine.wait_until_finished(3.0)
+    assert time.monotonic() - start >= 3 * SEGMENT_SECONDS * 0.75
+    assert _end_events() == 1
+
+    # 2. 片段陆续到达，最后一个片段播完后才收到 end_stream：由引擎手动投递一次
+    stream_id = engine.start_stream()
+    engine.add_to_stream(stream_id, files['segments'][0])
+    time.sleep(SEGMENT_SECONDS / 2)
+    engine.add_to_stream(stream_id, files['segments'][1])
+    time.sleep(2 * SEGMENT_SECONDS + 0.1)
+    assert engine.is_playing  # 还在等待后续片段
+    assert _end_events(0) == 0
+    engine.end_stream(stream_id)
+    assert engine.wait_until_finished(3.0)
+    assert _end_events() == 1
+    assert engine.current_stream is None
+    print("分段朗读只投递一次结束事件")
+
+
+def test_wait_blocks_after_queued_stop(engine_and_files):
+    """验证 play() 之前排队的 stop() 被处理时不会提前标记空闲，wait_until_finished 一直等到新音频播完"""
+    engine, files = engine_and_files
+    pygame.event.clear()
+
+    for stop_first in (True, False):
+        engine.play(files['long'])
+        time.sleep(0.05)
+        # 一连串 stop/preload 排在 play 之前，引擎处理它们时调用方已经清除了空闲标记
+        for _ in range(20):
+            if stop_first:
+                engine.stop()
+            else:
+                engine.preload([])
+        start = time.monotonic()
+        engine.play(files['clip'])
+        assert not engine.wait_until_finished(CLIP_SECONDS / 2)
+        assert engine.wait_until_finished(3.0)
+        assert time.monotonic() - start >= CLIP_SECONDS * 0.75
+        assert _end_events() == 1
+    print("排队的停止命令不会让等待提前返回")
+
+
+def test_no_end_event_after_stop(engine_and_files):
+    engine, files = engine_and_files
+    pygame.event.clear()
+
+    # 1. 停止单段音频
+    engine.play(files['long'])
+    time.sleep(0.1)
+    engine.stop()
+    assert engine.wait_until_finished(1.0)
+    assert _end_events(1.2) == 0
+
+    # 2. 停止分段朗读（排队中的片段也不再播放），之后迟到的片段和 end_stream 被忽略
+    stream_id = engine.start_stream()
+    for path in files['segments'][:2]:
+        engine.add_to_stream(stream_id, path)
+    time.sleep(SEGMENT_SECONDS / 2)
+    engine.stop()
+    assert engine.wait_until_finished(1.0)
+    assert engine.latest_stream is None
+    engine.add_to_stream(stream_id, files['segments'][2])
+    engine.end_stream(stream_id)
+    assert _end_events(3 * SEGMENT_SECONDS + 0.2) == 0
+    assert not engine.is_playing
+    print("停止后不会投递结束事件")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,95 @@
+import os
+import struct
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.font_index import FontIndex, parse_font_file
+
+
+def _build_font(ranges: list, glyph_count: int, cmap_format: int = 12) -> bytes:
+    """构造只含 head、hhea、maxp 和 cmap 表的最小字体文件，ranges 为覆盖的码位区间列表"""
+    if cmap_format == 12:
+        groups = b''.join(struct.pack(">III", start, end, 1) for start, end in ranges)
+        subtable = struct.pack(">HHIII", 12, 0, 16 + len(groups), 0, len(ranges)) + groups
+        cmap = struct.pack(">HHHHI", 0, 1, 3, 10, 12) + subtable
+    else:
+        segments = list(ranges) + [(0xFFFF, 0xFFFF)]
+        seg_count = len(segments)
+        subtable = struct.pack(">HHHHHHH", 4, 16 + seg_count * 8, 0, seg_count * 2, 0, 0, 0)
+        subtable += struct.pack(f">{seg_count}H", *(end for _, end in segments)) + b'\0\0'
+        subtable += struct.pack(f">{seg_count}H", *(start for start, _ in segments))
+        subtable += struct.pack(f">{seg_count}h", *([1 - start for start, _ in ranges] + [1]))
+        subtable += struct.pack(f">{seg_count}H", *([0] * seg_count))
+        cmap = struct.pack(">HHHHI", 0, 1, 3, 1, 12) + subtable
+
+    tables = {
+        b'cmap': cmap,
+        b'head': b'\0' * 18 + struct.pack(">H", 1000) + b'\0' * 32,
+        b'hhea': b'\0' * 4 + struct.pack(">hhh", 880, -120, 0) + b'\0' * 26,
+        b'maxp': struct.pack(">IH", 0x5000, glyph_count),
+    }
+    data = struct.pack(">IHHHH", 0x00010000, len(tables), 0, 0, 0)
+    offset = 12 + 16 * len(tables)
+    body = b''
+    for tag, table in tables.items():
+        data += struct.pack(">4sIII", tag, 0, offset + len(body), len(table))
+        body += table + b'\0' * (-len(table) % 4)
+    return data + body
+
+
+def test_font_index():
+    """验证 cmap 解析、覆盖位图、主字体选择、后备顺序以及索引的持久化和目录变化后的重新扫描"""
+    print("----- 正在测试 font_index 模块 -----")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        font_dir = os.path.join(temp_dir, "fonts")
+        os.makedirs(font_dir)
+        latin_path = os.path.join(font_dir, "latin.ttf").replace(os.sep, '/')
+        cjk_path = os.path.join(font_dir, "cjk.ttf").replace(os.sep, '/')
+        with open(latin_path, 'wb') as f:
+            f.write(_build_font([(0x20, 0x7E), (0xE9, 0xE9)], 200, cmap_format=4))
+        with open(cjk_path, 'wb') as f:
+            f.write(_build_font([(0x20, 0x7E), (0x4E00, 0x9FFF)], 30000))
+
+        # 1. format 4 / format 12 cmap 解析为覆盖位图
+        index_path = os.path.join(temp_dir, "font_index.json")
+        index = FontIndex(index_path, [font_dir])
+        latin = index.find_face(latin_path)
+        cjk = index.find_face(cjk_path)
+        assert latin['units_per_em'] == 1000 and latin['ascender'] == 880 and latin['glyph_count'] == 200
+        assert index.covers(latin, "A") and index.covers(latin, "é") and not index.covers(latin, "中")
+        assert index.covers(cjk, "中") and not index.covers(cjk, "😀")
+        assert parse_font_file(latin_path)[0]['coverage'] == latin['coverage']
+        print("cmap 解析和覆盖位图正确")
+
+        # 2. 主字体选择覆盖“中”的字体，后备顺序为主字体在前
+        assert index.find_primary_font("中") == cjk_path
+        assert [face['path'] for face in index.fallback_chain(cjk_path)] == [cjk_path, latin_path]
+        print("主字体选择和后备顺序正确")
+
+        # 3. 字体目录未变化时直接读取索引
+        with open(index_path, 'r', encoding='utf-8') as f:
+            saved = f.read()
+        reloaded = FontIndex(index_path, [font_dir])
+        assert reloaded.find_face(cjk_path)['coverage'] == cjk['coverage']
+        with open(index_path, 'r', encoding='utf-8') as f:
+            assert f.read() == saved
+        print("索引持久化正确")
+
+        # 4. 增加字体文件后重新扫描
+        emoji_path = os.path.join(font_dir, "emoji.ttf").replace(os.sep, '/')
+        with open(emoji_path, 'wb') as f:
+            f.write(_build_font([(0x1F600, 0x1F64F)], 80))
+        os.utime(font_dir, ns=(0, os.stat(font_dir).st_mtime_ns + 1_000_000_000))
+        rescanned = FontIndex(index_path, [font_dir])
+        assert rescanned.covers(rescanned.find_face(emoji_path), "😀")
+        print("字体目录变化后重新扫描正确")
+
+    print("\n----- font_index 模块测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_font_index()
@@ -0,0 +1,109 @@
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+import config
+from modules.event_dispatcher import EventDispatcher
+from modules.presentation_manager import PresentationManager
+
+STORY_PAGES = 20
+
+
+def _make_manager() -> PresentationManager:
+    """只创建页面表面缓存和预取需要的部分；页面绘制替换为记录调用次数的替身"""
+    manager = PresentationManager.__new__(PresentationManager)
+    manager.test_mode = False
+    manager.pygame_initialized = True
+    manager.screen_size = (800, 480)
+    manager.event_dispatcher = EventDispatcher()
+    manager._page_surface_cache = OrderedDict()
+    manager._page_cache_lock = threading.Lock()
+    manager._prefetch_window = set()
+    manager._prefetch_queue = queue.Queue()
+    manager._prefetch_thread = None
+    manager.composed = []
+
+    def compose(page_text, image_path, page_number, pending, prepared_image=None):
+        manager.composed.append(page_number)
+        return pygame.Surface((4, 4))
+
+    manager._compose_page_surface = compose
+    return manager
+
+
+def _page(page_number: int) -> tuple:
+    """阅读器传入的页面参数：(page_text, image_path, page_number, pending)"""
+    return (f"第 {page_number} 页", None, page_number, False)
+
+
+def _cache_key(page: tuple) -> tuple:
+    page_text, image_path, page_number, pending = page
+    return (page_number, page_text, image_path, pending)
+
+
+def _show_page(manager: PresentationManager, page_number: int, window: int):
+    """模拟阅读器翻到某一页：先显示当前页，再预取相邻页面，并在“主线程空闲”时完成预取"""
+    manager._get_page_surface(*_page(page_number))
+    neighbours = [_page(number)
+                  for offset in range(1, window + 1)
+                  for number in (page_number + offset, page_number - offset)
+                  if 1 <= number <= STORY_PAGES]
+    manager.prefetch_story_pages(page_number, neighbours)
+
+    wanted = {_cache_key(page) for page in [_page(page_number)] + neighbours}
+    deadline = time.monotonic() + 3.0
+    while time.monotonic() < deadline:
+        manager.event_dispatcher._run_idle_task()
+        with manager._page_cache_lock:
+            if wanted <= set(manager._page_surface_cache):
+                return
+        time.sleep(0.005)
+    raise AssertionError(f"第 {page_number} 页的相邻页面没有预取完成")
+
+
+def test_page_cache_window():
+    """验证翻阅长故事时页面表面缓存不超过 2N+1 页，且翻回缓存中的页面时不会重新绘制"""
+    original_window = config.PAGE_CACHE_WINDOW
+    pygame.display.init()
+    try:
+        for window in (original_window, 2):
+            config.PAGE_CACHE_WINDOW = window
+            manager = _make_manager()
+            max_entries = 2 * window + 1
+
+            # 1. 从头翻到尾：缓存始终不超过 2N+1 页，每一页只绘制一次
+            for page_number in range(1, STORY_PAGES + 1):
+                _show_page(manager, page_number, window)
+                assert len(manager._page_surface_cache) <= max_entries
+                assert {key[0] for key in manager._page_surface_cache} <= \
+                    set(range(page_number - window, page_number + window + 1))
+            assert sorted(manager.composed) == list(range(1, STORY_PAGES + 1))
+
+            # 2. 往回翻：上一页仍在缓存中，直接使用而不重新绘制
+            composed = len(manager.composed)
+            cached_surface = manager._page_surface_cache[_cache_key(_page(STORY_PAGES - 1))]
+            assert manager._get_page_surface(*_page(STORY_PAGES - 1)) is cached_surface
+            assert len(manager.composed) == composed
+
+            manager._prefetch_queue.put(None)
+            manager._prefetch_thread.join(timeout=1)
+    finally:
+        config.PAGE_CACHE_WINDOW = original_window
+        pygame.event.clear()
+        pygame.display.quit()
+    print("页面表面缓存大小受窗口限制，缓存的页面不会重新绘制")
+
+
+if __name__ == "__main__":
+    test_page_cache_window()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.api_clients.rate_limiter import (AdaptiveConcurrencyLimiter, RateLimiter, TokenBucket, classify_error,
+                                              retry_delay_hint)
+
+
+class _APIError(Exception):
+    """模拟 google.genai.errors.APIError：code 为 HTTP 状态码"""
+    def __init__(self, code: int, message: str = ""):
+        super().__init__(message or f"{code} error")
+        self.code = code
+
+
+def test_error_classification():
+    """验证可重试错误的判断和服务端建议等待时间的解析"""
+    assert classify_error(_APIError(429)) == (True, True)
+    assert classify_error(_APIError(503)) == (True, False)
+    assert classify_error(_APIError(400)) == (False, False)
+    assert classify_error(ConnectionError("reset")) == (True, False)
+    assert classify_error(TimeoutError()) == (True, False)
+    assert classify_error(ValueError("bad prompt")) == (False, False)
+
+    assert retry_delay_hint(_APIError(429, "{'retryDelay': '12s'}")) == 12.0
+    assert retry_delay_hint(_APIError(429, '"retryDelay": "1.5s"')) == 1.5
+    assert retry_delay_hint(_APIError(429, "quota exceeded")) is None
+    print("错误分类和重试等待时间解析正确")
+
+
+def test_token_bucket():
+    """验证令牌桶的突发容量、等待时间和按时间补充"""
+    bucket = TokenBucket(requests_per_minute=60, capacity=3)  # 每秒补充 1 个
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert abs(bucket.reserve() - 1.0) < 0.01  # 第 4 个需要等待约 1 秒
+    assert abs(bucket.reserve() - 2.0) < 0.01  # 预约会累积
+
+    # 模拟经过 10 秒：补充到容量上限为止
+    bucket._updated -= 10
+    assert bucket.reserve() == 0.0
+    assert abs(bucket.tokens - 2.0) < 0.01
+    print("令牌桶补充和等待时间正确")
+
+
+def test_adaptive_concurrency():
+    """验证 AIMD：成功时加性增加、限流时减半，且不超出上下限"""
+    limiter = AdaptiveConcurrencyLimiter(initial=1, maximum=3)
+    assert limiter.try_acquire() and not limiter.try_acquire()
+    limiter.release()
+
+    limiter.on_success()
+    assert limiter.limit == 2.0
+    limiter.on_success()
+    assert limiter.limit == 2.5
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.limit == 3.0  # 不超过上限
+
+    limiter.on_throttle()
+    assert limiter.limit == 1.5
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.limit == 1.0  # 不低于下限
+    print("AIMD 并发上限调整正确")
+
+
+def test_backoff():
+    """验证退避时间受 max_delay 限制、限流时采用服务端建议并暂停所有调用方、重试次数耗尽后不再重试"""
+    limiter = RateLimiter("test", requests_per_minute=6000, max_retries=3, base_delay=1.0, max_delay=4.0)
+    random.seed(0)
+    delays = [limiter._handle_failure(_APIError(503), attempt) for attempt in range(3) for _ in range(50)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert limiter._handle_failure(_APIError(503), 3) is None  # 已达最大重试次数
+    assert limiter._handle_failure(_APIError(400), 0) is None  # 不可重试
+
+    delay = limiter._handle_failure(_APIError(429, "{'retryDelay': '7s'}"), 0)
+    assert delay >= 7.0
+    assert limiter._wait_time() > 6.5  # 所有调用方一起暂停
+    print("退避时间和限流暂停正确")
+
+
+def test_call_async_waits_without_polling():
+    """验证协程调用遵守并发上限，并在其他线程释放空位时被唤醒"""
+    limiter = RateLimiter("test", requests_per_minute=6000, max_concurrency=1)
+    active = 0
+    max_active = 0
+
+    async def request(value):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return value
+
+    async def run_all():
+        return await asyncio.gather(*(limiter.call_async(request, i) for i in range(4)))
+
+    assert asyncio.run(run_all()) == [0, 1, 2, 3]
+    assert max_active == 1 and limiter.concurrency.in_flight == 0
+
+    # 同步调用方占用空位时，协程挂起等待；同步调用方释放后协程立即得到空位
+    limiter.concurrency.acquire()
+    threading.Timer(0.1, limiter.concurrency.release).start()
+
+    async def wait_for_slot():
+        start = time.monotonic()
+        await limiter.concurrency.acquire_async()
+        limiter.concurrency.release()
+        return time.monotonic() - start
+
+    assert 0.08 <= asyncio.run(wait_for_slot()) < 0.5
+    print("协程调用的并发控制正确")
+
+
+if __name__ == "__main__":
+    test_error_classification()
+    test_token_bucket()
+    test_adaptive_concurrency()
+    test_backoff()
+    test_call_async_waits_without_polling()
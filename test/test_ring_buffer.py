@@ -0,0 +1,71 @@
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.input_handler import PCMRingBuffer
+
+
+def _samples(start: int, count: int) -> np.ndarray:
+    """第 i 个采样的值为 i（绝对位置），便于核对取出的数据"""
+    return np.arange(start, start + count, dtype=np.int16)
+
+
+def _assert_raises_index_error(ring: PCMRingBuffer, start: int, end: int):
+    try:
+        ring.view(start, end)
+    except IndexError:
+        return
+    raise AssertionError(f"[{start}, {end}) 应当抛出 IndexError")
+
+
+def test_ring_buffer():
+    """验证环形缓冲区的写入覆盖、跨越末尾的读取和越界检查"""
+    print("----- 正在测试 PCMRingBuffer -----")
+    ring = PCMRingBuffer(10)
+
+    # 1. 连续区间直接返回缓冲区的视图（不复制）
+    ring.write(_samples(0, 6))
+    view = ring.view(1, 5)
+    assert view.tolist() == [1, 2, 3, 4]
+    assert np.shares_memory(view, ring.buffer)
+    assert ring.view(3, 3).tolist() == []
+    print("连续区间读取正确")
+
+    # 2. 跨过缓冲区末尾的区间拼接返回
+    ring.write(_samples(6, 7))  # 写到 13，位置 10-12 覆盖了 0-2
+    assert ring.written == 13
+    assert ring.view(3, 13).tolist() == list(range(3, 13))
+    assert ring.view(8, 12).tolist() == [8, 9, 10, 11]
+    assert not np.shares_memory(ring.view(8, 12), ring.buffer)
+    print("跨越末尾的读取正确")
+
+    # 3. 已被覆盖、尚未写入或起止颠倒的区间抛出 IndexError
+    _assert_raises_index_error(ring, 2, 5)
+    _assert_raises_index_error(ring, 10, 14)
+    _assert_raises_index_error(ring, 8, 7)
+    print("越界读取抛出 IndexError")
+
+    # 4. 一次写入超过容量：只保留最后 capacity 个采样，written 仍按实际写入数累计
+    ring.write(_samples(13, 25))
+    assert ring.written == 38
+    assert ring.view(28, 38).tolist() == list(range(28, 38))
+    _assert_raises_index_error(ring, 27, 38)
+    print("超过容量的写入正确")
+
+    # 5. 恰好等于容量的写入，以及 reset 后从头开始
+    ring.write(_samples(38, 10))
+    assert ring.view(38, 48).tolist() == list(range(38, 48))
+    ring.reset()
+    _assert_raises_index_error(ring, 0, 1)
+    ring.write(_samples(0, 3))
+    assert ring.view(0, 3).tolist() == [0, 1, 2]
+
+    print("\n----- PCMRingBuffer 测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_ring_buffer()
@@ -0,0 +1,40 @@
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.sentence_splitter import split_sentences
+
+
+def test_sentence_splitter():
+    """验证句末标点切分、过长句子的断开、短片段合并以及英文句号的处理"""
+    print("----- 正在测试 sentence_splitter 模块 -----")
+
+    # 1. 按句末标点切分，引号跟随所在的句子
+    assert split_sentences("从前有一只小兔子。它住在森林里！你好吗？") == ["从前有一只小兔子。", "它住在森林里！", "你好吗？"]
+    assert split_sentences("“我们出发吧！”小熊说。") == ["“我们出发吧！”", "小熊说。"]
+    print("句末标点切分正确")
+
+    # 2. 过长的句子在逗号处断开，没有逗号时按长度硬切
+    long_sentence = "小兔子跑过了小河，跑过了山坡，一直跑到了太阳落山的地方。"
+    parts = split_sentences(long_sentence, max_chars=12)
+    assert "".join(parts) == long_sentence and all(len(part) <= 12 for part in parts)
+    assert parts[0] == "小兔子跑过了小河，"
+    assert split_sentences("一" * 25, max_chars=10) == ["一" * 10, "一" * 10, "一" * 5]
+    print("长句断开正确")
+
+    # 3. 过短的片段并入前一句
+    assert split_sentences("它回头看了看。啊！原来是小狐狸。") == ["它回头看了看。啊！", "原来是小狐狸。"]
+    print("短片段合并正确")
+
+    # 4. 英文句号后有空白才切分，空文本返回空列表
+    assert split_sentences("Hello world. It costs 3.5 yuan.") == ["Hello world.", "It costs 3.5 yuan."]
+    assert split_sentences("") == []
+    print("英文句子和空文本处理正确")
+
+    print("\n----- sentence_splitter 模块测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_sentence_splitter()
@@ -0,0 +1,131 @@
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.story_cache import StoryCache
+
+
+def _make_story(asset_dir: str, name: str) -> tuple[list[dict], list[dict]]:
+    """生成一篇两页的故事，插画和音频文件真实存在"""
+    pages = []
+    for index in range(2):
+        image_path = os.path.join(asset_dir, f"{name}_{index}.png")
+        audio_path = os.path.join(asset_dir, f"{name}_{index}.mp3")
+        for path in (image_path, audio_path):
+            with open(path, 'wb') as f:
+                f.write(b'\0')
+        pages.append({'text': f"第 {index + 1} 页", 'image_path': image_path, 'audio_path': audio_path, 'ready': True})
+    segments = [{'audio_text': page['text']} for page in pages]
+    return pages, segments
+
+
+class FakeRefresh:
+    """替身后台重新生成：只提供 begin_refresh 需要的 is_complete"""
+    def __init__(self):
+        self.done = False
+
+    def is_complete(self) -> bool:
+        return self.done
+
+
+def test_story_cache():
+    """验证主题规范化、存取、素材失效、三种新鲜度策略、条目上限、索引的持久化和延迟写回，以及后台重新生成去重"""
+    print("----- 正在测试 story_cache 模块 -----")
+
+    # 1. 全角、大小写、空白和标点不影响主题
+    assert StoryCache.normalize_theme(" 小兔子的冒险！") == StoryCache.normalize_theme("小兔子的冒险")
+    assert StoryCache.normalize_theme("Ｄｒａｇｏｎ, Story") == "dragonstory"
+    assert StoryCache.normalize_theme("小兔子") != StoryCache.normalize_theme("小狐狸")
+    print("主题规范化正确")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index_path = os.path.join(temp_dir, "stories.json")
+        pages, segments = _make_story(temp_dir, "rabbit")
+
+        # 2. 'off' 策略不保存也不命中
+        off_cache = StoryCache(index_path, policy='off')
+        off_cache.store("小兔子", 2, pages, segments)
+        assert off_cache.lookup("小兔子", 2) is None and not os.path.exists(index_path)
+        print("'off' 策略不使用缓存")
+
+        # 3. 保存后用等价的主题命中；页数不同视为不同的故事
+        cache = StoryCache(index_path, policy='serve_cached', max_age_hours=1)
+        assert cache.lookup("小兔子", 2) is None
+        cache.store("小兔子", 2, pages, segments)
+        entry, needs_refresh = cache.lookup("小兔子！", 2)
+        assert entry['pages'] == pages and entry['segments'] == segments and not needs_refresh
+        assert cache.lookup("小兔子", 3) is None
+        print("保存后命中缓存")
+
+        # 4. 重新加载索引（模拟重启）后依然命中
+        reopened = StoryCache(index_path, policy='serve_cached', max_age_hours=1)
+        assert reopened.lookup("小兔子", 2) is not None
+        print("索引持久化正确")
+
+        # 5. 过期：'serve_cached' 重新生成，'revalidate' 立即返回并要求后台刷新
+        key = cache.make_key("小兔子", 2)
+        cache._entries[key]['created'] = time.time() - 2 * 3600
+        assert cache.lookup("小兔子", 2) is None
+        revalidating = StoryCache(index_path, policy='revalidate', max_age_hours=1)
+        revalidating._entries[key]['created'] = time.time() - 2 * 3600
+        entry, needs_refresh = revalidating.lookup("小兔子", 2)
+        assert entry is not None and needs_refresh
+        print("过期策略正确")
+
+        # 6. 任一素材被删除时视为未命中，并移除条目
+        os.remove(pages[1]['audio_path'])
+        assert revalidating.lookup("小兔子", 2) is None
+        assert key not in revalidating._entries
+        print("素材失效时不命中")
+
+        # 7. 超出条目上限时淘汰最久未使用的故事
+        small = StoryCache(os.path.join(temp_dir, "small.json"), policy='serve_cached', max_entries=2)
+        for name in ("a", "b", "c"):
+            story_pages, story_segments = _make_story(temp_dir, name)
+            small.store(name, 2, story_pages, story_segments)
+            time.sleep(0.01)
+        assert small.lookup("a", 2) is None
+        assert small.lookup("b", 2) is not None and small.lookup("c", 2) is not None
+        print("条目上限淘汰正确")
+
+        # 8. 命中只更新内存中的使用时间，不重写索引；flush 时才写回
+        small_index = os.path.join(temp_dir, "small.json")
+        small.flush()
+        with open(small_index, 'rb') as f:
+            before = f.read()
+        assert small.lookup("b", 2) is not None
+        with open(small_index, 'rb') as f:
+            assert f.read() == before
+        small.flush()
+        with open(small_index, 'rb') as f:
+            assert f.read() != before
+        print("命中时不重写索引")
+
+        # 9. 同一故事的后台重新生成进行中时不再重复开始，结束后（无论成功与否）才能重新开始
+        created = []
+
+        def create():
+            created.append(FakeRefresh())
+            return created[-1]
+
+        first = small.begin_refresh("b", 2, create)
+        assert first is created[0]
+        assert small.begin_refresh("b！", 2, create) is None and len(created) == 1
+        assert small.begin_refresh("c", 2, create) is created[1]  # 其他故事不受影响
+        first.done = True
+        assert small.begin_refresh("b", 2, create) is created[2]
+        print("后台重新生成不会重复进行")
+
+        # 临时目录删除前写回所有修改，退出时不再写入
+        for story_cache in (cache, reopened, revalidating, small):
+            story_cache.flush()
+
+    print("\n----- story_cache 模块测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_story_cache()
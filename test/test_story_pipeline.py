@@ -0,0 +1,150 @@
+import os
+import sys
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from modules.story_pipeline import ProgressiveStory
+
+PLACEHOLDER = {'text': '', 'image_path': None, 'audio_path': None, 'ready': False}
+
+
+class StubStoryGenerator:
+    """替身故事生成器：每放行一次 gate 才流式产出下一段，可模拟段落不足和音频合成失败"""
+    def __init__(self, texts: list[str], fail_audio: set[int] | None = None):
+        self.texts = texts
+        self.fail_audio = fail_audio or set()
+        self.gate = threading.Semaphore(0)
+
+    def generate_story_segments_stream(self, theme: str, num_pages: int):
+        for text in self.texts:
+            self.gate.acquire(timeout=5.0)
+            yield {'audio_text': text}
+
+    def generate_audio_for_story(self, segment: dict, page_number: int) -> str | None:
+        if page_number - 1 in self.fail_audio:
+            return None
+        return f"audio_{page_number}.mp3"
+
+
+class StubImageCache:
+    def print_stats(self):
+        pass
+
+
+class StubImageGenerator:
+    """替身插画生成器：立即返回插画路径"""
+    def __init__(self):
+        self.image_cache = StubImageCache()
+
+    def generate_illustration(self, index: int, segment: dict) -> str:
+        return f"image_{index}.png"
+
+
+def _run_story(story_generator: StubStoryGenerator, num_pages: int) -> tuple[ProgressiveStory, list]:
+    """放行所有段落并等待生成结束，返回故事和 on_complete 收到的参数"""
+    completed = []
+    story = ProgressiveStory(story_generator, StubImageGenerator(), on_complete=completed.append)
+    story.start("小兔子", num_pages)
+    for _ in story_generator.texts:
+        story_generator.gate.release()
+    assert story.wait_until_complete(5.0)
+    return story, completed
+
+
+def test_pages_arrive_progressively():
+    """验证文本流式到达期间的占位页和页数，以及完整生成后才调用 on_complete"""
+    original_streaming = config.STORY_STREAMING
+    config.STORY_STREAMING = True
+    try:
+        story_generator = StubStoryGenerator(["第一页", "第二页", "第三页"])
+        ready = []
+        completed = []
+        story = ProgressiveStory(story_generator, StubImageGenerator(),
+                                 on_page_ready=ready.append, on_complete=completed.append)
+        story.start("小兔子", 3)
+
+        # 1. 还没有段落到达：按预期页数翻页，所有页面都是占位页
+        assert story.page_count() == 3
+        assert story.get_page(0) == PLACEHOLDER and story.get_page(2) == PLACEHOLDER
+        assert not story.is_fully_generated()
+
+        # 2. 第 1 段到达并就绪：第 1 页可以阅读，其余页面仍是占位页，页数仍为预期页数
+        story_generator.gate.release()
+        assert story.wait_for_first_page(5.0)
+        assert story.get_page(0) == {'text': "第一页", 'image_path': "image_0.png",
+                                     'audio_path': "audio_1.mp3", 'ready': True}
+        assert story.get_page(1) == PLACEHOLDER
+        assert story.page_count() == 3
+        assert not completed
+
+        # 3. 剩余段落到达：全部就绪后调用一次 on_complete
+        story_generator.gate.release()
+        story_generator.gate.release()
+        assert story.wait_until_complete(5.0)
+        assert story.page_count() == 3 and ready == [0, 1, 2]
+        assert story.is_fully_generated() and completed == [story]
+        pages, segments = story.snapshot()
+        assert [page['text'] for page in pages] == ["第一页", "第二页", "第三页"]
+        assert [segment['audio_path'] for segment in segments] == ["audio_1.mp3", "audio_2.mp3", "audio_3.mp3"]
+    finally:
+        config.STORY_STREAMING = original_streaming
+    print("页面逐步就绪，占位页和页数正确")
+
+
+def test_partial_story_is_not_completed():
+    """验证段落不足或素材生成失败的故事不算完整生成，不会调用 on_complete（因此不会写入故事缓存）"""
+    original_streaming = config.STORY_STREAMING
+    config.STORY_STREAMING = True
+    try:
+        # 1. 只收到 2/3 段：页数回落到实际页数
+        story, completed = _run_story(StubStoryGenerator(["第一页", "第二页"]), 3)
+        assert story.page_count() == 2
+        assert not story.is_fully_generated() and not completed
+
+        # 2. 段落齐全但有一页音频合成失败：该页仍标记为就绪，但故事不完整
+        story, completed = _run_story(StubStoryGenerator(["第一页", "第二页"], fail_audio={1}), 2)
+        assert story.get_page(1)['ready'] and story.get_page(1)['audio_path'] is None
+        assert not story.is_fully_generated() and not completed
+
+        # 3. 取消的故事即使页面都已生成也不算完整
+        story_generator = StubStoryGenerator(["第一页"])
+        completed = []
+        story = ProgressiveStory(story_generator, StubImageGenerator(), on_complete=completed.append)
+        story.start("小兔子", 1)
+        story.cancel()
+        story_generator.gate.release()
+        assert story.wait_until_complete(5.0)
+        assert not story.is_fully_generated() and not completed
+    finally:
+        config.STORY_STREAMING = original_streaming
+    print("不完整的故事不会调用 on_complete")
+
+
+def test_from_cache():
+    """验证用缓存构建的故事立即全部就绪，并且页面快照与缓存数据互不影响"""
+    pages = [{'text': f"第 {index + 1} 页", 'image_path': f"image_{index}.png",
+              'audio_path': f"audio_{index + 1}.mp3", 'ready': False} for index in range(2)]
+    segments = [{'audio_text': page['text']} for page in pages]
+
+    story = ProgressiveStory.from_cache(StubStoryGenerator([]), StubImageGenerator(), pages, segments)
+    assert story.is_complete() and story.wait_for_first_page(0)
+    assert story.page_count() == 2 and story.expected_pages == 2
+    assert all(story.get_page(index)['ready'] for index in range(2))
+    assert story.get_page(2) == PLACEHOLDER
+    assert story.is_fully_generated()
+    assert story.get_summary() == "第 1 页 第 2 页"
+
+    # 修改快照或传入的数据不会影响故事本身
+    story.get_page(0)['text'] = "改动"
+    pages[1]['text'] = "改动"
+    assert story.get_page(0)['text'] == "第 1 页" and story.get_page(1)['text'] == "第 2 页"
+    print("从缓存构建的故事正确")
+
+
+if __name__ == "__main__":
+    test_pages_arrive_progressively()
+    test_partial_story_is_not_completed()
+    test_from_cache()
@@ -0,0 +1,80 @@
+import json
+import os
+import random
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.story_stream_parser import IncrementalStoryParser, StoryStreamError
+
+# --- 测试参数 ---
+TEST_STORY = {
+    "complete_story": [
+        {
+            "image_prompt": f"儿童绘本风格，第 {i + 1} 个场景 {{花括号}} [方括号] \"引号\"",
+            "audio_text": f"小狐狸走进了魔法森林的第 {i + 1} 条小路。",
+            "character_description": "一只戴着红围巾的小狐狸，吉卜力风格\\"
+        }
+        for i in range(3)
+    ],
+    "pages": 3
+}
+
+
+def test_story_stream_parser():
+    """模拟任意切分的流式响应，验证每个段落都能在其对象闭合时被解析出来"""
+    print("----- 正在测试 story_stream_parser 模块 -----")
+
+    response_text = "```json\n" + json.dumps(TEST_STORY, ensure_ascii=False, indent=2) + "\n```"
+
+    # 1. 随机切分响应文本，逐块输入
+    for _ in range(50):
+        parser = IncrementalStoryParser(expected_segments=3)
+        segments = []
+        position = 0
+        while position < len(response_text):
+            chunk_size = random.randint(1, 8)
+            segments += parser.feed(response_text[position:position + chunk_size])
+            position += chunk_size
+        parser.close()
+
+        assert segments == TEST_STORY["complete_story"]
+        assert parser.pages == 3
+    print("随机切分的流式响应解析成功")
+
+    # 2. 第一个段落闭合时立即返回，而不是等待整个响应
+    parser = IncrementalStoryParser(expected_segments=3)
+    first_segment_end = response_text.index("}", response_text.index("character_description")) + 1
+    assert len(parser.feed(response_text[:first_segment_end])) == 1
+    print("第一个段落在其对象闭合时即被返回")
+
+    # 3. 各种异常输出都应尽早抛出 StoryStreamError
+    malformed_cases = {
+        "非 JSON 前缀": "抱歉，我无法完成这个请求。",
+        "数组中出现非对象元素": '{"complete_story": ["场景一"',
+        "段落缺少字段": '{"complete_story": [{"image_prompt": "森林"}',
+    }
+    for case_name, malformed_text in malformed_cases.items():
+        try:
+            IncrementalStoryParser(expected_segments=3).feed(malformed_text)
+        except StoryStreamError as e:
+            print(f"{case_name}: 已提前中止 ({e})")
+        else:
+            raise AssertionError(f"{case_name}: 未能检测到异常输出")
+
+    # 4. 被截断的响应在 close() 时报告
+    parser = IncrementalStoryParser(expected_segments=3)
+    parser.feed(response_text[:len(response_text) // 2])
+    try:
+        parser.close()
+    except StoryStreamError as e:
+        print(f"截断的响应: 已检测到 ({e})")
+    else:
+        raise AssertionError("截断的响应未被检测到")
+
+    print("\n----- story_stream_parser 模块测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_story_stream_parser()
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.api_clients.stt_client import ScriptedSTTBackend
+from modules.streaming_stt import StreamingTranscriber
+
+SAMPLE_RATE = 16000
+CHUNK = b'\0' * 3200  # 0.1 秒 16 位单声道 PCM
+
+
+class RecordingBackend(ScriptedSTTBackend):
+    """记录每次识别收到的 PCM 内容"""
+    def __init__(self, responses: list[str | None]):
+        super().__init__(responses)
+        self.pcm: list[bytes] = []
+
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int, sample_width: int = 2) -> str | None:
+        self.pcm.append(bytes(pcm))
+        return super().transcribe_pcm(pcm, sample_rate, sample_width)
+
+
+def _feed(transcriber: StreamingTranscriber, pattern: str):
+    """按模式送入音频块：'s' 为人声块，'.' 为静音块，每块 0.1 秒"""
+    for mark in pattern:
+        transcriber.feed(CHUNK, mark == 's')
+
+
+def test_streaming_stt():
+    """验证分句、前导音频、噪声过滤、后台识别的部分结果以及说话结束检测"""
+    print("----- 正在测试 streaming_stt 模块 -----")
+
+    # 1. 停顿 0.5 秒切分短句，每句交给后台识别；短促噪声被丢弃
+    backend = ScriptedSTTBackend(["小兔子", "去森林探险"], delay=0.05)
+    transcriber = StreamingTranscriber(backend, SAMPLE_RATE, phrase_gap=0.5, end_silence=1.0)
+    _feed(transcriber, "...sssss.....")
+    _feed(transcriber, "s.....")  # 0.1 秒人声，视为噪声
+    assert not transcriber.utterance_ended
+    _feed(transcriber, "ssssss")
+    time.sleep(0.2)
+    assert transcriber.take_partial() == "小兔子"
+    assert transcriber.take_partial() is None
+    print("分句和部分识别结果正确")
+
+    # 2. 第一句包含 0.3 秒前导音频和 0.5 秒停顿：3 + 5 + 5 = 13 块
+    assert backend.calls == [13 * len(CHUNK)]
+    print("前导音频保留正确")
+
+    # 3. 静音达到 end_silence 后说话结束，finish 只需等待最后一句
+    _feed(transcriber, "..........")
+    assert transcriber.utterance_ended
+    start = time.perf_counter()
+    assert transcriber.finish() == "小兔子去森林探险"
+    print(f"说话结束后等待识别 {(time.perf_counter() - start) * 1000:.1f} 毫秒")
+
+    # 4. 没有识别结果时返回 None
+    silent = StreamingTranscriber(ScriptedSTTBackend([]), SAMPLE_RATE)
+    _feed(silent, "..........")
+    assert silent.finish() is None and not silent.utterance_ended
+    print("无语音处理正确")
+
+    # 5. 送入的是会被复用的缓冲区视图（与环形缓冲区相同）时，识别的仍是送入时的内容
+    backend = RecordingBackend(["你好"])
+    transcriber = StreamingTranscriber(backend, SAMPLE_RATE, phrase_gap=0.3, pre_roll=0.1)
+    slot = bytearray(len(CHUNK))
+    expected = b""
+    for index, mark in enumerate("..sss..."):
+        slot[:] = bytes([index + 1]) * len(slot)
+        transcriber.feed(memoryview(slot), mark == 's')
+        if index >= 1:  # 0.1 秒前导音频从第 2 块开始
+            expected += bytes(slot)
+    slot[:] = b"\xff" * len(slot)  # 之后缓冲区被覆盖
+    assert transcriber.finish() == "你好"
+    assert backend.pcm == [expected]
+    print("缓冲区视图被复制后再保留")
+
+    print("\n----- streaming_stt 模块测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_streaming_stt()
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.api_clients.stt_client import PolicySTTBackend, ScriptedSTTBackend
+
+PCM = b'\0' * 3200
+
+
+class UnavailableBackend(ScriptedSTTBackend):
+    """模拟未安装模型的离线后端"""
+    def is_available(self) -> bool:
+        return False
+
+
+def test_stt_policy():
+    """验证离线优先、在线优先、竞速三种策略以及离线后端不可用时的回退"""
+    print("----- 正在测试语音识别后端选择策略 -----")
+
+    # 1. 离线优先：离线有结果时不请求在线后端；没有结果时再请求
+    offline, online = ScriptedSTTBackend(["离线", None]), ScriptedSTTBackend(["在线"])
+    backend = PolicySTTBackend(offline, online, 'offline_first')
+    assert backend.transcribe_pcm(PCM, 16000) == "离线" and not online.calls
+    assert backend.transcribe_pcm(PCM, 16000) == "在线" and len(online.calls) == 1
+    print("离线优先正确")
+
+    # 2. 在线优先：在线失败（例如没有网络）时使用离线结果
+    offline, online = ScriptedSTTBackend(["离线"]), ScriptedSTTBackend([None])
+    assert PolicySTTBackend(offline, online, 'online_first').transcribe_pcm(PCM, 16000) == "离线"
+    print("在线优先正确")
+
+    # 3. 竞速：采用先返回的结果，不等待较慢的后端
+    offline, online = ScriptedSTTBackend(["离线"], delay=0.01), ScriptedSTTBackend(["在线"], delay=0.5)
+    start = time.perf_counter()
+    assert PolicySTTBackend(offline, online, 'race').transcribe_pcm(PCM, 16000) == "离线"
+    assert time.perf_counter() - start < 0.4
+    print("竞速正确")
+
+    # 4. 离线后端不可用时只使用在线后端
+    offline, online = UnavailableBackend(["离线"]), ScriptedSTTBackend(["在线"])
+    assert PolicySTTBackend(offline, online, 'offline_first').transcribe_pcm(PCM, 16000) == "在线"
+    assert not offline.calls
+    print("离线不可用时回退正确")
+
+    print("\n----- 语音识别后端选择策略测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_stt_policy()
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import text_layout
+from modules.text_layout import get_font_metrics, wrap_text
+
+
+class FakeFont:
+    """模拟 PIL 字体：中文字符宽 20，西文字符宽 10，"AV" 字符对字距 -2，并记录测量次数"""
+    def __init__(self):
+        self.calls = 0
+
+    def getlength(self, text: str) -> float:
+        self.calls += 1
+        width = sum(20 if ord(char) > 0x2E80 else 10 for char in text)
+        return width - 2 * text.count("AV")
+
+
+def test_text_layout():
+    """验证换行结果、字距修正、换行符处理以及宽度表和换行缓存的复用"""
+    print("----- 正在测试 text_layout 模块 -----")
+    font = FakeFont()
+
+    # 1. 按宽度换行，单个字符超宽时强制放入一行
+    assert wrap_text("小兔子去森林里玩", font, 60) == ["小兔子", "去森林", "里玩"]
+    assert wrap_text("大", font, 5) == ["大"]
+    assert wrap_text("", font, 60) == [""]
+    print("按宽度换行正确")
+
+    # 2. 字距修正："AVAV" 宽度为 4 * 10 - 2 * 2 = 36（两个 A-V 字符对各 -2）
+    assert get_font_metrics(font).measure("AVAV") == 36
+    assert wrap_text("AVAV", font, 36) == ["AVAV"]
+    print("字距修正正确")
+
+    # 3. 换行符强制换行，空行保留
+    assert wrap_text("第一行\n\n第三行", font, 200) == ["第一行", "", "第三行"]
+    print("换行符处理正确")
+
+    # 4. 输入框只显示能放下的末尾部分
+    assert get_font_metrics(font).fit_tail("我喜欢小狐狸", 60) == "小狐狸"
+    print("输入框末尾截取正确")
+
+    # 5. 长文本：每个不同字符只测量一次，重复换行直接命中缓存
+    long_text = "从前有一只小狐狸，它住在魔法森林的边上。" * 200
+    calls_before = font.calls
+    start = time.perf_counter()
+    lines = wrap_text(long_text, font, 300)
+    elapsed = time.perf_counter() - start
+    assert font.calls - calls_before <= len(set(long_text))
+    assert "".join(lines) == long_text
+    assert wrap_text(long_text, font, 300) == lines
+    assert font.calls - calls_before <= len(set(long_text))
+    print(f"{len(long_text)} 个字符换行为 {len(lines)} 行，用时 {elapsed * 1000:.2f} 毫秒")
+    print(f"换行缓存条目数: {len(text_layout._layout_cache)}")
+
+    print("\n----- text_layout 模块测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_text_layout()
@@ -0,0 +1,202 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+import config
+from modules.api_clients.tts_client import FallbackTTSBackend, TTSBackend, TTSClient
+from modules.asset_cache import ContentCache
+
+
+class StubBackend(TTSBackend):
+    """替身合成后端：写入固定内容，可模拟失败、耗时和未安装，并记录合成次数"""
+    def __init__(self, name: str, suffix: str, fail: bool = False, delay: float = 0.0, available: bool = True):
+        self.name = name
+        self.suffix = suffix
+        self.fail = fail
+        self.delay = delay
+        self.available = available
+        self.calls = 0
+
+    def is_available(self) -> bool:
+        return self.available
+
+    def synthesize(self, text: str, language: str, slow: bool, output_path: str):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("network down")
+        with open(output_path, 'wb') as f:
+            f.write(f"{self.name}:{text}".encode('utf-8'))
+
+
+class BlockingWavBackend(TTSBackend):
+    """替身合成后端：生成可播放的短 WAV；gate 关闭时合成会阻塞，用来模拟慢速的在线合成"""
+    name = "blocking"
+    suffix = ".wav"
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.texts = []
+
+    def synthesize(self, text: str, language: str, slow: bool, output_path: str):
+        self.texts.append(text)
+        self.gate.wait(5.0)
+        with wave.open(output_path, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(22050)
+            wav_file.writeframes(b'\x10\x00' * 22050)
+
+
+def _make_client(backend: TTSBackend, cache_dir: str) -> TTSClient:
+    """只创建 generate_speech 需要的部分，不初始化音频引擎"""
+    client = TTSClient.__new__(TTSClient)
+    client.language = 'zh'
+    client.slow = False
+    client.backend = backend
+    client.audio_cache = ContentCache(cache_dir, max_bytes=1024 * 1024, name="测试缓存")
+    return client
+
+
+def _content(path: str) -> str:
+    with open(path, 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+def test_fallback_chain_switch_and_retry_window():
+    """验证在线合成失败或过慢后切换到本地引擎，重试时间到期后恢复在线优先"""
+    online, local = StubBackend("online", ".mp3"), StubBackend("local", ".wav")
+    fallback = FallbackTTSBackend(online, local, slow_threshold=1.0, retry_after=0.2)
+    assert fallback.chain() == [online, local]
+
+    # 1. 成功且不慢：保持在线优先
+    fallback.report(online, True, 0.5)
+    assert fallback.chain() == [online, local]
+    # 本地引擎的结果不影响顺序
+    fallback.report(local, False, 0.1)
+    assert fallback.chain() == [online, local]
+
+    # 2. 在线合成失败：重试窗口内本地优先，到期后恢复
+    fallback.report(online, False, 0.1)
+    assert fallback.chain() == [local, online]
+    time.sleep(0.25)
+    assert fallback.chain() == [online, local]
+
+    # 3. 在线合成成功但过慢，同样切换
+    fallback.report(online, True, 2.0)
+    assert fallback.chain() == [local, online]
+
+    # 4. 本地引擎未安装时只用在线合成
+    no_local = FallbackTTSBackend(online, StubBackend("local", ".wav", available=False))
+    no_local.report(online, False, 0.1)
+    assert no_local.chain() == [online]
+    print("在线/本地切换和重试窗口正确")
+
+
+def test_generate_speech_fallback_and_cache_keys():
+    """验证 generate_speech 的兜底合成、各后端分开缓存，以及本地录音不会取代在线合成"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        online = StubBackend("online", ".mp3", fail=True)
+        local = StubBackend("local", ".wav")
+        fallback = FallbackTTSBackend(online, local, retry_after=0.2)
+        client = _make_client(fallback, cache_dir)
+
+        # 1. 在线失败时由本地引擎合成，缓存键包含后端名称
+        path = client.generate_speech("小兔子")
+        assert path.endswith(".wav") and _content(path) == "local:小兔子"
+        assert online.calls == 1 and local.calls == 1
+        assert client.audio_cache.get(client._cache_key("小兔子", local)) == path
+        assert client.audio_cache.get(client._cache_key("小兔子", online)) is None
+        assert client._cache_key("小兔子", local) != client._cache_key("小兔子", online)
+
+        # 2. 重试窗口内本地优先：直接使用本地缓存，不再请求在线合成
+        assert client.generate_speech("小兔子") == path
+        assert online.calls == 1 and local.calls == 1
+
+        # 3. 在线恢复后重新合成在线版本，而不是一直使用本地录音
+        time.sleep(0.25)
+        online.fail = False
+        online_path = client.generate_speech("小兔子")
+        assert online_path.endswith(".mp3") and _content(online_path) == "online:小兔子"
+        assert online.calls == 2 and local.calls == 1
+
+        # 4. 之后即使在线暂停使用，也优先用已缓存的在线版本
+        fallback.report(online, False, 0.1)
+        assert client.generate_speech("小兔子") == online_path
+        assert online.calls == 2 and local.calls == 1
+
+        # 5. 在线失败且本地已有缓存时使用本地缓存
+        time.sleep(0.25)
+        online.fail = True
+        client.generate_speech("小狐狸")  # 本地合成并缓存
+        time.sleep(0.25)
+        calls = local.calls
+        assert _content(client.generate_speech("小狐狸")) == "local:小狐狸"
+        assert local.calls == calls
+
+        # 6. 所有后端都失败时返回 None；空文本不合成
+        local.fail = True
+        assert client.generate_speech("小熊") is None
+        assert client.generate_speech("   ") is None
+        client.audio_cache.flush()
+    print("兜底合成和缓存键正确")
+
+
+def test_request_narration_drops_stale_requests():
+    """验证快速翻页时朗读请求由同一个线程处理：合成中被取代的请求不播放，积压的过时请求不合成，只播放最新的请求"""
+    original_dirs = (config.AUDIO_CACHE_DIR, config.ASSETS_AUDIO_DIR)
+    pygame.display.init()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config.AUDIO_CACHE_DIR = os.path.join(temp_dir, "cache")
+        config.ASSETS_AUDIO_DIR = os.path.join(temp_dir, "audio")
+        backend = BlockingWavBackend()
+        client = TTSClient(backend=backend)
+        try:
+            assert client.mixer_initialized
+            backend.gate.clear()
+            first = client.request_narration("第一页")
+            deadline = time.monotonic() + 2.0
+            while not backend.texts and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert backend.texts == ["第一页"]  # 第一页正在合成
+
+            client.request_narration("第二页")
+            latest = client.request_narration("第三页")
+            assert latest > first
+            assert [t.name for t in threading.enumerate()].count("Narration") == 1
+            backend.gate.set()
+
+            latest_path = None
+            deadline = time.monotonic() + 3.0
+            while time.monotonic() < deadline:
+                latest_path = client.audio_cache.get(client._cache_key("第三页", backend))
+                if latest_path and client.current_audio_file == latest_path:
+                    break
+                time.sleep(0.01)
+            assert latest_path and client.current_audio_file == latest_path and client.is_playing
+            # 第一页合成完毕时已过时，没有播放；第二页在合成前就被跳过
+            assert backend.texts == ["第一页", "第三页"]
+            client.stop_audio()
+        finally:
+            client.cleanup()
+            config.AUDIO_CACHE_DIR, config.ASSETS_AUDIO_DIR = original_dirs
+            pygame.display.quit()
+    print("过时的朗读请求被丢弃，只播放最新的请求")
+
+
+if __name__ == "__main__":
+    test_fallback_chain_switch_and_retry_window()
+    test_generate_speech_fallback_and_cache_keys()
+    test_request_narration_drops_stale_requests()
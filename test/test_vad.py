@@ -0,0 +1,50 @@
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from modules.vad import AdaptiveVAD, frame_features
+from test.vad_fixtures import FRAME_SIZE, SAMPLE_RATE, frame_accuracy, replay, synthetic_fixtures
+
+HANGOVER = 0.8
+
+
+def test_vad():
+    """验证帧特征、噪声底校准、端点检测延迟、停顿不截断、没有开口时超时以及最长时长"""
+    print("----- 正在测试 vad 模块 -----")
+
+    # 1. 帧特征：满幅方波约为 0 dBFS、过零率接近 1/周期
+    square = np.tile(np.array([32767] * 8 + [-32767] * 8, dtype=np.int16), 64).reshape(2, FRAME_SIZE)
+    energy_db, zcr = frame_features(square)
+    assert np.allclose(energy_db, 0.0, atol=0.01)
+    assert np.allclose(zcr, 1 / 8, atol=0.01)
+    print("帧能量和过零率计算正确")
+
+    # 2. 各种噪声环境下：说完话后 HANGOVER 秒左右结束，不截断停顿前后的短语，人声帧判断基本正确
+    for fixture in synthetic_fixtures():
+        vad = AdaptiveVAD(SAMPLE_RATE, FRAME_SIZE, hangover=HANGOVER, no_speech_timeout=6.0)
+        result = replay(vad, fixture['samples'])
+        assert result['reason'] == fixture['expect'], (fixture['name'], result['reason'])
+        if fixture['speech']:
+            latency = result['end_time'] - fixture['speech'][-1][1]
+            assert HANGOVER - 0.2 <= latency <= HANGOVER + 0.3, (fixture['name'], latency)
+            assert frame_accuracy(result['flags'], fixture['speech']) > 0.85, fixture['name']
+        else:
+            assert abs(result['end_time'] - 6.0) < 0.05
+        print(f"{fixture['name']}: {result['reason']}，结束于 {result['end_time']:.2f} 秒")
+
+    # 3. 持续说话时达到最长时长强制结束
+    talking = synthetic_fixtures()[0]['samples']
+    vad = AdaptiveVAD(SAMPLE_RATE, FRAME_SIZE, max_duration=1.5)
+    result = replay(vad, talking)
+    assert result['reason'] == 'max_duration' and abs(result['end_time'] - 1.5) < 0.05
+    print("最长时长限制正确")
+
+    print("\n----- vad 模块测试完成 -----")
+
+
+if __name__ == "__main__":
+    test_vad()
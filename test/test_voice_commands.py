@@ -0,0 +1,175 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import event_dispatcher
+from modules.voice_commands import VoiceCommandListener, build_grammar, match_command
+from test.vad_fixtures import FRAME_SIZE, SAMPLE_RATE, _noise, _speech
+
+COMMANDS = {"下一页": "next", "上一页": "prev", "退出": "quit", "静音": "mute_toggle"}
+
+
+def _result(*words, conf: float = 0.95) -> str:
+    """构造 Vosk 开启 SetWords 后的识别结果"""
+    return json.dumps({"result": [{"word": word, "conf": conf} for word in words], "text": " ".join(words)},
+                      ensure_ascii=False)
+
+
+def test_voice_commands():
+    """验证指令词表的构造和识别结果的匹配规则"""
+    print("----- 正在测试 voice_commands 模块 -----")
+
+    # 1. 词表包含整词和逐字两种写法，以及 [unk]
+    grammar = build_grammar(COMMANDS)
+    assert grammar[:2] == ["下一页", "下 一 页"]
+    assert "退 出" in grammar and grammar[-1] == "[unk]"
+    print("指令词表构造正确")
+
+    # 2. 整词或逐字识别结果都能匹配到动作
+    assert match_command(_result("下一页"), COMMANDS, 0.6) == "next"
+    assert match_command(_result("上", "一", "页"), COMMANDS, 0.6) == "prev"
+    assert match_command(json.dumps({"text": "静音"}, ensure_ascii=False), COMMANDS, 0.6) == "mute_toggle"
+    print("指令匹配正确")
+
+    # 3. 含有 [unk]、不是完整指令、置信度低或结果无法解析时不触发
+    assert match_command(_result("[unk]", "退出"), COMMANDS, 0.6) is None
+    assert match_command(_result("下", "一"), COMMANDS, 0.6) is None
+    assert match_command(_result("退出", conf=0.4), COMMANDS, 0.6) is None
+    assert match_command(json.dumps({"text": ""}), COMMANDS, 0.6) is None
+    assert match_command("not json", COMMANDS, 0.6) is None
+    print("非指令结果被正确忽略")
+
+    print("\n----- voice_commands 模块测试完成 -----")
+
+
+class FakeRing:
+    """模拟 PCMRingBuffer：数据取自完整的信号，超出容量的旧数据视为已被覆盖"""
+    def __init__(self, signal: np.ndarray, capacity: int, written: int):
+        self.signal = signal
+        self.capacity = capacity
+        self.written = written
+
+    def view(self, start: int, end: int) -> np.ndarray:
+        if start < self.written - self.capacity or end > self.written or start > end:
+            raise IndexError(f"采样区间 [{start}, {end}) 不在缓冲区内")
+        return self.signal[start:end]
+
+
+class FakeDevice:
+    """
+    模拟 AudioDeviceManager：wait_for_data 像录音回调一样按块推进写入位置，直到达到请求的位置。
+    写入位置越过 skip_at 时一次跳过 skip 个采样，模拟监听线程长时间没有读取（数据已被覆盖）。
+    信号用完后暂停监听，_listen 随之返回。
+    """
+    rate = SAMPLE_RATE
+    chunk = FRAME_SIZE
+
+    def __init__(self, signal: np.ndarray, listener: VoiceCommandListener, capacity: int, start: int,
+                 skip_at: int | None = None, skip: int = 0):
+        self.ring = FakeRing(signal, capacity, start)
+        self.listener = listener
+        self.skip_at = skip_at
+        self.skip = skip
+        self.waits = 0
+
+    def wait_for_data(self, position: int, timeout: float) -> int:
+        self.waits += 1
+        ring = self.ring
+        while ring.written < position and ring.written + self.chunk <= len(ring.signal):
+            ring.written += self.chunk
+            if self.skip_at is not None and ring.written >= self.skip_at:
+                ring.written += self.skip
+                self.skip_at = None
+        if ring.written + self.chunk > len(ring.signal):
+            self.listener.set_active(False)
+        return ring.written
+
+    def is_stalled(self) -> bool:
+        return False
+
+
+class StubRecognizer:
+    """替身识别器：记录送来的音频，总是识别为“下一页”"""
+    def __init__(self):
+        self.utterances: list[np.ndarray] = []
+
+    def AcceptWaveform(self, data: bytes):
+        self.utterances.append(np.frombuffer(data, dtype=np.int16))
+
+    def FinalResult(self) -> str:
+        return _result("下一页")
+
+
+def _locate(signal: np.ndarray, pcm: np.ndarray, near: int) -> int:
+    """在 near 附近找到 pcm 在信号中的起始位置（噪声是随机的，只会匹配一处）"""
+    for start in range(max(0, near - SAMPLE_RATE), near + SAMPLE_RATE):
+        if np.array_equal(signal[start:start + len(pcm)], pcm):
+            return start
+    raise AssertionError("识别器收到的音频不是信号中连续的一段")
+
+
+def _run_listener(signal: np.ndarray, capacity: int, start: int, monkeypatch, **device_options):
+    listener = VoiceCommandListener(commands=COMMANDS, max_utterance=2.0, min_confidence=0.6)
+    device = FakeDevice(signal, listener, capacity, start, **device_options)
+    listener.device = device
+    posted = []
+    monkeypatch.setattr(event_dispatcher.EventDispatcher, "post",
+                        staticmethod(lambda event_type, **attributes: posted.append(attributes['action'])))
+    recognizer = StubRecognizer()
+    listener.set_active(True)
+    listener._listen(recognizer)
+    return listener, device, recognizer, posted
+
+
+def _place(signal: np.ndarray, phrase: np.ndarray, at: float) -> tuple[int, int]:
+    offset = int(at * SAMPLE_RATE)
+    signal[offset:offset + len(phrase)] += phrase
+    return offset, offset + len(phrase)
+
+
+def test_listener_offsets(monkeypatch):
+    """
+    验证监听循环的位置计算：识别器收到的音频包含语音开始前的前导音频、覆盖整句且不含过多尾部，
+    较长的语音不做识别，落后太多时从最新位置重新开始；每次醒来批量处理约 POLL_SECONDS 的音频。
+    """
+    rng = np.random.default_rng(3)
+    total = 14 * SAMPLE_RATE
+    signal = _noise(rng, total, -50)
+    command_1 = _place(signal, _speech(rng, 3, -20), 1.3)
+    _place(signal, _speech(rng, 20, -20), 3.0)  # 约 6 秒的正常说话，不是指令
+    command_2 = _place(signal, _speech(rng, 3, -20), 11.0)
+    signal = np.clip(signal, -32768, 32767).astype(np.int16)
+    pre_roll = int(VoiceCommandListener.PRE_ROLL_SECONDS * SAMPLE_RATE)
+    tail = int(0.4 * SAMPLE_RATE) + 3 * FRAME_SIZE  # 静音 0.4 秒判定结束，再加几帧余量
+
+    # 1. 写入位置不是块的整数倍时从之前最近的块边界开始；两条指令被识别，长语音被跳过
+    listener, device, recognizer, posted = _run_listener(signal, 10 * SAMPLE_RATE, 1000, monkeypatch)
+    assert posted == ["next", "next"] and listener.recognized == 2
+    for pcm, (phrase_start, phrase_end) in zip(recognizer.utterances, (command_1, command_2)):
+        start = _locate(signal, pcm, phrase_start - pre_roll)
+        assert (start + pre_roll) % FRAME_SIZE == 0  # 语音开始的位置落在块边界上（origin 按块对齐）
+        assert phrase_start - pre_roll - int(0.15 * SAMPLE_RATE) <= start <= phrase_start
+        assert phrase_end <= start + len(pcm) <= phrase_end + tail
+    # 每次醒来处理约 POLL_SECONDS 的音频（每段语音结束后回退重新检测时会多醒来一次），而不是每个块都醒来一次
+    assert device.waits < total // FRAME_SIZE // 4
+    print("监听位置计算正确")
+
+    # 2. 长语音进行到一半时读取落后超过缓冲区容量（跳到第二条指令之前的安静处）：
+    #    从最新位置重新开始，没读完的长语音被丢弃，之后的指令照常识别
+    listener, device, recognizer, posted = _run_listener(signal, 3 * SAMPLE_RATE, 0, monkeypatch,
+                                                         skip_at=6 * SAMPLE_RATE, skip=int(3.6 * SAMPLE_RATE))
+    assert posted == ["next", "next"]
+    start = _locate(signal, recognizer.utterances[-1], command_2[0] - pre_roll)
+    assert command_2[0] - pre_roll - int(0.15 * SAMPLE_RATE) <= start <= command_2[0]
+    assert command_2[1] <= start + len(recognizer.utterances[-1]) <= command_2[1] + tail
+    print("落后时重新开始检测")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
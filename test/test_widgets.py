@@ -0,0 +1,91 @@
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from modules.widgets import Button, ImagePane, WidgetScreen
+
+
+class FakeRenderer:
+    """模拟 GlyphAtlasRenderer：文字画成与字数等宽的色块，不需要字体文件"""
+    def render(self, text: str, font, color: tuple = (0, 0, 0), padding: int = 5) -> pygame.Surface:
+        surface = pygame.Surface((10 * len(text) + 2 * padding, 16))
+        surface.fill(color)
+        return surface
+
+
+def _solid(size: tuple, color: tuple) -> pygame.Surface:
+    surface = pygame.Surface(size)
+    surface.fill(color)
+    return surface
+
+
+def test_merge_rects():
+    """验证重叠的脏区域合并为一个，不相交的区域保持独立"""
+    rects = [pygame.Rect(0, 0, 10, 10), pygame.Rect(5, 5, 10, 10), pygame.Rect(50, 50, 5, 5)]
+    merged = WidgetScreen._merge_rects(rects)
+    assert sorted(map(tuple, merged)) == [(0, 0, 15, 15), (50, 50, 5, 5)]
+
+    # 新区域同时连接两个已有区域时三者合并
+    rects = [pygame.Rect(0, 0, 10, 10), pygame.Rect(20, 0, 10, 10), pygame.Rect(5, 0, 20, 5)]
+    assert list(map(tuple, WidgetScreen._merge_rects(rects))) == [(0, 0, 30, 10)]
+    print("脏区域合并正确")
+
+
+def test_toggle_dirties_only_widget_rect(monkeypatch):
+    """验证切换一个按钮只重绘并提交该按钮所在的区域，其余像素保持不变"""
+    pygame.display.init()
+    try:
+        display = pygame.display.set_mode((320, 240))
+        updates = []
+        monkeypatch.setattr(pygame.display, "update", lambda rects=None: updates.append(rects))
+        monkeypatch.setattr(pygame.display, "flip", lambda: updates.append("flip"))
+
+        renderer = FakeRenderer()
+        screen = WidgetScreen((320, 240))
+        screen.add(ImagePane((0, 0, 320, 200), _solid((320, 200), (200, 200, 255))))
+        mute_icon, unmute_icon = _solid((40, 40), (255, 0, 0)), _solid((40, 40), (0, 255, 0))
+        mute_pane = screen.add(ImagePane((270, 10, 40, 40), mute_icon, value='mute'))
+        left = screen.add(Button((10, 200, 80, 30), "上一页", None, renderer, value='prev'))
+        screen.add(Button((230, 200, 80, 30), "下一页", None, renderer, value='next'))
+
+        # 1. 第一次提交整屏刷新
+        screen.present(display)
+        assert updates == ["flip"]
+        before = display.copy()
+
+        # 2. 切换静音按钮：只有按钮区域变脏，只提交这一块
+        updates.clear()
+        mute_pane.set_image(unmute_icon)
+        assert screen._dirty_rects == [pygame.Rect(270, 10, 40, 40)]
+        screen.present(display)
+        assert updates == [[pygame.Rect(270, 10, 40, 40)]]
+        assert display.get_at((290, 30))[:3] == (0, 255, 0)
+        for pos in [(269, 30), (311, 30), (290, 9), (290, 51), (50, 215), (160, 100)]:
+            assert display.get_at(pos) == before.get_at(pos)
+
+        # 3. 设置相同的图片不产生脏区域；没有变化时不提交
+        updates.clear()
+        mute_pane.set_image(unmute_icon)
+        screen.present(display)
+        assert updates == []
+
+        # 4. 隐藏一个文字按钮：只提交该按钮区域，背景重新露出来
+        left.set_visible(False)
+        screen.present(display)
+        assert updates == [[pygame.Rect(10, 200, 80, 30)]]
+        assert display.get_at((50, 215))[:3] == (255, 255, 255)
+        assert screen.find_value_at((50, 215)) is None and screen.find_value_at((290, 30)) == 'mute'
+        print("切换按钮只重绘该按钮区域")
+    finally:
+        pygame.display.quit()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
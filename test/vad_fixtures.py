@@ -0,0 +1,162 @@
+import json
+import os
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 512  # 与 AudioDeviceManager 的块大小一致（32 毫秒）
+FRAMES_PER_CALLBACK = 2  # 回放时每次送入的帧数，模拟录音线程批量读取
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "vad")
+
+
+def _scale_to_db(signal: np.ndarray, level_db: float) -> np.ndarray:
+    """把信号缩放到指定的均方根电平（dBFS）"""
+    rms = np.sqrt(np.mean(signal ** 2)) or 1.0
+    return signal * (32768.0 * 10 ** (level_db / 20) / rms)
+
+
+def _noise(rng: np.random.Generator, count: int, level_db: float, kind: str = "pink") -> np.ndarray:
+    """背景噪声：'white' 白噪声，'pink' 近似粉红噪声（风扇、空调一类），'hum' 50 Hz 电源哼声加少量白噪声"""
+    if kind == "white":
+        signal = rng.standard_normal(count)
+    elif kind == "pink":
+        spectrum = np.fft.rfft(rng.standard_normal(count))
+        spectrum /= np.sqrt(np.maximum(np.arange(len(spectrum)), 1))
+        signal = np.fft.irfft(spectrum, count)
+    else:
+        t = np.arange(count) / SAMPLE_RATE
+        signal = np.sin(2 * np.pi * 50 * t) + 0.5 * np.sin(2 * np.pi * 150 * t) + 0.1 * rng.standard_normal(count)
+    return _scale_to_db(signal, level_db)
+
+
+def _syllable(rng: np.random.Generator, duration: float, f0: float, fricative: bool) -> np.ndarray:
+    """
+    一个合成音节：基频带抖动的谐波（元音）乘以起伏的包络；fricative 为 True 时前面加一段高频噪声（清辅音）。
+    """
+    count = int(duration * SAMPLE_RATE)
+    t = np.arange(count) / SAMPLE_RATE
+    pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(2, 5) * t)) * rng.uniform(0.9, 1.1)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    # 谐波幅度按共振峰附近加强，近似元音频谱
+    formants = rng.uniform(500, 900), rng.uniform(1100, 2200)
+    vowel = np.zeros(count)
+    for harmonic in range(1, 16):
+        frequency = harmonic * f0
+        gain = sum(1.0 / (1 + ((frequency - formant) / 200) ** 2) for formant in formants) + 0.05
+        vowel += gain * np.sin(harmonic * phase)
+    envelope = np.sin(np.pi * np.linspace(0, 1, count)) ** 0.5
+    vowel *= envelope
+    if not fricative:
+        return vowel
+    hiss_count = int(0.08 * SAMPLE_RATE)
+    hiss = np.diff(rng.standard_normal(hiss_count + 1))  # 一阶差分，高频为主
+    hiss *= np.sqrt(np.mean(vowel ** 2)) / np.sqrt(np.mean(hiss ** 2)) * 0.4
+    return np.concatenate((hiss, vowel))
+
+
+def _speech(rng: np.random.Generator, syllables: int, level_db: float, f0: float = 220.0,
+            fricative_every: int = 3) -> np.ndarray:
+    """一串音节组成的短语，音节之间有几十毫秒的间隙"""
+    parts = []
+    for index in range(syllables):
+        parts.append(_syllable(rng, rng.uniform(0.16, 0.28), f0, fricative=index % fricative_every == 0))
+        parts.append(np.zeros(int(rng.uniform(0.02, 0.08) * SAMPLE_RATE)))
+    return _scale_to_db(np.concatenate(parts), level_db)
+
+
+def _compose(rng: np.random.Generator, duration: float, noise_db: float, noise_kind: str,
+             phrases: list[tuple[float, int, float]]) -> tuple[np.ndarray, list[tuple[float, float]]]:
+    """在噪声背景上按 (开始秒数, 音节数, 电平) 放置短语，返回 int16 采样和人声区间"""
+    total = int(duration * SAMPLE_RATE)
+    signal = _noise(rng, total, noise_db, noise_kind)
+    segments = []
+    for start, syllables, level_db in phrases:
+        phrase = _speech(rng, syllables, level_db)
+        offset = int(start * SAMPLE_RATE)
+        signal[offset:offset + len(phrase)] += phrase[:total - offset]
+        segments.append((start, min(duration, start + len(phrase) / SAMPLE_RATE)))
+    return np.clip(signal, -32768, 32767).astype(np.int16), segments
+
+
+def synthetic_fixtures(seed: int = 7) -> list[dict]:
+    """
+    合成的端点检测样本（固定随机种子，每次生成的数据完全相同）。
+    每个样本包含 name、samples（int16）、speech（人声区间列表，秒）和 expect（期望的结束原因）。
+    开头的 0.5 秒对应录音的前导音频，不含人声。
+    """
+    rng = np.random.default_rng(seed)
+    scenarios = [
+        ("quiet_room", 5.0, -65.0, "white", [(0.8, 8, -24.0)], "silence"),
+        ("noisy_room", 5.0, -40.0, "pink", [(0.7, 8, -22.0)], "silence"),
+        ("low_gain_mic", 5.0, -72.0, "white", [(0.9, 7, -46.0)], "silence"),
+        ("mains_hum", 5.0, -45.0, "hum", [(0.6, 6, -26.0)], "silence"),
+        ("pause_mid_sentence", 6.0, -60.0, "pink", [(0.6, 5, -25.0), (2.35, 5, -25.0)], "silence"),
+        ("soft_voice_fan", 5.0, -42.0, "pink", [(0.8, 8, -30.0)], "silence"),
+        ("no_speech", 10.0, -50.0, "pink", [], "no_speech"),
+    ]
+    fixtures = []
+    for name, duration, noise_db, noise_kind, phrases, expect in scenarios:
+        samples, speech = _compose(rng, duration, noise_db, noise_kind, phrases)
+        fixtures.append({'name': name, 'samples': samples, 'speech': speech, 'expect': expect})
+    return fixtures
+
+
+def recorded_fixtures(fixture_dir: str = DEFAULT_FIXTURE_DIR) -> list[dict]:
+    """
+    读取录制的样本：16 kHz 16 位单声道 .wav，同名 .json 记录人声区间，
+    例如 {"speech": [[0.8, 2.4]], "expect": "silence"}。目录不存在时返回空列表。
+    """
+    fixtures = []
+    if not os.path.isdir(fixture_dir):
+        return fixtures
+    for filename in sorted(os.listdir(fixture_dir)):
+        if not filename.lower().endswith(".wav"):
+            continue
+        path = os.path.join(fixture_dir, filename)
+        with wave.open(path, 'rb') as wav_file:
+            if wav_file.getframerate() != SAMPLE_RATE or wav_file.getsampwidth() != 2 or wav_file.getnchannels() != 1:
+                print(f"跳过格式不符的样本（需要 16 kHz 16 位单声道）: {filename}")
+                continue
+            samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+        labels = {}
+        label_path = os.path.splitext(path)[0] + ".json"
+        if os.path.exists(label_path):
+            with open(label_path, 'r', encoding='utf-8') as f:
+                labels = json.load(f)
+        fixtures.append({'name': filename, 'samples': samples,
+                         'speech': [tuple(segment) for segment in labels.get('speech', [])],
+                         'expect': labels.get('expect', 'silence')})
+    return fixtures
+
+
+def replay(vad, samples: np.ndarray) -> dict:
+    """
+    按录音时的节奏把样本逐块送入端点检测器，返回结束原因、结束时间（秒）、各帧的判断结果和 CPU 时间。
+    样本末尾仍未结束时 end_time 为 None。
+    """
+    import time
+
+    frame_count = len(samples) // FRAME_SIZE
+    frames = samples[:frame_count * FRAME_SIZE].reshape(frame_count, FRAME_SIZE)
+    flags = []
+    cpu_start = time.process_time()
+    for start in range(0, frame_count, FRAMES_PER_CALLBACK):
+        flags.extend(vad.feed(frames[start:start + FRAMES_PER_CALLBACK]).tolist())
+        if vad.ended:
+            break
+    cpu = time.process_time() - cpu_start
+    end_time = vad.end_sample / SAMPLE_RATE if vad.ended else None
+    return {'reason': vad.end_reason, 'end_time': end_time, 'flags': flags, 'cpu': cpu}
+
+
+def frame_accuracy(flags: list[bool], speech: list[tuple[float, float]]) -> float:
+    """逐帧判断与人声区间标注的一致比例（只统计已处理的帧）"""
+    if not flags:
+        return 0.0
+    centers = (np.arange(len(flags)) + 0.5) * FRAME_SIZE / SAMPLE_RATE
+    truth = np.zeros(len(flags), dtype=bool)
+    for start, end in speech:
+        truth |= (centers >= start) & (centers < end)
+    return float(np.mean(np.asarray(flags) == truth))